@@ -0,0 +1,60 @@
+# benchmarks/bench_bm25.py
+"""
+BM25 index benchmark: build time and query latency (p50/p99) on sample_data.
+Usage:
+    python -m benchmarks.bench_bm25 --data_dir sample_data --queries 500
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.bm25_index import BM25Index, tokenize
+from src.ingest import extract_text_from_pdf, chunk_text
+
+
+def load_chunks(data_dir: str):
+    chunks = []
+    for pdf in sorted(Path(data_dir).glob("**/*.pdf")):
+        for c in chunk_text(extract_text_from_pdf(str(pdf))):
+            chunks.append((pdf.name, c))
+    return chunks
+
+
+def run(data_dir: str = "sample_data", n_queries: int = 500, k: int = 20, seed: int = 0):
+    chunks = load_chunks(data_dir)
+    index = BM25Index()
+    start = time.perf_counter()
+    for i, (source, c) in enumerate(chunks):
+        index.add(i, c["text"], {"source": source, "chunk_id": c["chunk_id"]})
+    build_s = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    vocab = [t for _, c in chunks for t in tokenize(c["text"]) if len(t) > 3]
+    queries = [" ".join(rng.sample(vocab, 4)) for _ in range(n_queries)]
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, k=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "docs": len(index),
+        "terms": len(index.postings),
+        "build_s": build_s,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+    for name, value in run(args.data_dir, args.queries, args.k).items():
+        print(f"{name:>14}: {value:.3f}" if isinstance(value, float) else f"{name:>14}: {value}")
@@ -0,0 +1,69 @@
+# benchmarks/bench_chunker.py
+"""
+Chunker benchmark on sample_data: throughput (MB/s of extracted text) and
+chunk sizes in embedding-model tokens for the token-aware chunker versus the
+old 800-word window chunker. 'truncated' is the share of chunks longer than
+the encoder's max sequence length, i.e. text the model never sees.
+Usage:
+    python -m benchmarks.bench_chunker --data_dir sample_data --repeat 5
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.chunker import get_chunker, CHUNK_TOKENS
+from src.ingest import extract_text_from_pdf
+
+
+def word_window_chunks(text: str, chunk_size: int = 800, overlap: int = 200):
+    """
+    The previous chunk_text: fixed windows of whitespace words.
+    """
+    words = text.split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append({"chunk_id": len(chunks), "text": " ".join(words[i:i + chunk_size])})
+        i += chunk_size - overlap
+    return chunks
+
+
+def measure(name, fn, texts, chunker, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = [c for t in texts for c in fn(t)]
+    seconds = (time.perf_counter() - start) / repeat
+    n_tokens = np.array([len(chunker.token_offsets(c["text"])[0]) for c in chunks])
+    mb = sum(len(t.encode("utf-8")) for t in texts) / 2 ** 20
+    return {
+        "chunker": name,
+        "mb_per_s": mb / seconds,
+        "chunks": len(chunks),
+        "mean_tokens": float(n_tokens.mean()) if len(n_tokens) else 0.0,
+        "max_tokens": int(n_tokens.max()) if len(n_tokens) else 0,
+        "truncated": float(np.mean(n_tokens > CHUNK_TOKENS)) if len(n_tokens) else 0.0,
+    }
+
+
+def run(data_dir: str = "sample_data", repeat: int = 3):
+    texts = [extract_text_from_pdf(str(pdf)) for pdf in sorted(Path(data_dir).glob("**/*.pdf"))]
+    chunker = get_chunker()
+    return [
+        measure("word-window", word_window_chunks, texts, chunker, repeat),
+        measure("token-aware", chunker.chunk, texts, chunker, repeat),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = run(args.data_dir, args.repeat)
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>14}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>14.3f}" if isinstance(r[c], float) else f"{r[c]:>14}" for c in cols))
@@ -0,0 +1,134 @@
+# benchmarks/bench_inference_backends.py
+"""
+Inference backend benchmark on CPU: for the embedder and the generator,
+load time, single-request latency (p50 / p95), batch throughput and parity
+with the fp32 PyTorch outputs. Embedder parity is the minimum cosine
+similarity to the torch vectors; generator parity is the share of greedy
+answers identical to torch's. With --check the run exits non-zero when a
+backend falls below --min_cosine / --min_match.
+Usage:
+    python -m benchmarks.bench_inference_backends --backends torch,torch-int8,onnx,onnx-int8 --threads 4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.inference_backend import BACKENDS, INFERENCE_THREADS, load_sentence_transformer, load_seq2seq
+from src.embeddings import MODEL as EMBEDDING_MODEL
+from src.generation_strict import MODEL as GENERATOR_MODEL
+
+QUESTIONS = [
+    "What problem does the paper address?",
+    "Which datasets are used in the experiments?",
+    "How does the proposed method compare to the baselines?",
+    "What are the limitations mentioned by the authors?",
+]
+
+
+def load_passages(data_dir: str, n: int):
+    from src.ingest import chunk_text, extract_text_from_pdf
+    passages = []
+    for pdf in sorted(Path(data_dir).glob("**/*.pdf")):
+        passages += [c["text"] for c in chunk_text(extract_text_from_pdf(str(pdf)))]
+        if len(passages) >= n:
+            break
+    return passages[:n] or [f"{q} Placeholder passage text for the benchmark." for q in QUESTIONS]
+
+
+def _latencies(fn, items, repeat):
+    out = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            out.append(time.perf_counter() - start)
+    return np.array(out) * 1000
+
+
+def bench_embedder(backend, passages, threads, repeat, reference=None):
+    start = time.perf_counter()
+    model = load_sentence_transformer(EMBEDDING_MODEL, backend, threads=threads)
+    load_s = time.perf_counter() - start
+    lat = _latencies(lambda t: model.encode(t, show_progress_bar=False), QUESTIONS, repeat)
+    start = time.perf_counter()
+    vecs = np.asarray(model.encode(passages, batch_size=64, show_progress_bar=False, normalize_embeddings=True))
+    throughput = len(passages) / (time.perf_counter() - start)
+    parity = float((vecs * reference).sum(axis=1).min()) if reference is not None else 1.0
+    row = {"model": "embedder", "backend": backend, "load_s": load_s, "p50_ms": float(np.percentile(lat, 50)),
+           "p95_ms": float(np.percentile(lat, 95)), "items_per_s": throughput, "parity": parity}
+    return row, vecs
+
+
+def bench_generator(backend, passages, threads, repeat, max_new_tokens, reference=None):
+    from transformers import AutoTokenizer
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(GENERATOR_MODEL)
+    model = load_seq2seq(GENERATOR_MODEL, backend, threads=threads)
+    load_s = time.perf_counter() - start
+    prompts = [f"CONTEXT:\n{p}\n\nQUESTION:\n{q}\n\nANSWER:\n" for q, p in zip(QUESTIONS, passages)]
+
+    def generate(batch):
+        inputs = tokenizer(batch, return_tensors="pt", padding=True, truncation=True)
+        ids = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+        return tokenizer.batch_decode(ids, skip_special_tokens=True)
+
+    lat = _latencies(lambda p: generate([p]), prompts, repeat)
+    start = time.perf_counter()
+    answers = generate(prompts)
+    throughput = len(prompts) / (time.perf_counter() - start)
+    parity = float(np.mean([a == b for a, b in zip(answers, reference)])) if reference is not None else 1.0
+    row = {"model": "generator", "backend": backend, "load_s": load_s, "p50_ms": float(np.percentile(lat, 50)),
+           "p95_ms": float(np.percentile(lat, 95)), "items_per_s": throughput, "parity": parity}
+    return row, answers
+
+
+def run(backends=BACKENDS, data_dir: str = "sample_data", n_passages: int = 256, threads: int = INFERENCE_THREADS,
+        repeat: int = 3, max_new_tokens: int = 64):
+    """
+    Benchmark every backend; parity is measured against 'torch', which is
+    always run first.
+    """
+    backends = ["torch"] + [b for b in backends if b != "torch"]
+    passages = load_passages(data_dir, n_passages)
+    rows = []
+    ref_vecs = ref_answers = None
+    for backend in backends:
+        row, ref = bench_embedder(backend, passages, threads, repeat, ref_vecs)
+        rows.append(row)
+        ref_vecs = ref if ref_vecs is None else ref_vecs
+    for backend in backends:
+        row, ref = bench_generator(backend, passages, threads, repeat, max_new_tokens, ref_answers)
+        rows.append(row)
+        ref_answers = ref if ref_answers is None else ref_answers
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS))
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--n_passages", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=INFERENCE_THREADS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max_new_tokens", type=int, default=64)
+    parser.add_argument("--check", action="store_true", help="fail when parity is below the thresholds")
+    parser.add_argument("--min_cosine", type=float, default=0.98)
+    parser.add_argument("--min_match", type=float, default=0.75)
+    args = parser.parse_args()
+
+    rows = run(args.backends.split(","), args.data_dir, args.n_passages, args.threads, args.repeat,
+               args.max_new_tokens)
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>12}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>12.3f}" if isinstance(r[c], float) else f"{r[c]:>12}" for c in cols))
+
+    if args.check:
+        failed = [r for r in rows
+                  if r["parity"] < (args.min_cosine if r["model"] == "embedder" else args.min_match)]
+        for r in failed:
+            print(f"parity check failed: {r['model']} / {r['backend']} = {r['parity']:.3f}", file=sys.stderr)
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,79 @@
+# benchmarks/bench_qdrant_profiles.py
+"""
+Compare Qdrant collection profiles (default / int8 / binary / ondisk) on the
+same vectors: estimated RAM footprint, recall@k against exact search and
+query latency p50/p99. Needs a Qdrant server (local mode ignores
+quantization and on-disk settings).
+Usage:
+    python -m benchmarks.bench_qdrant_profiles --data_dir sample_data
+    python -m benchmarks.bench_qdrant_profiles --synthetic 100000 --hnsw_ef 64
+"""
+import argparse
+
+import numpy as np
+
+from src.vectorstore_qdrant import QdrantStore, PROFILES, HNSW_M
+from benchmarks.bench_vectorstores import corpus_vectors, bench_store
+
+
+def estimate_ram_mb(n: int, dim: int, profile: str, hnsw_m: int = HNSW_M) -> float:
+    """
+    Rough resident size of vectors + HNSW links (payloads excluded).
+    """
+    prof = PROFILES[profile]
+    ram = 0 if prof["on_disk"] else n * dim * 4
+    if prof["quantization"] == "int8":
+        ram += n * dim
+    elif prof["quantization"] == "binary":
+        ram += n * dim // 8
+    if not prof["hnsw_on_disk"]:
+        ram += n * hnsw_m * 2 * 4   # level-0 links dominate the graph
+    return ram / 2 ** 20
+
+
+def run(data_dir="sample_data", synthetic=0, n_queries=200, k=10, host="localhost", port=6333,
+        profiles=None, hnsw_ef=None, seed=0):
+    vectors = corpus_vectors(data_dir, synthetic, seed=seed)
+    n, dim = vectors.shape
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, n, size=n_queries)
+    queries = vectors[picks] + rng.normal(scale=0.05, size=(n_queries, dim)).astype(np.float32)
+
+    normed = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+    qn = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+    k = min(k, n)
+    truth = np.argsort(-(qn @ normed.T), axis=1)[:, :k]
+
+    rows = []
+    for profile in profiles or list(PROFILES):
+        name = f"bench_profile_{profile}"
+        store = QdrantStore(collection=name, host=host, port=port, vector_size=dim, profile=profile)
+        if hnsw_ef:
+            store.search_params.hnsw_ef = hnsw_ef
+        try:
+            row = bench_store(profile, store, vectors, queries, truth, k)
+        finally:
+            store.client.delete_collection(name)
+        row["est_ram_mb"] = estimate_ram_mb(n, dim, profile)
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--host", type=str, default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--profiles", type=str, default=",".join(PROFILES))
+    parser.add_argument("--hnsw_ef", type=int, default=None)
+    args = parser.parse_args()
+
+    rows = run(args.data_dir, args.synthetic, args.queries, args.k, args.host, args.port,
+               args.profiles.split(","), args.hnsw_ef)
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>20}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>20.3f}" if isinstance(r[c], float) else f"{r[c]:>20}" for c in cols))
@@ -0,0 +1,296 @@
+# benchmarks/bench_suite.py
+"""
+End-to-end benchmark of the ingest and query hot paths on sample_data,
+fully local: Qdrant runs in in-memory mode (or --store faiss, embedded in a
+temp dir), BM25 index and chunk store live in a temp dir as well.
+Stages and their headline numbers:
+    extract     pages/s (serial, one process)
+    chunk       chunks/s, MB/s of extracted text
+    embed       chunks/s through EmbeddingModel (cache off)
+    upsert      points/s incl. the final flush
+    query       p50/p95/p99 ms of merge_and_rerank (query cache off)
+    generation  new tokens/s and p50 ms per answer (greedy, batch of 1)
+Results are written as JSON together with the commit, library versions and
+settings they were measured with; --compare loads an earlier file and flags
+every throughput / latency metric that got worse by more than --tolerance
+(exit status 1), so runs on two commits can be diffed.
+Usage:
+    python -m benchmarks.bench_suite --data_dir sample_data
+    python -m benchmarks.bench_suite --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from src.bm25_index import BM25Index
+from src.chunk_store import ChunkStore
+from src.embeddings import EmbeddingModel, MODEL as EMBEDDING_MODEL
+from src.generation_strict import StrictGenerator
+from src.inference_backend import EMBED_BACKEND, GEN_BACKEND
+from src.ingest import chunk_text
+from src.manifest import current_generation
+from src.pdf_extract import extract_document
+from src.retriever_hybrid import HybridRetriever
+from src.vectorstore_faiss import FaissStore
+from src.vectorstore_qdrant import QdrantStore
+
+COLLECTION = "bench_suite"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True,
+                                        stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def environment(settings: dict) -> dict:
+    import torch
+    import transformers
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "transformers": transformers.__version__,
+        "embedding_model": EMBEDDING_MODEL,
+        "embed_backend": EMBED_BACKEND,
+        "generator_model": os.getenv("GENERATOR_MODEL", "google/flan-t5-small"),
+        "gen_backend": GEN_BACKEND,
+        **settings,
+    }
+
+
+def percentiles(latencies_ms):
+    lat = np.asarray(latencies_ms)
+    return {f"p{p}_ms": float(np.percentile(lat, p)) if len(lat) else 0.0 for p in (50, 95, 99)}
+
+
+# ----------------------
+# STAGES
+# ----------------------
+def bench_extract(pdfs):
+    docs = []
+    pages = 0
+    start = time.perf_counter()
+    for pdf in pdfs:
+        doc = extract_document(str(pdf))
+        pages += len(doc.pages)
+        docs.append((pdf.name, "\n\n".join(doc.pages)))
+    seconds = time.perf_counter() - start
+    return docs, {"docs": len(docs), "pages": pages, "seconds": seconds, "pages_per_s": pages / seconds}
+
+
+def bench_chunk(docs, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = [(source, c) for source, text in docs if text.strip() for c in chunk_text(text)]
+    seconds = (time.perf_counter() - start) / repeat
+    mb = sum(len(text.encode("utf-8")) for _, text in docs) / 2 ** 20
+    return chunks, {"chunks": len(chunks), "seconds": seconds, "chunks_per_s": len(chunks) / seconds,
+                    "mb_per_s": mb / seconds}
+
+
+def bench_embed(texts):
+    em = EmbeddingModel(cache_size=0)
+    em.embed_texts(texts[:8])                           # load + warm up, not measured
+    start = time.perf_counter()
+    vectors = em.embed_texts(texts)
+    seconds = time.perf_counter() - start
+    return vectors, {"chunks": len(texts), "seconds": seconds, "chunks_per_s": len(texts) / seconds}
+
+
+def bench_upsert(store, vectors, payloads, batch: int = 256):
+    start = time.perf_counter()
+    for lo in range(0, len(vectors), batch):
+        hi = min(lo + batch, len(vectors))
+        store.upsert_arrays(list(range(lo, hi)), vectors[lo:hi], payloads[lo:hi])
+    store.flush()
+    seconds = time.perf_counter() - start
+    return {"points": len(vectors), "seconds": seconds, "points_per_s": len(vectors) / seconds}
+
+
+def make_queries(chunks, n: int, seed: int, words: int = 8):
+    """
+    Reproducible queries: word windows from randomly picked chunks.
+    """
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < n:
+        tokens = rng.choice(chunks)[1]["text"].split()
+        if len(tokens) < words:
+            continue
+        lo = rng.randrange(len(tokens) - words + 1)
+        queries.append(" ".join(tokens[lo:lo + words]))
+    return queries
+
+
+def bench_query(retriever, queries, top_k: int):
+    for q in queries[:3]:
+        retriever.merge_and_rerank(q, top_k=top_k)     # warm up the reranker, not measured
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(retriever.merge_and_rerank(q, top_k=top_k))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return results, {"queries": len(queries), **percentiles(latencies),
+                     "queries_per_s": len(queries) / (sum(latencies) / 1000)}
+
+
+def bench_generation(generator, prompts, max_new_tokens: int):
+    tokenizer, model = generator.tokenizer, generator.model
+    model.generate(**tokenizer(prompts[0], return_tensors="pt", truncation=True), max_new_tokens=2)
+    latencies, n_tokens = [], 0
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
+        t0 = time.perf_counter()
+        out = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        n_tokens += out.shape[-1] - 1                   # minus the decoder start token
+    return {"answers": len(prompts), "new_tokens": n_tokens,
+            "tokens_per_s": n_tokens / (sum(latencies) / 1000), "p50_ms": percentiles(latencies)["p50_ms"]}
+
+
+def run(data_dir: str = "sample_data", store: str = "qdrant-memory", n_queries: int = 100, top_k: int = 5,
+        rerank: bool = True, gen_queries: int = 8, max_new_tokens: int = 64, seed: int = 0):
+    pdfs = sorted(Path(data_dir).glob("**/*.pdf"))
+    if not pdfs:
+        raise FileNotFoundError(f"No PDF found in {data_dir}")
+    results = {}
+
+    docs, results["extract"] = bench_extract(pdfs)
+    chunks, results["chunk"] = bench_chunk(docs)
+    texts = [c["text"] for _, c in chunks]
+    vectors, results["embed"] = bench_embed(texts)
+    payloads = [{"source": source, "chunk_id": c["chunk_id"]} for source, c in chunks]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dim = vectors.shape[1]
+        if store == "faiss":
+            vs = FaissStore(collection=COLLECTION, vector_size=dim, index_dir=tmp)
+        else:
+            vs = QdrantStore(collection=COLLECTION, vector_size=dim, client=QdrantClient(":memory:"))
+        results["upsert"] = bench_upsert(vs, vectors, payloads)
+
+        bm25 = BM25Index()
+        for i, (payload, text) in enumerate(zip(payloads, texts)):
+            bm25.add(i, text, payload)
+        chunk_texts = ChunkStore(os.path.join(tmp, f"chunks_{COLLECTION}"))
+        chunk_texts.put_texts(enumerate(texts))
+        chunk_texts.flush()
+
+        # the retriever reads the stores built above instead of INDEX_DIR
+        retriever = HybridRetriever(qdrant_collection=COLLECTION, rerank=rerank)
+        gen = current_generation(COLLECTION)
+        retriever.backend = "faiss" if store == "faiss" else "qdrant"
+        retriever._store, retriever._bm25, retriever._chunks = vs, bm25, chunk_texts
+        retriever._store_generation = gen if store == "faiss" else None
+        retriever._bm25_generation = retriever._chunks_generation = gen
+        retriever.cache.max_entries = 0                 # measure retrieval, not the cache
+        queries = make_queries(chunks, n_queries, seed)
+        hits, results["query"] = bench_query(retriever, queries, top_k)
+        retriever.executor.shutdown()
+        chunk_texts.close()
+
+    if gen_queries > 0:
+        generator = StrictGenerator()
+        prompts = [generator.build_prompt(q, retriever.convert_for_generator(h))
+                   for q, h in zip(queries[:gen_queries], hits)]
+        results["generation"] = bench_generation(generator, prompts, max_new_tokens)
+    return results
+
+
+# ----------------------
+# COMPARISON
+# ----------------------
+def direction(metric: str) -> int:
+    """
+    +1 when higher is better, -1 when lower is better, 0 for counts.
+    """
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith("_ms"):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1):
+    """
+    One row per throughput / latency metric present in both result sets;
+    'regression' is set when it got worse by more than tolerance.
+    """
+    rows = []
+    for stage, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = baseline["results"].get(stage, {}).get(metric)
+            sign = direction(metric)
+            if sign == 0 or not old:
+                continue
+            change = (value - old) / old
+            rows.append({"stage": stage, "metric": metric, "baseline": old, "current": value,
+                         "change_pct": 100 * change, "regression": sign * change < -tolerance})
+    return rows
+
+
+def print_table(rows):
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>14}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>14.3f}" if isinstance(r[c], float) else f"{str(r[c]):>14}" for c in cols))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--store", type=str, default="qdrant-memory", choices=["qdrant-memory", "faiss"])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--no_rerank", action="store_true")
+    parser.add_argument("--gen_queries", type=int, default=8, help="answers to generate (0 = skip generation)")
+    parser.add_argument("--max_new_tokens", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None, help="default: benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", type=str, default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    settings = {"data_dir": args.data_dir, "store": args.store, "queries": args.queries, "top_k": args.top_k,
+                "rerank": not args.no_rerank, "gen_queries": args.gen_queries,
+                "max_new_tokens": args.max_new_tokens, "seed": args.seed}
+    report = {"meta": environment(settings)}
+    report["results"] = run(args.data_dir, args.store, args.queries, args.top_k, not args.no_rerank,
+                            args.gen_queries, args.max_new_tokens, args.seed)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['meta']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print_table([{"stage": s, "metric": m, "value": v} for s, ms in report["results"].items() for m, v in ms.items()])
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(f"\nAgainst {args.compare} (commit {baseline['meta'].get('commit')}):")
+        rows = compare(baseline, report, args.tolerance)
+        if rows:
+            print_table(rows)
+        if any(r["regression"] for r in rows):
+            sys.exit(1)
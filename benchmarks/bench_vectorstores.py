@@ -0,0 +1,96 @@
+# benchmarks/bench_vectorstores.py
+"""
+Compare FaissStore (flat / hnsw / ivfpq) with Qdrant on the same vectors:
+upsert throughput, query latency p50/p99 and recall@k against exact search.
+Qdrant runs in local in-memory mode unless --qdrant_host is given.
+Usage:
+    python -m benchmarks.bench_vectorstores --data_dir sample_data
+    python -m benchmarks.bench_vectorstores --synthetic 20000     # no model needed
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from src.vectorstore_faiss import FaissStore
+from src.vectorstore_qdrant import QdrantStore
+
+
+def corpus_vectors(data_dir: str, synthetic: int, dim: int = 384, seed: int = 0):
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        return rng.normal(size=(synthetic, dim)).astype(np.float32)
+    from src.embeddings import EmbeddingModel
+    from benchmarks.bench_bm25 import load_chunks
+    chunks = load_chunks(data_dir)
+    return EmbeddingModel().embed_texts([c["text"] for _, c in chunks])
+
+
+def bench_store(name, store, vectors, queries, truth, k, batch=256):
+    start = time.perf_counter()
+    for lo in range(0, len(vectors), batch):
+        hi = min(lo + batch, len(vectors))
+        store.upsert_arrays(list(range(lo, hi)), vectors[lo:hi], [{"chunk_id": i} for i in range(lo, hi)])
+    store.flush()
+    upsert_s = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for q, gold in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = store.search(q, top_k=k).points
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len({h.id for h in hits} & set(gold.tolist())) / k)
+    return {
+        "store": name,
+        "upsert_points_per_s": len(vectors) / upsert_s,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p99_ms": float(np.percentile(latencies, 99)),
+        f"recall@{k}": float(np.mean(recalls)),
+    }
+
+
+def run(data_dir="sample_data", synthetic=0, n_queries=200, k=10, qdrant_host=None, qdrant_port=6333, seed=0):
+    vectors = corpus_vectors(data_dir, synthetic, seed=seed)
+    dim = vectors.shape[1]
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, len(vectors), size=n_queries)
+    queries = vectors[picks] + rng.normal(scale=0.05, size=(n_queries, dim)).astype(np.float32)
+
+    normed = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+    qn = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+    k = min(k, len(vectors))
+    truth = np.argsort(-(qn @ normed.T), axis=1)[:, :k]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index_type in ("flat", "hnsw", "ivfpq"):
+            store = FaissStore(collection="bench", vector_size=dim, index_type=index_type, index_dir=tmp)
+            rows.append(bench_store(f"faiss-{index_type}", store, vectors, queries, truth, k))
+    if qdrant_host:
+        # server: gRPC with pipelined wait=False batches
+        store = QdrantStore(collection="bench_vectorstores", host=qdrant_host, port=qdrant_port, vector_size=dim)
+    else:
+        store = QdrantStore(collection="bench_vectorstores", vector_size=dim, client=QdrantClient(":memory:"))
+    rows.append(bench_store("qdrant" if qdrant_host else "qdrant-local", store, vectors, queries, truth, k))
+    if qdrant_host:
+        store.client.delete_collection("bench_vectorstores")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--qdrant_host", type=str, default=None)
+    parser.add_argument("--qdrant_port", type=int, default=6333)
+    args = parser.parse_args()
+
+    rows = run(args.data_dir, args.synthetic, args.queries, args.k, args.qdrant_host, args.qdrant_port)
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>20}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>20.3f}" if isinstance(r[c], float) else f"{r[c]:>20}" for c in cols))
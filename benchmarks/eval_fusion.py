@@ -0,0 +1,81 @@
+# benchmarks/eval_fusion.py
+"""
+Offline fusion evaluation: recall@k against per-leg candidate depth.
+Uses known-item queries (a random word window taken from a chunk; the chunk
+itself is the relevant answer), so no labelled data is needed. Dense search
+is brute force over the chunk embeddings, lexical search uses BM25Index.
+Usage:
+    python -m benchmarks.eval_fusion --data_dir sample_data --k 5 --depths 5 10 20 40
+"""
+import argparse
+import random
+
+import numpy as np
+
+from src import fusion
+from src.bm25_index import BM25Index
+from src.embeddings import EmbeddingModel
+from benchmarks.bench_bm25 import load_chunks
+
+
+def make_queries(chunks, n_queries: int, window: int = 12, seed: int = 0):
+    rng = random.Random(seed)
+    queries = []
+    for doc in rng.sample(range(len(chunks)), min(n_queries, len(chunks))):
+        words = chunks[doc][1]["text"].split()
+        if len(words) < window:
+            continue
+        start = rng.randrange(0, len(words) - window + 1)
+        queries.append((" ".join(words[start:start + window]), doc))
+    return queries
+
+
+def evaluate(data_dir: str = "sample_data", k: int = 5, depths=(5, 10, 20, 40), n_queries: int = 200,
+             weights=(0.55, 0.45), em=None):
+    chunks = load_chunks(data_dir)
+    em = em or EmbeddingModel()
+    texts = [c["text"] for _, c in chunks]
+    doc_vecs = em.embed_texts(texts)
+    doc_vecs /= np.linalg.norm(doc_vecs, axis=1, keepdims=True) + 1e-12
+
+    bm25 = BM25Index()
+    for i, text in enumerate(texts):
+        bm25.add(i, text)
+
+    queries = make_queries(chunks, n_queries)
+    q_vecs = em.embed_texts([q for q, _ in queries])
+    q_vecs /= np.linalg.norm(q_vecs, axis=1, keepdims=True) + 1e-12
+    max_depth = max(depths)
+    dense_scores = q_vecs @ doc_vecs.T
+    dense_top = np.argsort(-dense_scores, axis=1)[:, :max_depth]
+    lexical = [bm25.search(q, k=max_depth) for q, _ in queries]
+
+    rows = []
+    for depth in depths:
+        for method in fusion.METHODS:
+            hits = 0
+            for qi, (_, target) in enumerate(queries):
+                d_ids = dense_top[qi, :depth]
+                legs = [
+                    (d_ids, dense_scores[qi, d_ids]),
+                    (np.array([h["id"] for h in lexical[qi][:depth]], dtype=np.int64),
+                     np.array([h["score"] for h in lexical[qi][:depth]])),
+                ]
+                ids, _ = fusion.fuse(legs, method=method, weights=list(weights), top_k=k)
+                hits += int(target in ids.tolist())
+            rows.append({"depth": depth, "method": method, f"recall@{k}": hits / max(len(queries), 1)})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, default="sample_data")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = evaluate(args.data_dir, args.k, args.depths, args.queries)
+    print(f"{'depth':>6} {'method':>8} {'recall@' + str(args.k):>10}")
+    for r in rows:
+        print(f"{r['depth']:>6} {r['method']:>8} {r[f'recall@{args.k}']:>10.3f}")
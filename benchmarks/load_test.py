@@ -0,0 +1,156 @@
+# benchmarks/load_test.py
+"""
+API load test across worker counts. For each --workers value the prefork
+server (src/serve.py) is started, warmed up and driven by --concurrency
+client threads for --duration seconds. Reports throughput, latency
+percentiles, the spread of requests over workers (from /workers) and the
+memory of the whole server: 'rss_mb' counts shared pages once per process,
+'pss_mb' splits them between sharers, so pss_mb well below rss_mb means
+the model weights are shared copy-on-write. The server runs with the query,
+answer and rerank caches off, so every request does the full retrieve and
+generate work instead of replaying the few fixed QUESTIONS from a cache.
+Usage:
+    python -m benchmarks.load_test --workers 1,2,4 --concurrency 16 --duration 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "What problem does the paper address?",
+    "Which datasets are used in the experiments?",
+    "How does the proposed method compare to the baselines?",
+    "What are the limitations mentioned by the authors?",
+]
+
+
+def process_tree(pid: int):
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory_mb(pids):
+    """
+    (rss, pss) in MB summed over pids, from /proc/<pid>/smaps_rollup (Linux).
+    """
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def wait_ready(base_url: str, workers: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            rows = httpx.get(f"{base_url}/workers", timeout=5).json()["workers"]
+            if sum(1 for r in rows if r["pid"]) >= workers:
+                return
+        except (httpx.TransportError, ValueError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"server with {workers} workers not ready after {timeout}s")
+
+
+def drive(base_url: str, path: str, top_k: int, concurrency: int, duration: float):
+    latencies = []
+    errors = []
+    stop = time.perf_counter() + duration
+
+    def client(n):
+        with httpx.Client(base_url=base_url, timeout=120) as http:
+            i = n
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    res = http.post(path, json={"question": QUESTIONS[i % len(QUESTIONS)], "top_k": top_k})
+                    res.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors.append(1)
+                i += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies) * 1000, len(errors), time.perf_counter() - start
+
+
+def run(workers=(1, 2, 4), concurrency: int = 16, duration: float = 30, path: str = "/query", top_k: int = 5,
+        port: int = 8100, threads: int = 0, startup_timeout: float = 300):
+    rows = []
+    for n in workers:
+        cmd = [sys.executable, "-m", "src.serve", "--workers", str(n), "--port", str(port),
+               "--host", "127.0.0.1", "--threads", str(threads), "--log_level", "warning"]
+        env = dict(os.environ, RUN_JOBS="0", QUERY_CACHE_SIZE="0", ANSWER_CACHE_SIZE="0", RERANK_CACHE_SIZE="0")
+        server = subprocess.Popen(cmd, env=env)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(base_url, n, startup_timeout)
+            drive(base_url, path, top_k, n, 5)       # warm-up, not measured
+            before = {r["pid"]: r["requests"] for r in httpx.get(f"{base_url}/workers").json()["workers"]}
+            lat, errors, seconds = drive(base_url, path, top_k, concurrency, duration)
+            per_worker = [r["requests"] - before.get(r["pid"], 0)
+                          for r in httpx.get(f"{base_url}/workers").json()["workers"]]
+            rss, pss = memory_mb(process_tree(server.pid))
+        finally:
+            server.terminate()
+            server.wait(30)
+        rows.append({
+            "workers": n,
+            "req_per_s": len(lat) / seconds,
+            "p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+            "p95_ms": float(np.percentile(lat, 95)) if len(lat) else 0.0,
+            "errors": errors,
+            # /workers requests are counted too, hence the small surplus
+            "min_worker_req": min(per_worker),
+            "max_worker_req": max(per_worker),
+            "rss_mb": rss,
+            "pss_mb": pss,
+        })
+    base = rows[0]["req_per_s"] or 1.0
+    for r in rows:
+        r["speedup"] = r["req_per_s"] / base
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=str, default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--path", type=str, default="/query")
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (0 = cores / workers)")
+    args = parser.parse_args()
+
+    rows = run([int(w) for w in args.workers.split(",")], args.concurrency, args.duration, args.path,
+               args.top_k, args.port, args.threads)
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>14}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{r[c]:>14.3f}" if isinstance(r[c], float) else f"{r[c]:>14}" for c in cols))
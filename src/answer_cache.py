@@ -0,0 +1,175 @@
+# src/answer_cache.py
+"""
+Semantic TTL + LRU cache for generated answers.
+Questions are embedded with the shared MiniLM encoder; a new question hits
+when a cached question is at least ANSWER_CACHE_THRESHOLD cosine-similar
+and was answered from the same set of retrieved chunks, so paraphrases are
+served without running the generator. Vectors sit in one preallocated
+matrix searched with a single matrix-vector product, which at this size is
+exact and cheaper than an approximate index. Chunks are identified by their
+content-derived point ids, so a re-uploaded file with new text never matches
+answers built from the old one. Like QueryCache, entries are tagged with the
+index generation and dropped once ingestion bumps it; an answer generated
+across a bump is not stored.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .embedding_cache import normalize_text
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 512))             # 0 disables
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 3600))           # seconds
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))  # cosine similarity
+
+
+def _shared_encode(text: str):
+    from .embeddings import shared_model
+    return shared_model().encode(text, show_progress_bar=False)
+
+
+class _Entry:
+    __slots__ = ("question", "chunks", "answer", "seconds", "expires")
+
+    def __init__(self, question, chunks, answer, seconds, expires):
+        self.question = question
+        self.chunks = chunks
+        self.answer = answer
+        self.seconds = seconds      # generation time a hit saves
+        self.expires = expires
+
+
+class AnswerCache:
+    def __init__(self, generation_fn, embed_fn=None, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        """
+        generation_fn: callable returning the current index generation.
+        embed_fn: text -> vector (default: the process-wide MiniLM).
+        """
+        self.generation_fn = generation_fn
+        self.embed_fn = embed_fn or _shared_encode
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+        self._generation = None
+        self._vectors = None             # (max_entries, dim), allocated on first put
+        self._entries = OrderedDict()    # row -> _Entry, least recently used first
+        self._free = list(range(max_entries - 1, -1, -1))   # unused rows
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chunk_key(retrieved) -> frozenset:
+        """
+        Identity of the context an answer was generated from: point ids
+        (which change with the chunk text), or (source, chunk_id) for hits without one.
+        """
+        metas = [r.get("meta") or r for r in retrieved]
+        return frozenset(m["id"] if m.get("id") is not None else (m.get("source"), m.get("chunk_id"))
+                         for m in metas)
+
+    def embed(self, question: str):
+        v = np.asarray(self.embed_fn(normalize_text(question)), dtype=np.float32).ravel()
+        return v / (np.linalg.norm(v) + 1e-12)
+
+    def _check_generation(self):
+        gen = self.generation_fn()
+        if gen != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._generation = gen
+
+    def _drop(self, row: int):
+        del self._entries[row]
+        self._free.append(row)
+
+    def _match(self, vector, chunks):
+        """
+        Most similar live entry above the threshold with the same chunk set.
+        """
+        if not self._entries:
+            return None
+        rows = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+        sims = self._vectors[rows] @ vector
+        now = time.monotonic()
+        for i in np.argsort(-sims):
+            if sims[i] < self.threshold:
+                break
+            row = int(rows[i])
+            entry = self._entries[row]
+            if entry.expires < now:
+                self._drop(row)
+            elif entry.chunks == chunks:
+                return row
+        return None
+
+    def lookup(self, question: str, retrieved):
+        """
+        (cached answer or None, question vector, index generation). Pass the
+        vector and generation on to put() after a miss, so the question is not
+        embedded twice and an answer that overlapped ingestion is dropped.
+        """
+        if self.max_entries <= 0:
+            return None, None, None
+        start = time.perf_counter()
+        vector = self.embed(question)
+        chunks = self.chunk_key(retrieved)
+        with self._lock:
+            self._check_generation()
+            generation = self._generation
+            row = self._match(vector, chunks)
+            self.lookup_seconds += time.perf_counter() - start
+            if row is None:
+                self.misses += 1
+                return None, vector, generation
+            entry = self._entries[row]
+            self._entries.move_to_end(row)
+            self.hits += 1
+            self.saved_seconds += entry.seconds
+            return entry.answer, vector, generation
+
+    def put(self, question: str, retrieved, answer: str, seconds: float = 0.0, vector=None, generation=None):
+        """
+        Cache answer; seconds is what producing it cost (counted as saved on each hit).
+        Skipped when generation (from lookup()) is no longer current.
+        """
+        if self.max_entries <= 0:
+            return
+        vector = self.embed(question) if vector is None else vector
+        chunks = self.chunk_key(retrieved)
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            row = self._match(vector, chunks)
+            if row is None:
+                if not self._free:
+                    self._drop(next(iter(self._entries)))
+                row = self._free.pop()
+            self._vectors[row] = vector
+            self._entries[row] = _Entry(question, chunks, answer, seconds, time.monotonic() + self.ttl)
+            self._entries.move_to_end(row)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+            "saved_seconds": self.saved_seconds,
+            "mean_lookup_ms": 1000 * self.lookup_seconds / total if total else 0.0,
+            "generation": self._generation,
+        }
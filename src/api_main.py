@@ -1,40 +1,209 @@
 # src/api_main.py
 """
 FastAPI production-style endpoints (ingest & query). This is a skeleton for extension.
+Models load on first use; set MODEL_WARMUP (e.g. "embedder,reranker,generator")
+to load them at startup instead.
 Run with:
     uvicorn src.api_main:app --reload --host 0.0.0.0 --port 8000
+or, one process per core sharing the loaded models (see serve.py):
+    python -m src.serve --workers 4 --port 8000
+Stage latency histograms are exported for Prometheus at /metrics; pass
+"timings": true in a query for that request's own breakdown (see tracing.py).
 """
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import iterate_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 import os
-from .ingest import index_folder
+import json
+import time
+from .ingest import index_folder, INGEST_WORKERS
+from .jobs import JobQueue
 from .retriever_hybrid import HybridRetriever
 from .generation_strict import StrictGenerator
+from .generation_scheduler import GenerationScheduler
+from .model_registry import registry, warmup, MODEL_WARMUP
+from .worker_stats import WorkerStats
+from .answer_cache import AnswerCache
+from .manifest import current_generation
+from . import tracing
 
 app = FastAPI(title='Research Assistant API')
 retriever = HybridRetriever()
 generator = StrictGenerator()
+# repeated / paraphrased questions over the same chunks skip generation
+answer_cache = AnswerCache(generation_fn=lambda: current_generation(retriever.collection))
+# concurrent /query requests are micro-batched through the generator
+scheduler = GenerationScheduler(generator, cache=answer_cache)
+# replaced by serve.py with one shared across the forked workers
+worker_stats = WorkerStats()
+# only one process may run the ingest job workers (serve.py: worker 0)
+RUN_JOBS = os.getenv('RUN_JOBS', '1') == '1'
+
+def run_ingest_job(args, progress):
+    """
+    Job handler: incremental index of args['data_dir'].
+    PDF parsing always runs in worker processes so it does not hold the GIL
+    of the API process while queries are being served.
+    """
+    return index_folder(args['data_dir'], workers=INGEST_WORKERS or 1, progress=progress)
+
+jobs = JobQueue(handlers={'ingest': run_ingest_job})
 
 class QueryRequest(BaseModel):
     question: str
     top_k: int = 5
+    timings: bool = False   # include the per-stage latency breakdown (ms)
+
+@app.on_event('startup')
+def start_jobs():
+    if RUN_JOBS:
+        jobs.start()
+
+@app.on_event('startup')
+def warm_models():
+    warmup(MODEL_WARMUP)
+
+@app.middleware('http')
+async def count_requests(request: Request, call_next):
+    worker_stats.begin()
+    error = True
+    try:
+        response = await call_next(request)
+        error = response.status_code >= 500
+        return response
+    finally:
+        worker_stats.end(error=error)
 
 @app.post('/upload')
 async def upload_pdf(file: UploadFile = File(...)):
     """
-    Save uploaded PDF then call indexer immediately (blocking). In production, enqueue a background job.
+    Save uploaded PDF and enqueue an ingest job. Poll /jobs/{job_id} for progress.
     """
     out_path = os.path.join('sample_data', file.filename)
     with open(out_path, 'wb') as f:
         f.write(await file.read())
-    index_folder('sample_data')
-    return {'status': 'indexed', 'filename': file.filename}
+    job_id = jobs.submit('ingest', {'data_dir': 'sample_data', 'filename': file.filename})
+    return {'status': 'queued', 'job_id': job_id, 'filename': file.filename}
+
+@app.get('/jobs/{job_id}')
+def get_job(job_id: str):
+    """
+    Job status and progress counters (pages, chunks, embedded, upserted).
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    return job
+
+@app.get('/stats')
+def stats():
+    """
+    Cache and generation batching statistics (queue depth, batch sizes) and
+    model load times for monitoring.
+    """
+    return {'query_cache': retriever.cache.stats(), 'answer_cache': answer_cache.stats(),
+            'generation': scheduler.stats(),
+            'model_load_seconds': registry.stats(), 'worker': worker_stats.index}
+
+@app.get('/workers')
+def workers():
+    """
+    Request counters of every serving worker (requests, in flight, errors).
+    """
+    return {'workers': worker_stats.snapshot()}
+
+@app.get('/metrics')
+def metrics():
+    """
+    Prometheus text exposition: per-stage latency histograms of this worker,
+    request counters of all workers, generation queue, query and answer caches.
+    """
+    gen = scheduler.stats()
+    cache = retriever.cache.stats()
+    answers = answer_cache.stats()
+    rows = worker_stats.snapshot()
+    extra = [
+        ('worker_requests_total', 'counter', 'HTTP requests handled per worker.',
+         [({'worker': r['worker']}, r['requests']) for r in rows]),
+        ('worker_errors_total', 'counter', 'HTTP requests answered with a 5xx per worker.',
+         [({'worker': r['worker']}, r['errors']) for r in rows]),
+        ('worker_in_flight', 'gauge', 'Requests in progress per worker.',
+         [({'worker': r['worker']}, r['in_flight']) for r in rows]),
+        ('generation_queue_depth', 'gauge', 'Generation requests waiting for a batch.',
+         [({}, gen['queue_depth'])]),
+        ('generation_requests_total', 'counter', 'Generation requests served.', [({}, gen['requests'])]),
+        ('generation_batches_total', 'counter', 'Generation batches run.', [({}, gen['batches'])]),
+        ('query_cache_hits_total', 'counter', 'Retrieval cache hits.', [({}, cache['hits'])]),
+        ('query_cache_misses_total', 'counter', 'Retrieval cache misses.', [({}, cache['misses'])]),
+        ('query_cache_entries', 'gauge', 'Retrieval cache entries.', [({}, cache['entries'])]),
+        ('answer_cache_hits_total', 'counter', 'Answers served from the semantic cache.', [({}, answers['hits'])]),
+        ('answer_cache_misses_total', 'counter', 'Semantic cache misses.', [({}, answers['misses'])]),
+        ('answer_cache_saved_seconds_total', 'counter', 'Generation time saved by semantic cache hits.',
+         [({}, answers['saved_seconds'])]),
+        ('answer_cache_entries', 'gauge', 'Semantic cache entries.', [({}, answers['entries'])]),
+    ]
+    # histograms and generation / cache metrics are this worker's; the shared
+    # request counters keep the worker label of their own row
+    text = tracing.render_prometheus(extra, labels={'worker': worker_stats.index})
+    return PlainTextResponse(text, media_type='text/plain; version=0.0.4')
 
 @app.post('/query')
 async def query(req: QueryRequest):
     """
-    Query endpoint: returns answer + candidates list.
+    Query endpoint: returns answer + candidates list, plus how much of the
+    retrieved context fit the generator's token budget ('context') and,
+    with timings=true, the per-stage latency breakdown in ms ('timings').
     """
-    candidates = retriever.merge_and_rerank(req.question, top_k=req.top_k)
-    answer = generator.generate(req.question, candidates)
-    return {'answer': answer, 'candidates': candidates}
\ No newline at end of file
+    with tracing.collect() as timings, tracing.span('query'):
+        candidates = await retriever.amerge_and_rerank(req.question, top_k=req.top_k)
+        retrieved = retriever.convert_for_generator(candidates)
+        report = {}
+        answer = await scheduler.agenerate(req.question, retrieved, report=report)
+    out = {'answer': answer, 'candidates': candidates, 'context': report}
+    if req.timings:
+        out['timings'] = tracing.as_ms(timings)
+    return out
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post('/query/stream')
+async def query_stream(req: QueryRequest):
+    """
+    Streaming query as Server-Sent Events: one 'candidates' event, a 'token'
+    event per generated text piece, then 'done' with retrieval time,
+    time-to-first-token, total latency (ms, measured from the request) and
+    the context packing stats; with timings=true also the per-stage
+    breakdown ('timings', ms).
+    """
+    start = time.perf_counter()
+    with tracing.collect() as timings:
+        candidates = await retriever.amerge_and_rerank(req.question, top_k=req.top_k)
+    retrieval_s = time.perf_counter() - start
+    retrieved = retriever.convert_for_generator(candidates)
+
+    async def events():
+        yield sse_event('candidates', candidates)
+        ttft = None
+        report = {}
+        # the response body runs in its own task: re-bind the breakdown
+        tracing.bind(timings)
+        async for piece in iterate_in_threadpool(generator.stream(req.question, retrieved, report=report)):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            yield sse_event('token', {'text': piece})
+        total = time.perf_counter() - start
+        tracing.record('query_stream', total)
+        done = {
+            'retrieval_ms': retrieval_s * 1000,
+            'ttft_ms': (ttft if ttft is not None else total) * 1000,
+            'total_ms': total * 1000,
+            'context': report,
+        }
+        if req.timings:
+            done['timings'] = tracing.as_ms(timings)
+        yield sse_event('done', done)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -66,10 +66,12 @@ Gradio demo: upload PDFs, index them, and chat using RAG pipeline.
 import gradio as gr
 from pathlib import Path
 import shutil
+import time
 
 from .ingest import index_folder
 from .retriever_hybrid import HybridRetriever
 from .generation_strict import StrictGenerator
+from .model_registry import warmup, MODEL_WARMUP
 
 COLLECTION = 'papers'
 
@@ -109,17 +111,34 @@ def index_uploaded(files):
 
 def answer_question(query: str):
     """
-    Retrieve and generate answer for a given query.
+    Retrieve and generate answer for a given query. Yields the partial
+    answer as tokens stream in, then the sources and timings.
     """
+    start = time.perf_counter()
     raw = retriever.merge_and_rerank(query, top_k=5)
     retrieved = retriever.convert_for_generator(raw)   # 🔥 MUST FIX
-    answer = generator.generate(query, retrieved)
+    retrieval_s = time.perf_counter() - start
+
+    answer = ''
+    ttft = None
+    report = {}
+    for piece in generator.stream(query, retrieved, report=report):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        answer += piece
+        yield answer
+    total = time.perf_counter() - start
 
     sources = '\n'.join([
         f"- {r['meta'].get('source')} (chunk {r['meta'].get('chunk_id')})"
         for r in retrieved
     ])
-    return answer + '\n\nRetrieved sources:\n' + sources
+    timings = (f"retrieval {retrieval_s * 1000:.0f} ms · first token {(ttft or total) * 1000:.0f} ms"
+               f" · total {total * 1000:.0f} ms")
+    if report:
+        timings += (f"\nContext: {report['passages']} passages, {report['packed_tokens']} tokens packed,"
+                    f" {report['dropped_tokens']} dropped, {report['duplicate_tokens']} duplicate")
+    yield answer + '\n\nRetrieved sources:\n' + sources + '\n\n' + timings
 
 
 def build_ui():
@@ -144,5 +163,6 @@ def build_ui():
 
 
 if __name__ == "__main__":
+    warmup(MODEL_WARMUP)
     demo = build_ui()
     demo.launch(server_name="0.0.0.0", server_port=7860)
\ No newline at end of file
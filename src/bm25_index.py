@@ -0,0 +1,216 @@
+# src/bm25_index.py
+"""
+In-process BM25 inverted index backing HybridRetriever.bm25_search.
+Postings are compact typed arrays (doc numbers + term frequencies) that are
+scored with NumPy. Documents can be added and deleted incrementally; the
+index is persisted as a single .npz file next to the other index data.
+"""
+import json
+import math
+import os
+import re
+import logging
+from array import array
+
+import numpy as np
+
+from .manifest import INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+# Rebuild postings once this fraction of documents has been deleted.
+COMPACT_RATIO = 0.25
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(text.lower())
+
+
+def bm25_path(collection: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"bm25_{collection}.npz")
+
+
+class BM25Index:
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}             # term -> (array('i') doc numbers, array('i') term freqs)
+        self.point_ids = array("q")    # doc number -> point id
+        self.doc_len = array("i")      # doc number -> token count
+        self.alive = array("b")        # doc number -> 0 once deleted
+        self.payloads = []             # doc number -> payload dict
+        self.doc_of = {}               # point id -> doc number
+        self.total_len = 0
+        self.n_deleted = 0
+
+    def __len__(self):
+        return len(self.doc_of)
+
+    # ----------------------
+    # MUTATION
+    # ----------------------
+    def add(self, point_id: int, text: str, payload: dict = None):
+        """
+        Add (or replace) a document.
+        """
+        if point_id in self.doc_of:
+            self.delete([point_id])
+        doc = len(self.point_ids)
+        terms = tokenize(text)
+        counts = {}
+        for t in terms:
+            counts[t] = counts.get(t, 0) + 1
+        for t, tf in counts.items():
+            entry = self.postings.get(t)
+            if entry is None:
+                entry = self.postings[t] = (array("i"), array("i"))
+            entry[0].append(doc)
+            entry[1].append(tf)
+        self.point_ids.append(point_id)
+        self.doc_len.append(len(terms))
+        self.alive.append(1)
+        self.payloads.append(payload or {})
+        self.doc_of[point_id] = doc
+        self.total_len += len(terms)
+
+    def delete(self, point_ids):
+        """
+        Tombstone documents by point id; postings are compacted lazily.
+        """
+        for pid in point_ids:
+            doc = self.doc_of.pop(pid, None)
+            if doc is None:
+                continue
+            self.alive[doc] = 0
+            self.total_len -= self.doc_len[doc]
+            self.n_deleted += 1
+        if self.n_deleted and self.n_deleted > COMPACT_RATIO * len(self.point_ids):
+            self.compact()
+
+    def compact(self):
+        """
+        Drop tombstoned documents and renumber the rest.
+        """
+        alive = np.frombuffer(self.alive, dtype=np.int8).astype(bool)
+        remap = np.cumsum(alive) - 1
+        new_postings = {}
+        for t, (docs, tfs) in self.postings.items():
+            d = np.frombuffer(docs, dtype=np.int32)
+            keep = alive[d]
+            if not keep.any():
+                continue
+            new_postings[t] = (array("i", remap[d[keep]].astype(np.int32).tobytes()),
+                               array("i", np.frombuffer(tfs, dtype=np.int32)[keep].tobytes()))
+        keep_docs = np.flatnonzero(alive)
+        self.postings = new_postings
+        self.point_ids = array("q", np.frombuffer(self.point_ids, dtype=np.int64)[keep_docs].tobytes())
+        self.doc_len = array("i", np.frombuffer(self.doc_len, dtype=np.int32)[keep_docs].tobytes())
+        self.alive = array("b", [1]) * len(keep_docs)
+        self.payloads = [self.payloads[i] for i in keep_docs.tolist()]
+        self.doc_of = {pid: i for i, pid in enumerate(self.point_ids)}
+        self.n_deleted = 0
+
+    # ----------------------
+    # SEARCH
+    # ----------------------
+    def search(self, query: str, k: int = 10):
+        """
+        Returns list of {'id', 'score', 'payload'} sorted by BM25 score.
+        """
+        n_docs = len(self.doc_of)
+        if n_docs == 0:
+            return []
+        n_slots = len(self.point_ids)
+        alive = np.frombuffer(self.alive, dtype=np.int8)
+        doc_len = np.frombuffer(self.doc_len, dtype=np.int32)
+        avgdl = self.total_len / n_docs if self.total_len else 1.0
+        scores = np.zeros(n_slots, dtype=np.float32)
+        touched = False
+
+        for t in set(tokenize(query)):
+            entry = self.postings.get(t)
+            if entry is None:
+                continue
+            docs = np.frombuffer(entry[0], dtype=np.int32)
+            tf = np.frombuffer(entry[1], dtype=np.int32).astype(np.float32)
+            df = int(alive[docs].sum()) if self.n_deleted else len(docs)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[docs] / avgdl)
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+            touched = True
+
+        if not touched:
+            return []
+        if self.n_deleted:
+            scores[alive == 0] = 0.0
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {"id": int(self.point_ids[d]), "score": float(scores[d]), "payload": self.payloads[d]}
+            for d in top.tolist()
+        ]
+
+    # ----------------------
+    # PERSISTENCE
+    # ----------------------
+    def save(self, path: str):
+        """
+        Write the index as one .npz (postings in CSR form), replaced atomically.
+        """
+        if self.n_deleted:
+            self.compact()
+        terms = list(self.postings.keys())
+        lengths = np.array([len(self.postings[t][0]) for t in terms], dtype=np.int64)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        docs = np.concatenate([np.frombuffer(self.postings[t][0], dtype=np.int32) for t in terms]) \
+            if terms else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate([np.frombuffer(self.postings[t][1], dtype=np.int32) for t in terms]) \
+            if terms else np.zeros(0, dtype=np.int32)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            docs=docs,
+            tfs=tfs,
+            point_ids=np.frombuffer(self.point_ids, dtype=np.int64),
+            doc_len=np.frombuffer(self.doc_len, dtype=np.int32),
+            payloads=np.array(json.dumps(self.payloads)),
+            params=np.array([self.k1, self.b]),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load an index saved with save(); returns an empty index if missing.
+        """
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            offsets = data["offsets"]
+            docs, tfs = data["docs"], data["tfs"]
+            for i, t in enumerate(data["terms"].tolist()):
+                lo, hi = offsets[i], offsets[i + 1]
+                index.postings[t] = (array("i", docs[lo:hi].tobytes()), array("i", tfs[lo:hi].tobytes()))
+            index.point_ids = array("q", data["point_ids"].astype(np.int64).tobytes())
+            index.doc_len = array("i", data["doc_len"].astype(np.int32).tobytes())
+            index.payloads = json.loads(str(data["payloads"]))
+        index.alive = array("b", [1]) * len(index.point_ids)
+        index.doc_of = {pid: i for i, pid in enumerate(index.point_ids)}
+        index.total_len = int(sum(index.doc_len))
+        return index
@@ -0,0 +1,30 @@
+# src/chunk_store.py
+"""
+Local chunk text store, keyed by point id.
+The vector store and BM25 index keep only ids and small metadata in their
+payloads; chunk text lives here (an append-only, memory-mapped file with an
+offset index, see record_store.py) and is hydrated only for the hits that
+need it.
+"""
+import os
+
+from .manifest import INDEX_DIR
+from .record_store import RecordStore
+
+
+def chunk_store_path(collection: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"chunks_{collection}")
+
+
+class ChunkStore(RecordStore):
+    def put_texts(self, items):
+        """
+        items: iterable of (point_id, text)
+        """
+        self.put_many((pid, text.encode("utf-8")) for pid, text in items)
+
+    def texts(self, point_ids):
+        """
+        Chunk texts in point_ids order; '' for unknown ids.
+        """
+        return [(data or b"").decode("utf-8") for data in self.get_many(point_ids)]
@@ -0,0 +1,130 @@
+# src/chunker.py
+"""
+Token-aware chunker driven by the embedding model's tokenizer.
+The document is tokenized once; chunk windows are chosen on the token
+offset arrays (sized to the encoder's max sequence length, with overlap in
+tokens) and snapped back to the nearest section or sentence boundary.
+Chunk text is sliced from the original string by character offsets.
+"""
+import os
+import re
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Tokens per chunk including special tokens (all-MiniLM-L6-v2 truncates at 256).
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 256))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 32))
+# A window is only cut at a boundary that keeps at least this fraction of it.
+MIN_FILL = 0.5
+
+# section break: blank line, or a line starting with a numbered / all-caps heading
+_SECTION = re.compile(r"\n[ \t]*\n\s*|\n(?=(?:\d+(?:\.\d+)*\.?|[IVX]+\.)[ \t]+[A-Z])|\n(?=[A-Z][A-Z \t]{3,}\n)")
+_SENTENCE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def _boundaries(pattern, text: str) -> np.ndarray:
+    return np.fromiter((m.end() for m in pattern.finditer(text)), dtype=np.int64)
+
+
+def split_sentences(text: str):
+    """
+    Split text at sentence and section boundaries; pieces keep their
+    trailing whitespace so ''.join(pieces) == text.
+    """
+    cuts = sorted(set(_boundaries(_SENTENCE, text).tolist()) | set(_boundaries(_SECTION, text).tolist()))
+    pieces, prev = [], 0
+    for cut in cuts + [len(text)]:
+        if cut > prev:
+            pieces.append(text[prev:cut])
+            prev = cut
+    return pieces
+
+
+class TokenChunker:
+    def __init__(self, tokenizer=None, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+        """
+        tokenizer: a fast HF tokenizer (offset mapping support); None falls
+        back to word/punctuation tokens.
+        """
+        self.tokenizer = tokenizer
+        specials = tokenizer.num_special_tokens_to_add() if tokenizer is not None else 0
+        self.max_tokens = max(1, max_tokens - specials)
+        self.overlap = min(overlap, self.max_tokens // 2)
+
+    def token_offsets(self, text: str):
+        """
+        (starts, ends) character offsets of every token, as int64 arrays.
+        """
+        if self.tokenizer is None:
+            spans = np.array([m.span() for m in _WORD.finditer(text)], dtype=np.int64).reshape(-1, 2)
+        else:
+            enc = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+            spans = np.asarray(enc["offset_mapping"], dtype=np.int64).reshape(-1, 2)
+        return spans[:, 0], spans[:, 1]
+
+    def chunk(self, text: str):
+        """
+        Returns list of {'chunk_id', 'text', 'start', 'end', 'n_tokens'};
+        start/end are character offsets into text.
+        """
+        starts, ends = self.token_offsets(text)
+        n = len(starts)
+        if n == 0:
+            return []
+        # boundaries as token indices: the first token at/after each break
+        sections = np.unique(np.searchsorted(starts, _boundaries(_SECTION, text)))
+        sentences = np.unique(np.concatenate([sections, np.searchsorted(starts, _boundaries(_SENTENCE, text))]))
+
+        chunks = []
+        lo = 0
+        while lo < n:
+            hi = min(lo + self.max_tokens, n)
+            if hi < n:
+                hi = self._snap(sections, lo, hi) or self._snap(sentences, lo, hi) or hi
+            chunks.append({
+                "chunk_id": len(chunks),
+                "text": text[starts[lo]:ends[hi - 1]],
+                "start": int(starts[lo]),
+                "end": int(ends[hi - 1]),
+                "n_tokens": int(hi - lo),
+            })
+            if hi >= n:
+                break
+            # overlap in tokens, starting at a sentence start when there is one
+            nxt = max(hi - self.overlap, lo + 1)
+            i = np.searchsorted(sentences, nxt)
+            if i < len(sentences) and sentences[i] < hi:
+                nxt = int(sentences[i])
+            lo = nxt
+        return chunks
+
+    def _snap(self, bounds: np.ndarray, lo: int, hi: int):
+        """
+        Last boundary in (lo + MIN_FILL * max_tokens, hi], or None.
+        """
+        i = np.searchsorted(bounds, hi, side="right") - 1
+        if i >= 0 and bounds[i] > lo + MIN_FILL * self.max_tokens:
+            return int(bounds[i])
+        return None
+
+
+@lru_cache(maxsize=4)
+def get_chunker(model_name: str = EMBEDDING_MODEL, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+    """
+    TokenChunker over the embedding model's tokenizer, loaded once per process.
+    """
+    from transformers import AutoTokenizer
+    from .embeddings import canonical_model_name
+    name = canonical_model_name(model_name)
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(name, use_fast=True)
+    except Exception as e:
+        logger.warning("Tokenizer %s unavailable (%s); chunking on word tokens", name, e)
+        tokenizer = None
+    return TokenChunker(tokenizer, max_tokens=max_tokens, overlap=overlap)
@@ -0,0 +1,101 @@
+# src/context_packer.py
+"""
+Token-budgeted context packing for StrictGenerator.
+Retrieved passages are added in rank order until the generator's input
+budget is used up. Sentences already packed from an earlier passage
+(overlapping neighbour chunks, duplicates) are skipped, and a passage that
+does not fit whole is trimmed at a sentence boundary. Token counts use the
+generator tokenizer; each sentence is tokenized once per request.
+"""
+import os
+import re
+
+from .chunker import split_sentences
+
+# Max encoder input tokens (flan-t5 truncates at 512).
+GEN_MAX_INPUT_TOKENS = int(os.getenv("GEN_MAX_INPUT_TOKENS", 512))
+# Sentences shorter than this many words are never treated as duplicates.
+DEDUP_MIN_WORDS = 3
+
+_SPACE = re.compile(r"\s+")
+
+
+def _norm(sentence: str) -> str:
+    return _SPACE.sub(" ", sentence).strip().lower()
+
+
+class ContextPacker:
+    def __init__(self, tokenizer, max_input_tokens: int = GEN_MAX_INPUT_TOKENS):
+        self.tokenizer = tokenizer
+        limit = getattr(tokenizer, "model_max_length", None)
+        if isinstance(limit, int) and 0 < limit < max_input_tokens:
+            max_input_tokens = limit
+        self.max_input_tokens = max_input_tokens
+
+    def count(self, texts):
+        """
+        Token count per text (no special tokens).
+        """
+        if not texts:
+            return []
+        ids = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(x) for x in ids]
+
+    def pack(self, retrieved, overhead_tokens: int, tag_fn, separator: str = "\n---\n"):
+        """
+        retrieved: ranked passages ({'meta': {..., 'text'}}).
+        overhead_tokens: prompt tokens outside the context block.
+        tag_fn: meta -> block header (e.g. '[DOC:a.pdf|chunk:3]\\n').
+        Returns (packed passages with trimmed text, report dict).
+        """
+        budget = self.max_input_tokens - overhead_tokens - 1   # </s>
+        metas = [r.get("meta") or r for r in retrieved]
+        sentences = [split_sentences(m.get("text") or "") for m in metas]
+        flat = [s for sents in sentences for s in sents]
+        counts = iter(self.count(flat + [tag_fn(m) for m in metas] + [separator]))
+        sent_tokens = [[next(counts) for _ in sents] for sents in sentences]
+        tag_tokens = [next(counts) for _ in metas]
+        sep_tokens = next(counts) if metas else 0
+
+        seen = set()
+        packed = []
+        used = 0
+        report = {"budget_tokens": budget, "packed_tokens": 0, "dropped_tokens": 0,
+                  "duplicate_tokens": 0, "passages": 0, "trimmed_passages": 0, "dropped_passages": 0}
+        for meta, sents, toks, tag in zip(metas, sentences, sent_tokens, tag_tokens):
+            # drop sentences already packed from a higher-ranked passage
+            keep, keep_tokens = [], 0
+            for sent, n in zip(sents, toks):
+                key = _norm(sent)
+                if len(key.split()) >= DEDUP_MIN_WORDS and key in seen:
+                    report["duplicate_tokens"] += n
+                    continue
+                keep.append((sent, n, key))
+                keep_tokens += n
+            cost = tag + (sep_tokens if packed else 0)
+            room = budget - used - cost
+            if not keep or room <= 0:
+                report["dropped_passages"] += 1
+                report["dropped_tokens"] += keep_tokens
+                continue
+            # trim at the last sentence that still fits
+            taken, taken_tokens = [], 0
+            for sent, n, key in keep:
+                if taken_tokens + n > room:
+                    break
+                taken.append((sent, key))
+                taken_tokens += n
+            if not taken:
+                report["dropped_passages"] += 1
+                report["dropped_tokens"] += keep_tokens
+                continue
+            if len(taken) < len(keep):
+                report["trimmed_passages"] += 1
+            report["dropped_tokens"] += keep_tokens - taken_tokens
+            seen.update(key for _, key in taken)
+            used += cost + taken_tokens
+            packed.append({"meta": dict(meta, text="".join(s for s, _ in taken).strip())})
+            report["packed_tokens"] += taken_tokens
+            report["passages"] += 1
+        report["prompt_tokens"] = overhead_tokens + used + 1
+        return packed, report
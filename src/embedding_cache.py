@@ -0,0 +1,136 @@
+# src/embedding_cache.py
+"""
+Persistent embedding cache.
+Vectors live in a memory-mapped float32 array file (one row per slot); a
+compact index maps sha1(model, normalized text) -> slot in LRU order.
+When the cache is full the least recently used slot is reused. Each slot
+also records the key it holds, so an index saved before a slot was reused
+(e.g. after a crash) can not return another text's vector.
+"""
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from .manifest import INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(INDEX_DIR, "embed_cache"))
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 50000))   # max entries, 0 disables
+# Persist the index after this many new entries (and on flush()).
+SAVE_EVERY = 1024
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WS.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, cache_dir: str = EMBED_CACHE_DIR, max_entries: int = EMBED_CACHE_SIZE):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.keys_path = os.path.join(self.dir, "keys.bin")
+        self.index_path = os.path.join(self.dir, "index.npz")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._slots = OrderedDict()     # key (bytes) -> slot, least recently used first
+        os.makedirs(self.dir, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        shape = (self.max_entries, self.dim)
+        key_shape = (self.max_entries, 20)      # sha1 digest held by each slot
+        if all(os.path.exists(p) for p in (self.index_path, self.vectors_path, self.keys_path)):
+            idx = np.load(self.index_path)
+            if int(idx["dim"]) == self.dim and int(idx["capacity"]) == self.max_entries:
+                self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=shape)
+                self._row_keys = np.memmap(self.keys_path, dtype=np.uint8, mode="r+", shape=key_shape)
+                self._slots = OrderedDict(zip(idx["keys"].tolist(), idx["slots"].tolist()))
+                return
+            logger.info("Embedding cache layout changed, resetting %s", self.dir)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=shape)
+        self._row_keys = np.memmap(self.keys_path, dtype=np.uint8, mode="w+", shape=key_shape)
+        self._slots = OrderedDict()
+        self.save()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def get_many(self, texts):
+        """
+        Returns (vectors, missing): a (n, dim) array with cached rows filled
+        and the list of indices that were not in the cache.
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                k = self.key(text)
+                slot = self._slots.get(k)
+                if slot is not None and self._row_keys[slot].tobytes() != k:
+                    # slot reused after the index was last saved
+                    del self._slots[k]
+                    slot = None
+                if slot is None:
+                    missing.append(i)
+                    continue
+                self._slots.move_to_end(k)
+                out[i] = self._vectors[slot]
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return out, missing
+
+    def put_many(self, texts, vectors):
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                k = self.key(text)
+                slot = self._slots.get(k)
+                if slot is None:
+                    if len(self._slots) < self.max_entries:
+                        slot = len(self._slots)
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                self._slots[k] = slot
+                self._slots.move_to_end(k)
+                self._row_keys[slot] = np.frombuffer(k, dtype=np.uint8)
+                self._vectors[slot] = vec
+                self._unsaved += 1
+            if self._unsaved >= SAVE_EVERY:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        self._vectors.flush()
+        self._row_keys.flush()
+        keys = np.array(list(self._slots.keys()), dtype="S20")
+        slots = np.array(list(self._slots.values()), dtype=np.int32)
+        tmp = self.index_path + ".tmp.npz"
+        np.savez(tmp, keys=keys, slots=slots, dim=self.dim, capacity=self.max_entries)
+        os.replace(tmp, self.index_path)
+        self._unsaved = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -5,28 +5,133 @@ Wrapper around sentence-transformers for consistent embed interface.
 """
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import atexit
 import os
+from functools import cached_property
+
+from .embedding_cache import EmbeddingCache, EMBED_CACHE_SIZE
+from .inference_backend import EMBED_BACKEND, configure_threads, load_sentence_transformer
+from .model_registry import registry
 
 MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+
+
+def canonical_model_name(model_name: str) -> str:
+    """
+    'all-MiniLM-L6-v2' and 'sentence-transformers/all-MiniLM-L6-v2' are the same model.
+    """
+    if "/" in model_name or os.path.isdir(model_name):
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+def shared_model(model_name: str = MODEL, backend: str = EMBED_BACKEND):
+    """
+    SentenceTransformer shared by every user in the process (see model_registry.py).
+    """
+    def load():
+        if backend == "torch":
+            configure_threads()
+            return SentenceTransformer(model_name)
+        return load_sentence_transformer(model_name, backend)
+    return registry.get(("embedder", canonical_model_name(model_name), backend), load)
+
+
+def length_bucketed_batches(lengths, token_budget: int, max_batch_size: int = EMBED_BATCH_SIZE):
+    """
+    Group item indices into batches whose padded size (rows * longest row)
+    stays within token_budget. Items are visited longest first so each batch
+    holds texts of similar length and little compute is spent on padding.
+    Returns list of index lists.
+    """
+    order = np.argsort(-np.asarray(lengths, dtype=np.int64), kind="stable")
+    batches = []
+    current = []
+    longest = 0
+    for idx in order.tolist():
+        n_tokens = max(int(lengths[idx]), 1)
+        longest = max(longest, n_tokens)
+        if current and ((len(current) + 1) * longest > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            longest = n_tokens
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
 
 class EmbeddingModel:
-    def __init__(self, model_name: str = MODEL):
+    def __init__(self, model_name: str = MODEL, batch_size: int = EMBED_BATCH_SIZE, cache_size: int = EMBED_CACHE_SIZE,
+                 backend: str = EMBED_BACKEND):
         """
-        Initialize the SentenceTransformer model.
+        Embedding front-end; the SentenceTransformer itself is loaded on
+        first use and shared process-wide (see shared_model).
+        cache_size > 0 enables the persistent embedding cache (see embedding_cache.py).
+        backend: torch | torch-int8 | onnx | onnx-int8 (see inference_backend.py).
         """
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.backend = backend
+        self.cache_size = cache_size
+        self._cache = None
+
+    @cached_property
+    def model(self):
+        return shared_model(self.model_name, self.backend)
+
+    @property
+    def cache(self):
+        """
+        Persistent embedding cache, opened on first use (None when disabled).
+        """
+        if self._cache is None and self.cache_size > 0:
+            # quantized backends give slightly different vectors: keep them apart
+            key = self.model_name if self.backend == "torch" else f"{self.model_name}-{self.backend}"
+            self._cache = EmbeddingCache(key, self.model.get_sentence_embedding_dimension(),
+                                         max_entries=self.cache_size)
+            atexit.register(self._cache.save)
+        return self._cache
+
+    def count_tokens(self, texts):
+        """
+        Token count per text as seen by the encoder (capped at max_seq_length).
+        Falls back to whitespace words when the model exposes no tokenizer.
+        """
+        tokenizer = getattr(self.model, "tokenizer", None)
+        max_len = getattr(self.model, "max_seq_length", None) or 512
+        if tokenizer is None or not callable(tokenizer):
+            return [min(len(t.split()), max_len) for t in texts]
+        enc = tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=max_len)
+        return [len(ids) for ids in enc["input_ids"]]
 
     def embed_text(self, text: str):
         """
         Embed single text -> 1D numpy array (float32).
         """
+        if self.cache is not None:
+            return self.embed_texts([text])[0]
         emb = self.model.encode(text, show_progress_bar=False)
         return np.array(emb, dtype='float32')
 
     def embed_texts(self, texts):
         """
-        Embed list of texts -> 2D numpy array.
+        Embed list of texts -> 2D numpy array (float32), one row per text.
+        With the cache enabled only the misses are sent to the model.
         """
-        embs = self.model.encode(texts, show_progress_bar=True)
-        return np.array(embs, dtype='float32')
\ No newline at end of file
+        texts = list(texts)
+        cache = self.cache
+        if cache is None:
+            return self._encode(texts)
+        out, missing = cache.get_many(texts)
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            embs = self._encode(miss_texts)
+            cache.put_many(miss_texts, embs)
+            out[missing] = embs
+        return out
+
+    def _encode(self, texts):
+        embs = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+        return np.array(embs, dtype='float32')
@@ -0,0 +1,67 @@
+# src/fusion.py
+"""
+Score fusion for hybrid retrieval.
+Each leg is a pair of NumPy arrays (ids, scores) sorted best-first. Scores
+from different legs live on different scales (cosine vs BM25), so they are
+either replaced by ranks (Reciprocal Rank Fusion) or normalized per leg
+(min-max / z-score) before a weighted sum.
+"""
+import numpy as np
+
+METHODS = ("rrf", "minmax", "zscore")
+RRF_K = 60
+
+
+def _rank_scores(scores: np.ndarray, rrf_k: int) -> np.ndarray:
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return 1.0 / (rrf_k + ranks)
+
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    lo, hi = scores.min(), scores.max()
+    if hi - lo <= 1e-12:
+        return np.ones_like(scores)
+    return (scores - lo) / (hi - lo)
+
+
+def _zscore(scores: np.ndarray) -> np.ndarray:
+    std = scores.std()
+    if std <= 1e-12:
+        return np.zeros_like(scores)
+    return (scores - scores.mean()) / std
+
+
+def normalize(scores, method: str, rrf_k: int = RRF_K) -> np.ndarray:
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0:
+        return scores
+    if method == "rrf":
+        return _rank_scores(scores, rrf_k)
+    if method == "minmax":
+        return _minmax(scores)
+    if method == "zscore":
+        return _zscore(scores)
+    raise ValueError(f"Unknown fusion method: {method} (expected one of {METHODS})")
+
+
+def fuse(legs, method: str = "rrf", weights=None, top_k: int = None, rrf_k: int = RRF_K):
+    """
+    legs: list of (ids, scores) array pairs, one per retriever.
+    weights: per-leg weights (default 1.0 each).
+    Returns (ids, fused_scores) sorted best-first, truncated to top_k.
+    """
+    weights = weights or [1.0] * len(legs)
+    legs = [(np.asarray(ids), s, w) for (ids, s), w in zip(legs, weights) if len(ids)]
+    if not legs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+    all_ids = np.concatenate([ids for ids, _, _ in legs])
+    contrib = np.concatenate([w * normalize(s, method, rrf_k) for _, s, w in legs])
+    uniq, inverse = np.unique(all_ids, return_inverse=True)
+    fused = np.bincount(inverse, weights=contrib, minlength=len(uniq))
+
+    order = np.argsort(-fused, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    return uniq[order], fused[order]
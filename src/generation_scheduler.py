@@ -0,0 +1,231 @@
+# src/generation_scheduler.py
+"""
+Dynamic micro-batching for StrictGenerator.
+Requests from concurrent callers are queued; a single worker thread takes
+the first pending request, waits up to GEN_MAX_WAIT_MS for more, and runs
+them through the seq2seq model as one batch, bounded by GEN_MAX_BATCH
+prompts and GEN_BATCH_TOKENS padded prompt tokens. Results are routed back
+to each caller's future. With an answer cache, agenerate() answers
+paraphrases of earlier questions without queueing them (see answer_cache.py).
+"""
+import os
+import queue
+import threading
+import time
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from concurrent.futures import Future
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+GEN_MAX_BATCH = int(os.getenv("GEN_MAX_BATCH", 8))
+GEN_MAX_WAIT_MS = float(os.getenv("GEN_MAX_WAIT_MS", 10))
+GEN_BATCH_TOKENS = int(os.getenv("GEN_BATCH_TOKENS", 8192))
+# queue depth histogram buckets (upper bounds)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class _Request:
+    def __init__(self, question, retrieved, max_length, report=None, vector=None, generation=None):
+        self.question = question
+        self.retrieved = retrieved
+        self.max_length = max_length
+        self.report = report if report is not None else {}   # context packing stats
+        self.prompt = None          # packed prompt, built by the worker
+        self.n_tokens = None        # prompt tokens, counted by the worker
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+        self.timings = tracing.current()   # caller's timing breakdown, if collected
+        self.vector = vector        # question embedding from the answer cache lookup
+        self.generation = generation    # index generation seen by that lookup
+
+
+class GenerationScheduler:
+    def __init__(self, generator, max_batch_size: int = GEN_MAX_BATCH, max_wait_ms: float = GEN_MAX_WAIT_MS,
+                 token_budget: int = GEN_BATCH_TOKENS, cache=None):
+        self.generator = generator
+        self.cache = cache          # optional AnswerCache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.token_budget = token_budget
+        self._queue = queue.Queue()
+        self._carry = None          # request that did not fit the previous batch
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes = Counter()
+        self.queue_depths = Counter()
+        self.wait_seconds = 0.0
+
+    # ----------------------
+    # CALLER SIDE
+    # ----------------------
+    def submit(self, question, retrieved, max_length=512, report=None, vector=None, generation=None) -> Future:
+        """
+        Queue one request; the returned future resolves to the answer text.
+        report: optional dict that receives the context packing stats.
+        vector, generation: from the answer cache lookup, if one was made.
+        """
+        self._ensure_started()
+        req = _Request(question, retrieved, max_length, report, vector, generation)
+        self._queue.put(req)
+        return req.future
+
+    async def agenerate(self, question, retrieved, max_length=512, report=None):
+        vector = generation = None
+        if self.cache is not None:
+            # embedding the question is CPU work: keep it off the event loop
+            loop = asyncio.get_running_loop()
+            with tracing.span("answer_cache"):
+                cached, vector, generation = await loop.run_in_executor(
+                    None, contextvars.copy_context().run, self.cache.lookup, question, retrieved)
+            if cached is not None:
+                return cached
+        return await asyncio.wrap_future(self.submit(question, retrieved, max_length, report, vector, generation))
+
+    def count_tokens(self, req) -> int:
+        if req.n_tokens is None:
+            with tracing.attach(req.timings):
+                req.prompt = self.generator.build_prompt(req.question, req.retrieved, report=req.report)
+            req.n_tokens = req.report.get("prompt_tokens")
+            if req.n_tokens is None:
+                try:
+                    req.n_tokens = len(self.generator.tokenizer(req.prompt, truncation=True)["input_ids"])
+                except Exception:
+                    req.n_tokens = len(req.prompt.split())
+        return req.n_tokens
+
+    def _pack(self, req) -> bool:
+        """
+        Pack req's prompt; on failure fail only its future and return False.
+        """
+        try:
+            self.count_tokens(req)
+            return True
+        except Exception as e:
+            logger.exception("Packing a generation request failed")
+            req.future.set_exception(e)
+            return False
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + (1 if self._carry is not None else 0)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "mean_queue_wait_ms": 1000 * self.wait_seconds / self.requests if self.requests else 0.0,
+            "batch_size_hist": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "queue_depth_hist": dict(self.queue_depths),
+        }
+
+    def stop(self):
+        self._stopped = True
+        self._queue.put(None)
+
+    # ----------------------
+    # WORKER SIDE
+    # ----------------------
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._worker, name="generation-scheduler", daemon=True)
+                self._thread.start()
+
+    def _fits(self, batch, req) -> bool:
+        if len(batch) >= self.max_batch_size:
+            return False
+        longest = max([self.count_tokens(r) for r in batch] + [self.count_tokens(req)])
+        return longest * (len(batch) + 1) <= self.token_budget
+
+    def next_batch(self):
+        """
+        Block for the first request, then gather more until the batch is
+        full, the token budget is reached or the wait window closes.
+        Requests whose prompt cannot be packed are failed and left out.
+        """
+        first = self._carry
+        self._carry = None
+        while first is None:
+            first = self._queue.get()
+            if first is None:
+                return None
+            if not self._pack(first):
+                first = None
+        depth = self._queue.qsize() + 1
+        self.queue_depths[next((f"le_{b}" for b in DEPTH_BUCKETS if depth <= b), "le_inf")] += 1
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                req = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if req is None:
+                self._stopped = True
+                break
+            if not self._pack(req):
+                continue
+            if not self._fits(batch, req):
+                self._carry = req
+                break
+            batch.append(req)
+        return batch
+
+    def run_batch(self, batch):
+        now = time.perf_counter()
+        self.wait_seconds += sum(now - r.enqueued for r in batch)
+        for r in batch:
+            tracing.record("generation_queue", now - r.enqueued, r.timings)
+        self.batches += 1
+        self.requests += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        try:
+            # every request was packed by next_batch()
+            start = time.perf_counter()
+            answers = self.generator.generate_prompts(
+                [r.prompt for r in batch], [r.retrieved for r in batch],
+                max_length=max(r.max_length for r in batch)
+            )
+            # every request in the batch waited for the whole forward pass
+            seconds = time.perf_counter() - start
+            for r in batch:
+                tracing.add(r.timings, "generate", seconds)
+        except Exception as e:
+            logger.exception("Generation batch of %d failed", len(batch))
+            for r in batch:
+                r.future.set_exception(e)
+            return
+        for r, answer in zip(batch, answers):
+            r.future.set_result(answer)
+        if self.cache is not None:
+            done = time.perf_counter()
+            for r, answer in zip(batch, answers):
+                self.cache.put(r.question, r.retrieved, answer, seconds=done - r.enqueued, vector=r.vector,
+                               generation=r.generation)
+
+    def _worker(self):
+        while not self._stopped:
+            batch = None
+            try:
+                batch = self.next_batch()
+                if batch is None:
+                    return
+                self.run_batch(batch)
+            except Exception as e:
+                # keep the only worker alive; fail whatever it was holding
+                logger.exception("Generation scheduler error")
+                for r in batch or []:
+                    if not r.future.done():
+                        r.future.set_exception(e)
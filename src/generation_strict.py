@@ -2,22 +2,72 @@
 """
 Strict generator that forces citation usage and performs basic grounding checks.
 """
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+from transformers import AutoTokenizer, TextIteratorStreamer, pipeline
+from threading import Thread
+from functools import cached_property
 import os
 import re
+import time
+import logging
+
+from . import tracing
+from .context_packer import ContextPacker
+from .inference_backend import GEN_BACKEND, load_seq2seq
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
 
 MODEL = os.getenv('GENERATOR_MODEL', 'google/flan-t5-small')
 DEVICE = int(os.getenv('DEVICE', -1))
+# Max seconds to wait for the next streamed token before giving up.
+STREAM_TIMEOUT = float(os.getenv('STREAM_TIMEOUT', 60))
+PROMPT_HEAD = (
+    "You are an academic assistant. ANSWER using ONLY the CONTEXT blocks below. "
+    "For every factual claim include an inline citation exactly like [DOC:filename.pdf|chunk:3]. "
+    "If the information is not present, reply: 'Không đủ thông tin trong tài liệu đã cung cấp.'\n\n"
+    "CONTEXT:\n"
+)
+CITATION_WARNING = "\n\n[WARNING] Một số citation không xuất hiện trong ngữ cảnh đã truy xuất; kiểm tra kết quả cẩn thận."
 
 class StrictGenerator:
-    def __init__(self, model_name: str = MODEL, device: int = DEVICE):
+    def __init__(self, model_name: str = MODEL, device: int = DEVICE, backend: str = GEN_BACKEND,
+                 answer_cache=None):
         """
         Initialize seq2seq model for text2text generation.
         For CPU usage: device=-1 (default). For GPU, set device=0 (and ensure CUDA).
+        backend: torch | torch-int8 | onnx | onnx-int8 (see inference_backend.py);
+        anything but torch runs on CPU.
+        Tokenizer, model and pipeline are loaded on first use and shared
+        process-wide (see model_registry.py).
+        answer_cache: optional AnswerCache consulted by generate() (see answer_cache.py).
         """
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        self.pipe = pipeline('text2text-generation', model=self.model, tokenizer=self.tokenizer, device=device)
+        if backend != 'torch' and device >= 0:
+            logger.warning("Generator backend %s is CPU only; ignoring DEVICE=%d", backend, device)
+            device = -1
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend
+        self.answer_cache = answer_cache
+
+    @cached_property
+    def tokenizer(self):
+        return registry.get(('tokenizer', self.model_name), lambda: AutoTokenizer.from_pretrained(self.model_name))
+
+    @cached_property
+    def model(self):
+        return registry.get(('generator', self.model_name, self.backend),
+                            lambda: load_seq2seq(self.model_name, self.backend))
+
+    @cached_property
+    def pipe(self):
+        return registry.get(
+            ('pipeline', self.model_name, self.backend, self.device),
+            lambda: pipeline('text2text-generation', model=self.model, tokenizer=self.tokenizer, device=self.device)
+        )
+
+    @cached_property
+    def packer(self):
+        return ContextPacker(self.tokenizer)
 
     # def convert_for_generator(self, merged_results):
     #     """
@@ -43,35 +93,125 @@ class StrictGenerator:
         parts = []
         for r in retrieved:
             meta = r.get('meta') or r
-            src = meta.get('source') or meta.get('doc_id') or 'unknown'
-            chunk_id = meta.get('chunk_id', meta.get('chunk', 0))
-            tag = f"[DOC:{src}|chunk:{chunk_id}]"
-            parts.append(f"{tag}\n{meta.get('text')}\n")
+            parts.append(f"{self.context_tag(meta)}{meta.get('text')}\n")
         return "\n---\n".join(parts)
 
-    def build_prompt(self, question, retrieved):
+    @staticmethod
+    def context_tag(meta):
+        src = meta.get('source') or meta.get('doc_id') or 'unknown'
+        chunk_id = meta.get('chunk_id', meta.get('chunk', 0))
+        return f"[DOC:{src}|chunk:{chunk_id}]\n"
+
+    @tracing.traced('build_prompt')
+    def build_prompt(self, question, retrieved, report=None):
         """
         Build instruction prompt that constrains model to use only context.
+        The context is packed into the model's input budget in rank order
+        (see context_packer.py); report, if given, receives the packing stats
+        (packed / dropped / duplicate tokens, prompt_tokens).
         """
-        ctx = self.build_context_block(retrieved)
-        prompt = (
-            "You are an academic assistant. ANSWER using ONLY the CONTEXT blocks below. "
-            "For every factual claim include an inline citation exactly like [DOC:filename.pdf|chunk:3]. "
-            "If the information is not present, reply: 'Không đủ thông tin trong tài liệu đã cung cấp.'\n\n"
-            f"CONTEXT:\n{ctx}\n\nQUESTION:\n{question}\n\nANSWER:\n"
-        )
-        return prompt
+        tail = f"\n\nQUESTION:\n{question}\n\nANSWER:\n"
+        overhead = self.packer.count([PROMPT_HEAD + tail])[0]
+        packed, stats = self.packer.pack(retrieved, overhead, self.context_tag)
+        logger.debug("Context packing: %s", stats)
+        if report is not None:
+            report.update(stats)
+        return PROMPT_HEAD + self.build_context_block(packed) + tail
 
-    def generate(self, question, retrieved, max_length=512):
+    def generate(self, question, retrieved, max_length=512, report=None):
         """
         Generate answer and perform a simple citation check.
+        With an answer cache, paraphrases of a question answered earlier from
+        the same chunks are served from it.
+        """
+        cache = self.answer_cache
+        vector = generation = None
+        if cache is not None:
+            with tracing.span('answer_cache'):
+                cached, vector, generation = cache.lookup(question, retrieved)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        prompt = self.build_prompt(question, retrieved, report=report)
+        with tracing.span('generate'):
+            out = self.pipe(prompt, max_length=max_length, do_sample=False)[0]['generated_text']
+        answer = out + self.citation_warning(out, retrieved)
+        if cache is not None:
+            cache.put(question, retrieved, answer, seconds=time.perf_counter() - start, vector=vector,
+                      generation=generation)
+        return answer
+
+    def generate_batch(self, questions, retrieved_lists, max_length=512):
+        """
+        Generate answers for several questions in one padded forward batch.
+        """
+        prompts = [self.build_prompt(q, r) for q, r in zip(questions, retrieved_lists)]
+        return self.generate_prompts(prompts, retrieved_lists, max_length=max_length)
+
+    def generate_prompts(self, prompts, retrieved_lists, max_length=512):
+        """
+        generate_batch() for prompts already built with build_prompt().
+        """
+        with tracing.span('generate'):
+            outs = self.pipe(prompts, max_length=max_length, do_sample=False, batch_size=len(prompts))
+        texts = [(o[0] if isinstance(o, list) else o)['generated_text'] for o in outs]
+        return [t + self.citation_warning(t, r) for t, r in zip(texts, retrieved_lists)]
+
+    def citation_warning(self, out, retrieved):
+        """
+        Warning suffix when the answer cites chunks that were not retrieved, else ''.
         """
-        prompt = self.build_prompt(question, retrieved)
-        out = self.pipe(prompt, max_length=max_length, do_sample=False)[0]['generated_text']
-        # verify citations existence
         citations = re.findall(r"\[DOC:([^\]]+)\]", out)
         tags = {f"{r['meta'].get('source')}|chunk:{r['meta'].get('chunk_id')}" for r in retrieved}
         invalid = [c for c in citations if c not in tags]
         if citations and invalid:
-            out += "\n\n[WARNING] Một số citation không xuất hiện trong ngữ cảnh đã truy xuất; kiểm tra kết quả cẩn thận."
-        return out
\ No newline at end of file
+            return CITATION_WARNING
+        return ""
+
+    def stream(self, question, retrieved, max_length=512, timing=None, report=None):
+        """
+        Generate the answer incrementally, yielding text pieces as tokens are
+        decoded (the citation warning, if any, comes last).
+        timing: optional dict, filled with 'ttft' (seconds to the first piece),
+        'total' and 'pieces'. report: optional dict for the context packing stats.
+        """
+        start = time.perf_counter()
+        prompt = self.build_prompt(question, retrieved, report=report)
+        inputs = self.tokenizer(prompt, return_tensors='pt', truncation=True)
+        inputs = {k: v.to(self.model.device) for k, v in inputs.items()}
+        streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True, timeout=STREAM_TIMEOUT)
+        errors = []
+
+        def run():
+            # end the stream on failure so the consumer is not left waiting
+            try:
+                self.model.generate(**inputs, max_length=max_length, do_sample=False, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = Thread(target=run, daemon=True)
+        worker.start()
+
+        timing = timing if timing is not None else {}
+        timing['pieces'] = 0
+        parts = []
+        for piece in streamer:
+            if not piece:
+                continue
+            if not parts:
+                timing['ttft'] = time.perf_counter() - start
+            parts.append(piece)
+            timing['pieces'] += 1
+            yield piece
+        worker.join()
+        if errors:
+            raise errors[0]
+        warning = self.citation_warning("".join(parts), retrieved)
+        if warning:
+            yield warning
+        timing['total'] = time.perf_counter() - start
+        timing.setdefault('ttft', timing['total'])
+        tracing.record('generate_ttft', timing['ttft'])
+        tracing.record('generate_stream', timing['total'])
+        logger.info("Generation: ttft %.3fs, total %.3fs", timing['ttft'], timing['total'])
\ No newline at end of file
@@ -0,0 +1,167 @@
+# src/inference_backend.py
+"""
+CPU inference backends for the embedder and the generator.
+  torch       stock fp32 PyTorch weights
+  torch-int8  PyTorch dynamic int8 quantization of every nn.Linear
+  onnx        ONNX Runtime export (sentence-transformers / optimum)
+  onnx-int8   the ONNX export with weights quantized to int8 by
+              onnxruntime's dynamic quantizer
+Exports are built once under ONNX_DIR and reused. INFERENCE_THREADS sets
+the intra-op thread count for both torch and ONNX Runtime.
+The onnx backends are optional: pip install "optimum[onnxruntime]".
+"""
+import os
+import re
+import shutil
+import tempfile
+import logging
+
+import torch
+
+from .manifest import INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+GEN_BACKEND = os.getenv("GEN_BACKEND", "torch")
+# 0 keeps the library default (one thread per physical core)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", 0))
+ONNX_DIR = os.getenv("ONNX_DIR", os.path.join(INDEX_DIR, "onnx"))
+
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def configure_threads(threads: int = INFERENCE_THREADS) -> int:
+    """
+    Set torch's intra-op thread count (when threads > 0); returns the count in use.
+    """
+    if threads > 0:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+
+def session_options(threads: int = INFERENCE_THREADS):
+    """
+    onnxruntime.SessionOptions with the intra-op thread count, or None for defaults.
+    """
+    if threads <= 0:
+        return None
+    import onnxruntime
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = threads
+    opts.inter_op_num_threads = 1
+    return opts
+
+
+def quantize_torch(model):
+    """
+    Dynamic int8 quantization: Linear weights stored as int8, activations
+    quantized on the fly. CPU only.
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_onnx_dir(src_dir: str, dst_dir: str):
+    """
+    Copy an exported model directory, replacing every .onnx graph with its
+    dynamically int8-quantized version (same file names, so loaders need no
+    extra arguments).
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    shutil.copytree(src_dir, dst_dir, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data"))
+    for root, _, files in os.walk(src_dir):
+        for name in files:
+            if name.endswith(".onnx"):
+                src = os.path.join(root, name)
+                dst = os.path.join(dst_dir, os.path.relpath(src, src_dir))
+                quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    return dst_dir
+
+
+def export_dir(model_name: str, backend: str, onnx_dir: str = ONNX_DIR) -> str:
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+    return os.path.join(onnx_dir, name if backend == "onnx" else f"{name}-int8")
+
+
+def _build_once(path: str, build_fn):
+    """
+    Run build_fn(tmp_dir) and move the result to path, unless path exists.
+    Half-written exports never end up at path.
+    """
+    if os.path.isdir(path):
+        return path
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".export-")
+    try:
+        out = os.path.join(tmp, "model")
+        build_fn(out)
+        os.replace(out, path)
+        logger.info("Exported %s", path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def _onnx_path(model_name: str, backend: str, export_fn, onnx_dir: str) -> str:
+    fp32 = _build_once(export_dir(model_name, "onnx", onnx_dir), export_fn)
+    if backend == "onnx":
+        return fp32
+    return _build_once(export_dir(model_name, backend, onnx_dir), lambda out: quantize_onnx_dir(fp32, out))
+
+
+def load_sentence_transformer(model_name: str, backend: str = EMBED_BACKEND, threads: int = INFERENCE_THREADS,
+                              onnx_dir: str = ONNX_DIR):
+    """
+    SentenceTransformer on the requested backend.
+    """
+    from sentence_transformers import SentenceTransformer
+    check_backend(backend)
+    configure_threads(threads)
+    if backend.startswith("torch"):
+        model = SentenceTransformer(model_name, device="cpu" if backend == "torch-int8" else None)
+        return quantize_torch(model) if backend == "torch-int8" else model
+
+    def export(out):
+        SentenceTransformer(model_name, backend="onnx").save_pretrained(out)
+
+    path = _onnx_path(model_name, backend, export, onnx_dir)
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    opts = session_options(threads)
+    if opts is not None:
+        model_kwargs["session_options"] = opts
+    return SentenceTransformer(path, backend="onnx", model_kwargs=model_kwargs)
+
+
+def load_seq2seq(model_name: str, backend: str = GEN_BACKEND, threads: int = INFERENCE_THREADS,
+                 onnx_dir: str = ONNX_DIR):
+    """
+    Seq2seq LM with .generate() on the requested backend.
+    """
+    check_backend(backend)
+    configure_threads(threads)
+    if backend.startswith("torch"):
+        from transformers import AutoModelForSeq2SeqLM
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        return quantize_torch(model) if backend == "torch-int8" else model
+
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(f"Generator backend {backend!r} requires optimum[onnxruntime]") from e
+
+    def export(out):
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(out)
+
+    path = _onnx_path(model_name, backend, export, onnx_dir)
+    kwargs = {"provider": "CPUExecutionProvider"}
+    opts = session_options(threads)
+    if opts is not None:
+        kwargs["session_options"] = opts
+    return ORTModelForSeq2SeqLM.from_pretrained(path, **kwargs)
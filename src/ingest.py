@@ -127,108 +127,362 @@
 
 # src/ingest.py
 import os
+import time
+import queue
 import argparse
+import heapq
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import logging
 from tqdm import tqdm
 
-import pdfplumber
-import fitz  # pymupdf
-
-from .embeddings import EmbeddingModel
-from .vectorstore_qdrant import QdrantStore
+import numpy as np
+from .embeddings import EmbeddingModel, length_bucketed_batches
+from .vectorstore import get_vector_store
+from .manifest import IngestManifest, manifest_path, point_id, bump_generation
+from .bm25_index import BM25Index, bm25_path
+from .chunk_store import ChunkStore, chunk_store_path
+from .chunker import get_chunker, CHUNK_TOKENS, CHUNK_OVERLAP
+from .pdf_extract import extract_document
+from .model_registry import registry
+from . import tracing
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Padded tokens (rows * longest row) allowed in one encoder forward pass.
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", 8192))
+# Number of forward passes worth of chunks buffered before bucketing by length.
+BUCKET_WINDOW = 8
+# Extraction processes for the pipelined ingest mode (0 = serial, in-process).
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 0))
+# Max documents waiting between two pipeline stages.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+# Slowest extracted pages reported in the index_folder stats.
+SLOWEST_PAGES = 5
+# Rewrite the chunk store once this fraction of it is stale text.
+CHUNK_STORE_GARBAGE = 0.5
+
+_DONE = object()
 
-def extract_text_from_pdf(path: str) -> str:
-    parts = []
-    try:
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                txt = page.extract_text() or ""
-                parts.append(txt)
-    except Exception:
-        try:
-            doc = fitz.open(path)
-            for page in doc:
-                parts.append(page.get_text() or "")
-        except Exception as e:
-            logger.error("Failed to extract text from %s: %s", path, e)
-    return "\n\n".join(parts)
 
+def extract_pages_from_pdf(path: str):
+    """
+    Extract text per page: PyMuPDF, with pdfplumber / OCR fallback for
+    empty or garbled pages (see pdf_extract.py).
+    """
+    return extract_document(path).pages
 
-def chunk_text(text: str, chunk_size: int = 800, overlap: int = 200):
-    words = text.split()
-    chunks = []
-    cid = 0
-    i = 0
 
-    while i < len(words):
-        j = min(len(words), i + chunk_size)
-        chunk_words = words[i:j]
-        chunk = " ".join(chunk_words)
+@tracing.traced("extract_pdf")
+def extract_text_from_pdf(path: str) -> str:
+    return "\n\n".join(extract_pages_from_pdf(path))
 
-        chunks.append({
-            "chunk_id": cid,
-            "text": chunk
-        })
 
-        cid += 1
-        i = i + (chunk_size - overlap)
-        if i < 0:
-            break
+@tracing.traced("chunk_text")
+def chunk_text(text: str, chunk_size: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP, chunker=None):
+    """
+    Split text into chunks of at most chunk_size embedding-model tokens,
+    cut at section/sentence boundaries, with overlap tokens shared between
+    neighbours (see chunker.py).
+    """
+    chunker = chunker or get_chunker(max_tokens=chunk_size, overlap=overlap)
+    return chunker.chunk(text)
 
-    return chunks
 
+class _StageError:
+    def __init__(self, exc):
+        self.exc = exc
 
-def index_folder(data_dir: str, collection_name: str = None, model_name: str = None):
+
+def _extract_stage(pdfs, out_q: queue.Queue, workers: int):
+    """
+    Stage 1: extract text in a process pool. At most `workers` documents are
+    in flight; results are emitted in submission order.
+    """
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            inflight = deque()
+            for pdf in pdfs:
+                inflight.append((pdf, pool.submit(extract_document, str(pdf))))
+                if len(inflight) >= workers:
+                    done_pdf, fut = inflight.popleft()
+                    out_q.put((done_pdf, fut.result()))
+            while inflight:
+                done_pdf, fut = inflight.popleft()
+                out_q.put((done_pdf, fut.result()))
+    except Exception as e:
+        out_q.put(_StageError(e))
+    out_q.put(_DONE)
+
+
+def _chunk_stage(in_q: queue.Queue, out_q: queue.Queue, chunker=None):
+    """
+    Stage 2: chunk extracted text.
+    """
+    while True:
+        item = in_q.get()
+        if item is _DONE or isinstance(item, _StageError):
+            out_q.put(item)
+            if item is _DONE:
+                return
+            continue
+        pdf, doc = item
+        try:
+            text = "\n\n".join(doc.pages)
+            out_q.put((pdf, chunk_text(text, chunker=chunker) if text.strip() else [], doc.page_stats))
+        except Exception as e:
+            out_q.put(_StageError(e))
+
+
+def iter_chunked_documents(pdfs, workers: int = INGEST_WORKERS, queue_size: int = PIPELINE_QUEUE_SIZE,
+                           chunker=None):
+    """
+    Yield (pdf, chunks, page_stats) for each PDF; page_stats holds the
+    per-page extraction method and timing (see pdf_extract.py).
+    chunker: TokenChunker to use (default: get_chunker() for EMBEDDING_MODEL).
+    workers=0 extracts and chunks serially in this process. workers>0 runs
+    extraction in a ProcessPoolExecutor and chunking in a thread, connected
+    to the caller (the embed/upsert stage) by queues of size queue_size, so
+    parsing overlaps with model inference and memory stays bounded.
+    """
+    if workers <= 0:
+        for pdf in pdfs:
+            doc = extract_document(str(pdf))
+            text = "\n\n".join(doc.pages)
+            yield pdf, (chunk_text(text, chunker=chunker) if text.strip() else []), doc.page_stats
+        return
+
+    extracted_q = queue.Queue(maxsize=queue_size)
+    chunked_q = queue.Queue(maxsize=queue_size)
+    threading.Thread(target=_extract_stage, args=(pdfs, extracted_q, workers), daemon=True).start()
+    threading.Thread(target=_chunk_stage, args=(extracted_q, chunked_q, chunker), daemon=True).start()
+
+    while True:
+        item = chunked_q.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.exc
+        yield item
+
+
+class EmbedBatcher:
+    """
+    Collects chunks across documents and embeds them in token-budgeted,
+    length-sorted batches through EmbeddingModel.embed_texts, then upserts
+    the resulting points. Call flush() once all documents have been added.
+    """
+
+    def __init__(self, em, vs, batch_tokens: int = EMBED_BATCH_TOKENS, on_flush=None):
+        self.em = em
+        self.vs = vs
+        self.batch_tokens = batch_tokens
+        self.on_flush = on_flush   # called as on_flush(stage, n_points)
+        self.pending = []          # list of (point_id, text, payload, n_tokens)
+        self.pending_tokens = 0
+        self.chunks = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+
+    def add(self, point_id, text: str, payload: dict):
+        self.add_many([(point_id, text, payload)])
+
+    def add_many(self, items, lengths=None):
+        """
+        items: iterable of (point_id, text, payload)
+        lengths: token counts when already known (e.g. from the chunker)
+        """
+        items = list(items)
+        if not items:
+            return
+        if lengths is None:
+            lengths = self.em.count_tokens([text for _, text, _ in items])
+        for (point_id, text, payload), n_tokens in zip(items, lengths):
+            self.pending.append((point_id, text, payload, n_tokens))
+            self.pending_tokens += n_tokens
+        if self.pending_tokens >= self.batch_tokens * BUCKET_WINDOW:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending, self.pending_tokens = self.pending, [], 0
+
+        start = time.perf_counter()
+        vectors = None
+        lengths = [p[3] for p in pending]
+        for batch in length_bucketed_batches(lengths, self.batch_tokens, self.em.batch_size):
+            with tracing.span("embed"):
+                embs = np.asarray(self.em.embed_texts([pending[i][1] for i in batch]), dtype=np.float32)
+            if vectors is None:
+                vectors = np.empty((len(pending), embs.shape[1]), dtype=np.float32)
+            vectors[batch] = embs
+            self.batches += 1
+        self.embed_seconds += time.perf_counter() - start
+        self.chunks += len(pending)
+        if self.on_flush:
+            self.on_flush("embedded", len(pending))
+
+        # bulk write; the store batches and pipelines the requests itself
+        with tracing.span("upsert"):
+            self.vs.upsert_arrays([p[0] for p in pending], vectors, [p[2] for p in pending])
+        if self.on_flush:
+            self.on_flush("upserted", len(pending))
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.embed_seconds if self.embed_seconds > 0 else 0.0
+
+
+def index_folder(
+    data_dir: str,
+    collection_name: str = None,
+    model_name: str = None,
+    batch_tokens: int = EMBED_BATCH_TOKENS,
+    workers: int = INGEST_WORKERS,
+    manifest_file: str = None,
+    progress=None
+):
+    """
+    Incrementally index the PDFs in data_dir. Files unchanged since the last
+    run (per the ingest manifest) are skipped, changed files get their stale
+    points replaced and deleted files get their points removed. The local
+    BM25 index and chunk store are updated alongside the vector store;
+    payloads carry only ids and metadata, chunk text goes to the chunk store.
+    Chunks are gathered across documents and embedded in token-budgeted
+    batches; workers>0 enables the pipelined mode (see iter_chunked_documents).
+    progress, if given, is called with a dict of counters (files, pages,
+    chunks, embedded, upserted) as work advances. Returns throughput stats.
+    """
     collection_name = collection_name or os.getenv("COLLECTION_NAME", "papers")
     model_name = model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-
-    em = EmbeddingModel(model_name=model_name)
-    vs = QdrantStore(
-        collection=collection_name,
-        vector_size=em.model.get_sentence_embedding_dimension()
-    )
+    manifest = IngestManifest(manifest_file or manifest_path(collection_name))
+    index_dir = os.path.dirname(manifest.path) or "."
 
     p = Path(data_dir)
     pdfs = list(p.glob("**/*.pdf"))
-    if not pdfs:
+    if not pdfs and not manifest.entries:
         logger.warning("No PDF found in %s", data_dir)
         return
 
-    global_id = 0  # 🔥 Dùng ID tăng dần → không bao giờ None
+    plan = manifest.plan(pdfs, data_dir)
+    logger.info("Ingest plan: %d changed, %d unchanged, %d removed",
+                len(plan.changed), len(plan.unchanged), len(plan.removed))
 
-    for pdf in tqdm(pdfs, desc="Indexing PDFs"):
-        text = extract_text_from_pdf(str(pdf))
-        if not text.strip():
+    # shared across calls: repeated uploads reuse the loaded encoder, its
+    # embedding cache and the vector store connection
+    em = registry.get(("embedding_model", model_name), lambda: EmbeddingModel(model_name=model_name))
+    vs = registry.get(("vector_store", collection_name), lambda: get_vector_store(
+        collection_name,
+        vector_size=em.model.get_sentence_embedding_dimension()
+    ))
+    counters = {"files_total": len(plan.changed), "files_done": 0,
+                "pages": 0, "chunks": 0, "embedded": 0, "upserted": 0}
+
+    def report(stage=None, n=0):
+        if stage:
+            counters[stage] += n
+        if progress:
+            progress(dict(counters))
+
+    batcher = EmbedBatcher(em, vs, batch_tokens=batch_tokens, on_flush=report)
+    bm25 = BM25Index.load(bm25_path(collection_name, index_dir))
+    chunk_texts = ChunkStore(chunk_store_path(collection_name, index_dir))
+    report()
+
+    stale_ids = []
+    for key in plan.removed:
+        stale_ids.extend(manifest.forget(key))
+
+    documents = iter_chunked_documents(plan.changed, workers=workers, chunker=get_chunker(model_name))
+    recorded = []
+    extract_seconds = 0.0
+    pages_by_method = Counter()
+    slowest_pages = []    # min-heap of (seconds, source, page, method)
+    for pdf, chunks, page_stats in tqdm(documents, total=len(plan.changed), desc="Indexing PDFs"):
+        doc_hash = plan.hashes[pdf]
+        if not chunks:
             logger.warning("No text for %s", pdf)
-            continue
-
-        chunks = chunk_text(text)
-        points = []
 
+        items = []
         for c in chunks:
-            emb = em.embed_text(c["text"])
             payload = {
                 "source": pdf.name,
                 "chunk_id": c["chunk_id"],
-                "text": c["text"][:2000]
+                "doc_hash": doc_hash
             }
-
-            points.append({
-                "id": global_id,     # <=== FIX QUAN TRỌNG
-                "vector": emb,
-                "payload": payload
-            })
-
-            global_id += 1  # tăng ID
-
-        vs.upsert_points(points)
-
-    logger.info("Indexing finished")
+            items.append((point_id(doc_hash, c["chunk_id"]), c["text"], payload))
+            bm25.add(items[-1][0], c["text"], payload)
+        chunk_texts.put_texts((pid, text) for pid, text, _ in items)
+
+        new_ids = [item[0] for item in items]
+        stale_ids.extend(set(manifest.point_ids(pdf)) - set(new_ids))
+        recorded.append((pdf, doc_hash, new_ids))
+        counters["files_done"] += 1
+        counters["pages"] += len(page_stats)
+        # extraction may have run in a worker process: record it from its page timings
+        tracing.record("extract_pdf", sum(st["seconds"] for st in page_stats))
+        for st in page_stats:
+            extract_seconds += st["seconds"]
+            pages_by_method[st["method"]] += 1
+            entry = (st["seconds"], pdf.name, st["page"], st["method"])
+            if len(slowest_pages) < SLOWEST_PAGES:
+                heapq.heappush(slowest_pages, entry)
+            else:
+                heapq.heappushpop(slowest_pages, entry)
+        counters["chunks"] += len(items)
+        report()
+        batcher.add_many(items, lengths=[c["n_tokens"] for c in chunks])
+
+    batcher.flush()
+    if em.cache is not None:
+        em.cache.save()
+    for pdf, doc_hash, ids in recorded:
+        manifest.record(pdf, doc_hash, ids)
+    # Old points are dropped only after their replacements are written, and
+    # only when no file (renamed, moved or duplicate content) still owns them.
+    stale_ids = sorted(set(stale_ids) - manifest.live_point_ids())
+    if stale_ids:
+        vs.delete_points(stale_ids)
+        bm25.delete(stale_ids)
+        chunk_texts.delete(stale_ids)
+    # Persist every store before the manifest: a crash in between then only
+    # costs a re-index, never files marked indexed with their data lost.
+    with tracing.span("upsert_flush"):
+        vs.flush()
+    if chunk_texts.garbage_ratio() > CHUNK_STORE_GARBAGE:
+        chunk_texts.compact()
+    chunk_texts.close()
+    if batcher.chunks or stale_ids:
+        bm25.save(bm25_path(collection_name, index_dir))
+    manifest.save()
+    if batcher.chunks or stale_ids:
+        bump_generation(collection_name, index_dir)
+
+    logger.info(
+        "Indexing finished: %d chunks in %d batches, %.1fs embedding (%.1f chunks/sec, batch_tokens=%d)",
+        batcher.chunks, batcher.batches, batcher.embed_seconds, batcher.chunks_per_sec, batch_tokens
+    )
+    logger.info("Extraction: %d pages in %.1fs %s", counters["pages"], extract_seconds, dict(pages_by_method))
+    return {
+        "indexed_files": len(plan.changed),
+        "skipped_files": len(plan.unchanged),
+        "removed_files": len(plan.removed),
+        "deleted_points": len(stale_ids),
+        "chunks": batcher.chunks,
+        "batches": batcher.batches,
+        "embed_seconds": batcher.embed_seconds,
+        "chunks_per_sec": batcher.chunks_per_sec,
+        "extract_seconds": extract_seconds,
+        "pages_by_method": dict(pages_by_method),
+        "slowest_pages": [
+            {"source": src, "page": page, "method": method, "seconds": sec}
+            for sec, src, page, method in sorted(slowest_pages, reverse=True)
+        ],
+    }
 
 
 if __name__ == "__main__":
@@ -236,6 +490,11 @@ if __name__ == "__main__":
     parser.add_argument("--data_dir", type=str, default="sample_data")
     parser.add_argument("--collection", type=str, default=None)
     parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--batch_tokens", type=int, default=EMBED_BATCH_TOKENS,
+                        help="padded tokens per embedding forward pass")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="extraction processes; 0 disables the pipelined mode")
     args = parser.parse_args()
 
-    index_folder(args.data_dir, collection_name=args.collection, model_name=args.model)
\ No newline at end of file
+    index_folder(args.data_dir, collection_name=args.collection, model_name=args.model,
+                 batch_tokens=args.batch_tokens, workers=args.workers)
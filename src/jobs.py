@@ -0,0 +1,171 @@
+# src/jobs.py
+"""
+Background job queue backed by SQLite.
+Jobs survive restarts (queued/running jobs are picked up again) and report
+progress counters that the API exposes under /jobs/{id}.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from contextlib import closing
+
+from .manifest import INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(INDEX_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JobQueue:
+    """
+    Persistent FIFO of jobs processed by worker threads.
+    handlers: {kind: fn(args: dict, progress: callable) -> result (JSON-able)}
+    """
+
+    def __init__(self, handlers: dict, db_path: str = JOBS_DB, workers: int = JOB_WORKERS, poll_interval: float = 1.0):
+        self.handlers = handlers
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._ready = False         # database file and schema are created on first use
+
+    def _connect(self):
+        """
+        New autocommit connection; callers close it (contextlib.closing).
+        """
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._ready:
+            conn.execute(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def submit(self, kind: str, args: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, args, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(args), now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, kind, args, status, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "args": json.loads(row[2]),
+            "status": row[3],
+            "progress": json.loads(row[4]),
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+        }
+
+    def start(self):
+        """
+        Start worker threads (idempotent). Jobs left 'running' by a previous
+        process are re-queued.
+        """
+        if self._threads:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+        self._stop.clear()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _claim(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, kind, args FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), row[0]))
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def run_next(self) -> bool:
+        """
+        Process one queued job in the calling thread. Returns False if the queue is empty.
+        """
+        row = self._claim()
+        if row is None:
+            return False
+        job_id, kind, args = row
+        logger.info("Job %s (%s) started", job_id, kind)
+
+        def progress(counters: dict):
+            self._update(job_id, progress=json.dumps(counters))
+
+        try:
+            result = self.handlers[kind](json.loads(args), progress)
+            self._update(job_id, status="done", result=json.dumps(result))
+            logger.info("Job %s finished", job_id)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status="failed", error=str(e))
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            if self.run_next():
+                continue
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
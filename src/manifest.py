@@ -0,0 +1,146 @@
+# src/manifest.py
+"""
+Persistent ingest manifest used for incremental re-indexing.
+Tracks every indexed PDF by path, size, mtime and content hash together with
+the point ids written for it, so index_folder only touches what changed.
+"""
+import hashlib
+import json
+import os
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv("INDEX_DIR", "index_data")
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def point_id(doc_hash: str, chunk_id: int) -> int:
+    """
+    Deterministic 63-bit point id for (document hash, chunk_id).
+    Fits Qdrant unsigned ids and signed int64 ids (FAISS, NumPy).
+    """
+    digest = hashlib.blake2b(f"{doc_hash}:{chunk_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+def manifest_path(collection: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"manifest_{collection}.json")
+
+
+class IngestPlan:
+    def __init__(self):
+        self.changed = []      # list of Path, new or modified
+        self.unchanged = []    # list of Path
+        self.removed = []      # list of manifest keys no longer on disk
+        self.hashes = {}       # Path -> sha256 for changed files
+
+
+class IngestManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+
+    @staticmethod
+    def key(path) -> str:
+        return str(Path(path).resolve())
+
+    def plan(self, pdfs, data_dir: str) -> IngestPlan:
+        """
+        Classify pdfs against the manifest. size+mtime matches are trusted
+        without hashing; otherwise the content hash decides.
+        Files recorded under data_dir that no longer exist are 'removed'.
+        """
+        plan = IngestPlan()
+        seen = set()
+        for pdf in pdfs:
+            key = self.key(pdf)
+            seen.add(key)
+            st = os.stat(pdf)
+            entry = self.entries.get(key)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                plan.unchanged.append(pdf)
+                continue
+            sha = file_sha256(pdf)
+            if entry and entry["sha256"] == sha:
+                entry["size"], entry["mtime"] = st.st_size, st.st_mtime
+                plan.unchanged.append(pdf)
+                continue
+            plan.changed.append(pdf)
+            plan.hashes[pdf] = sha
+
+        root = self.key(data_dir)
+        for key in self.entries:
+            if key not in seen and key.startswith(root + os.sep):
+                plan.removed.append(key)
+        return plan
+
+    def point_ids(self, path) -> list:
+        entry = self.entries.get(self.key(path))
+        return list(entry["point_ids"]) if entry else []
+
+    def record(self, path, sha256: str, point_ids):
+        st = os.stat(path)
+        self.entries[self.key(path)] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": sha256,
+            "point_ids": list(point_ids),
+        }
+
+    def live_point_ids(self) -> set:
+        """
+        Every point id referenced by some entry. Ids are content-derived, so
+        renamed or duplicate files share them.
+        """
+        return {pid for entry in self.entries.values() for pid in entry["point_ids"]}
+
+    def forget(self, key: str) -> list:
+        entry = self.entries.pop(key, None)
+        return list(entry["point_ids"]) if entry else []
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.entries}, f)
+        os.replace(tmp, self.path)
+
+
+def generation_path(collection: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"generation_{collection}")
+
+
+def bump_generation(collection: str, index_dir: str = INDEX_DIR) -> int:
+    """
+    Increment the index generation counter after the collection changed.
+    Readers (e.g. the query cache) compare generations to detect stale data,
+    including changes made by another process.
+    """
+    path = generation_path(collection, index_dir)
+    gen = current_generation(collection, index_dir) + 1
+    os.makedirs(index_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(gen))
+    os.replace(tmp, path)
+    return gen
+
+
+def current_generation(collection: str, index_dir: str = INDEX_DIR) -> int:
+    try:
+        with open(generation_path(collection, index_dir)) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
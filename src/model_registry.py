@@ -0,0 +1,123 @@
+# src/model_registry.py
+"""
+Process-wide registry of loaded models and other heavy shared objects.
+Every instance is created lazily on first get(), exactly once per key even
+with concurrent callers, and then shared by ingest, retrieval and generation
+(one MiniLM encoder per process instead of one per component / upload).
+Load times are recorded per key; warmup() loads the serving models up front
+and logs the startup-time breakdown.
+"""
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Components loaded at API / UI startup, e.g. "embedder,reranker,generator".
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "")
+
+
+def _key_name(key) -> str:
+    return ":".join(str(k) for k in key) if isinstance(key, tuple) else str(key)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._instances = {}
+        self._locks = {}            # key -> lock held while that key loads
+        self._lock = threading.Lock()
+        self.load_seconds = {}
+
+    def get(self, key, loader):
+        """
+        Shared instance for key, created with loader() on first use.
+        Loading one key does not block callers of other keys.
+        """
+        try:
+            return self._instances[key]
+        except KeyError:
+            pass
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._instances:
+                start = time.perf_counter()
+                instance = loader()
+                self.load_seconds[key] = time.perf_counter() - start
+                self._instances[key] = instance
+                logger.info("Loaded %s in %.2fs", _key_name(key), self.load_seconds[key])
+        return self._instances[key]
+
+    def loaded(self, key) -> bool:
+        return key in self._instances
+
+    def stats(self) -> dict:
+        """
+        Load time (seconds) per loaded key.
+        """
+        return {_key_name(k): round(v, 3) for k, v in self.load_seconds.items()}
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+            self._locks.clear()
+            self.load_seconds.clear()
+
+
+registry = ModelRegistry()
+
+
+# ----------------------
+# WARM-UP
+# ----------------------
+def _warm_embedder(infer=True):
+    from .embeddings import shared_model
+    model = shared_model()
+    if infer:
+        model.encode(["warm up"], show_progress_bar=False)
+
+
+def _warm_reranker(infer=True):
+    from .reranker import Reranker
+    model = Reranker().model
+    if infer:
+        model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+
+def _warm_generator(infer=True):
+    from .generation_strict import StrictGenerator
+    g = StrictGenerator()
+    inputs = g.tokenizer("warm up", return_tensors="pt")
+    model = g.model
+    if infer:
+        model.generate(**inputs, max_new_tokens=1, do_sample=False)
+
+
+WARMERS = {
+    "embedder": _warm_embedder,
+    "reranker": _warm_reranker,
+    "generator": _warm_generator,
+}
+
+
+def warmup(components=MODEL_WARMUP, infer: bool = True) -> dict:
+    """
+    Load the named components (list or comma-separated string) and run one
+    tiny inference through each, so the first request does not pay for it.
+    infer=False only loads the weights (used before forking workers).
+    Returns seconds per component; the breakdown is logged.
+    """
+    if isinstance(components, str):
+        components = [c.strip() for c in components.split(",") if c.strip()]
+    timings = {}
+    for name in components:
+        if name not in WARMERS:
+            raise ValueError(f"Unknown warm-up component {name!r}; expected one of {', '.join(WARMERS)}")
+        start = time.perf_counter()
+        WARMERS[name](infer)
+        timings[name] = time.perf_counter() - start
+    if timings:
+        logger.info("Model warm-up %.2fs: %s", sum(timings.values()),
+                    ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    return timings
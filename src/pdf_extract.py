@@ -0,0 +1,178 @@
+# src/pdf_extract.py
+"""
+PDF text extraction engine.
+Every page goes through PyMuPDF first. Pages whose text layer is empty or
+garbled (unmapped glyphs, control characters, run-together words) are
+retried with pdfplumber's layout extraction, and scanned or still-garbled
+pages are rendered and OCR'd with Tesseract in a small worker pool.
+Per-page method and timing are recorded so ingestion time can be traced.
+"""
+import io
+import os
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # pymupdf
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 2))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_DPI = int(os.getenv("OCR_DPI", 200))
+# A page with fewer non-blank characters than this has no usable text layer.
+MIN_PAGE_CHARS = 20
+# Share of characters that may be garbage before a page counts as garbled.
+GARBLED_RATIO = 0.2
+# Words this long are run-together text (missing spaces in the text layer).
+LONG_WORD = 25
+
+_GARBAGE = re.compile(r"\(cid:\d+\)|[\ufffd\x00-\x08\x0b\x0c\x0e-\x1f]")
+_LONG_WORD = re.compile(r"\S{%d,}" % LONG_WORD)
+
+_tesseract_ok = None
+
+
+def page_quality(text: str) -> str:
+    """
+    'ok', 'empty' or 'garbled'.
+    """
+    n = len(text.strip())
+    if n < MIN_PAGE_CHARS:
+        return "empty"
+    garbage = sum(len(m) for m in _GARBAGE.findall(text))
+    run_together = sum(len(m) for m in _LONG_WORD.findall(text))
+    if garbage > GARBLED_RATIO * n or run_together > GARBLED_RATIO * n:
+        return "garbled"
+    return "ok"
+
+
+def tesseract_available() -> bool:
+    global _tesseract_ok
+    if _tesseract_ok is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _tesseract_ok = True
+        except Exception as e:
+            logger.warning("Tesseract OCR unavailable, scanned pages stay empty: %s", e)
+            _tesseract_ok = False
+    return _tesseract_ok
+
+
+def ocr_png(png: bytes, lang: str = OCR_LANG):
+    """
+    OCR one rendered page. Returns (text, seconds).
+    """
+    import pytesseract
+    from PIL import Image
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=lang)
+    return text, time.perf_counter() - start
+
+
+class ExtractedDocument:
+    def __init__(self, path: str):
+        self.path = path
+        self.pages = []        # text per page
+        self.page_stats = []   # per page: {'page', 'method', 'quality', 'seconds', 'chars'}
+
+    @property
+    def seconds(self) -> float:
+        return sum(s["seconds"] for s in self.page_stats)
+
+
+def extract_document(path: str, ocr_workers: int = OCR_WORKERS) -> ExtractedDocument:
+    """
+    Extract text per page with per-page fallbacks (see module docstring).
+    """
+    doc = ExtractedDocument(path)
+    try:
+        pdf = fitz.open(path)
+    except Exception as e:
+        logger.error("Failed to open %s with PyMuPDF (%s); using pdfplumber", path, e)
+        return _extract_with_pdfplumber(doc)
+
+    plumber = None      # opened on first need; False once it failed to open
+    ocr_pool = None
+    ocr_jobs = []   # (page index, future)
+    try:
+        for i, page in enumerate(pdf):
+            start = time.perf_counter()
+            # a damaged page is logged and recorded as 'failed', never fatal
+            try:
+                text = page.get_text() or ""
+                method = "pymupdf"
+            except Exception as e:
+                logger.warning("PyMuPDF failed on %s page %d: %s", path, i, e)
+                text, method = "", "failed"
+            quality = page_quality(text)
+
+            if (quality == "garbled" or method == "failed") and plumber is not False:
+                try:
+                    if plumber is None:
+                        plumber = pdfplumber.open(path)
+                    alt = plumber.pages[i].extract_text() or ""
+                    if page_quality(alt) == "ok":
+                        text, method, quality = alt, "pdfplumber", "ok"
+                except Exception as e:
+                    logger.warning("pdfplumber failed on %s page %d: %s", path, i, e)
+                    if plumber is None:
+                        plumber = False
+
+            try:
+                needs_ocr = quality == "garbled" or (quality == "empty" and page.get_images())
+                if needs_ocr and ocr_workers > 0 and tesseract_available():
+                    if ocr_pool is None:
+                        ocr_pool = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr")
+                    png = page.get_pixmap(dpi=OCR_DPI).tobytes("png")
+                    ocr_jobs.append((i, ocr_pool.submit(ocr_png, png)))
+                    method = "ocr"
+            except Exception as e:
+                logger.warning("Rendering %s page %d for OCR failed: %s", path, i, e)
+
+            doc.pages.append(text)
+            doc.page_stats.append({"page": i, "method": method, "quality": quality,
+                                   "seconds": time.perf_counter() - start, "chars": len(text)})
+
+        for i, future in ocr_jobs:
+            stats = doc.page_stats[i]
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                logger.warning("OCR failed on %s page %d: %s", path, i, e)
+                stats["method"] = "ocr_failed"
+                continue
+            stats["seconds"] += seconds
+            if text.strip():
+                doc.pages[i] = text
+                stats["chars"] = len(text)
+                stats["quality"] = page_quality(text)
+    finally:
+        pdf.close()
+        if plumber not in (None, False):
+            plumber.close()
+        if ocr_pool is not None:
+            ocr_pool.shutdown()
+    return doc
+
+
+def _extract_with_pdfplumber(doc: ExtractedDocument) -> ExtractedDocument:
+    try:
+        with pdfplumber.open(doc.path) as pdf:
+            for i, page in enumerate(pdf.pages):
+                start = time.perf_counter()
+                method = "pdfplumber"
+                try:
+                    text = page.extract_text() or ""
+                except Exception as e:
+                    logger.warning("pdfplumber failed on %s page %d: %s", doc.path, i, e)
+                    text, method = "", "failed"
+                doc.pages.append(text)
+                doc.page_stats.append({"page": i, "method": method, "quality": page_quality(text),
+                                       "seconds": time.perf_counter() - start, "chars": len(text)})
+    except Exception as e:
+        logger.error("Failed to extract text from %s: %s", doc.path, e)
+    return doc
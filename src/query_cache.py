@@ -0,0 +1,94 @@
+# src/query_cache.py
+"""
+In-process TTL + LRU cache for fused retrieval results.
+Entries are tagged with the index generation they were computed against;
+once ingestion bumps the generation the whole cache is dropped.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .embedding_cache import normalize_text
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))    # 0 disables
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 600))     # seconds
+
+
+class QueryCache:
+    def __init__(self, generation_fn, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        """
+        generation_fn: callable returning the current index generation.
+        """
+        self.generation_fn = generation_fn
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = None
+        self._entries = OrderedDict()    # key -> (expires_at, results)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, top_k: int):
+        return normalize_text(query).lower(), top_k
+
+    def _check_generation(self):
+        gen = self.generation_fn()
+        if gen != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = gen
+
+    def generation(self):
+        """
+        Current index generation; read it before retrieving and pass it to put().
+        """
+        return self.generation_fn()
+
+    def get(self, query: str, top_k: int):
+        if self.max_entries <= 0:
+            return None
+        k = self.key(query, top_k)
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(k)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[k]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(k)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, query: str, top_k: int, results, generation=None):
+        """
+        Cache results; skipped when generation (read before the results were
+        computed) is no longer current, so pre-ingest results are never stored.
+        """
+        if self.max_entries <= 0:
+            return
+        k = self.key(query, top_k)
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[k] = (time.monotonic() + self.ttl, copy.deepcopy(results))
+            self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+            "generation": self._generation,
+        }
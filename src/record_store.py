@@ -0,0 +1,161 @@
+# src/record_store.py
+"""
+Append-only, memory-mapped record store keyed by int64 id.
+Records are appended to a data file and read back through mmap; a compact
+offset index (ids, offsets, lengths as NumPy arrays) maps id -> record.
+Overwrites append a new record and re-point the id; the old bytes are
+reclaimed by compact(), which writes a new data file that the offset index
+switches to when it is next flushed.
+"""
+import mmap
+import os
+import re
+import threading
+
+import numpy as np
+
+
+class RecordStore:
+    def __init__(self, path: str):
+        """
+        path: prefix; files are <path>.dat (records; <path>.<epoch>.dat after
+        a compaction) and <path>.idx.npz (offset index, naming the data file's epoch).
+        """
+        self.path = path
+        self.index_path = path + ".idx.npz"
+        self._lock = threading.Lock()
+        self._rows = {}          # id -> (offset, length)
+        self._mm = None
+        self._mm_size = 0
+        self.epoch = 0
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        if os.path.exists(self.index_path):
+            with np.load(self.index_path) as idx:
+                self._rows = dict(zip(idx["ids"].tolist(), zip(idx["offsets"].tolist(), idx["lengths"].tolist())))
+                self.epoch = int(idx["epoch"]) if "epoch" in idx.files else 0
+        self.data_path = self._data_file(self.epoch)
+        self._fh = open(self.data_path, "ab")
+
+    def _data_file(self, epoch: int) -> str:
+        return self.path + ".dat" if epoch == 0 else f"{self.path}.{epoch}.dat"
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return int(key) in self._rows
+
+    def put_many(self, items):
+        """
+        items: iterable of (id, bytes)
+        """
+        with self._lock:
+            offset = self._fh.seek(0, os.SEEK_END)
+            for key, data in items:
+                self._fh.write(data)
+                self._rows[int(key)] = (offset, len(data))
+                offset += len(data)
+            self._fh.flush()
+
+    def put(self, key, data: bytes):
+        self.put_many([(key, data)])
+
+    def _view(self, end: int):
+        if self._mm is None or end > self._mm_size:
+            if self._mm is not None:
+                self._mm.close()
+            size = os.path.getsize(self.data_path)
+            if size:
+                with open(self.data_path, "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            else:
+                self._mm = None
+            self._mm_size = size
+        return self._mm
+
+    def get(self, key, default=None):
+        row = self._rows.get(int(key))
+        if row is None:
+            return default
+        offset, length = row
+        with self._lock:
+            mm = self._view(offset + length)
+            return bytes(mm[offset:offset + length]) if length else b""
+
+    def get_many(self, keys):
+        return [self.get(k) for k in keys]
+
+    def delete(self, keys):
+        with self._lock:
+            for k in keys:
+                self._rows.pop(int(k), None)
+
+    def garbage_ratio(self) -> float:
+        """
+        Fraction of the data file held by deleted or overwritten records.
+        """
+        size = os.path.getsize(self.data_path)
+        if not size:
+            return 0.0
+        return 1.0 - sum(length for _, length in self._rows.values()) / size
+
+    def flush(self):
+        """
+        Persist the offset index (atomically).
+        """
+        with self._lock:
+            ids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+            rows = np.array(list(self._rows.values()), dtype=np.int64).reshape(-1, 2)
+            tmp = self.index_path + ".tmp.npz"
+            np.savez(tmp, ids=ids, offsets=rows[:, 0], lengths=rows[:, 1], epoch=self.epoch)
+            os.replace(tmp, self.index_path)
+
+    def compact(self):
+        """
+        Rewrite the live records into a new data file. The old file is left
+        untouched, so the persisted offset index stays valid until flush()
+        commits the new one.
+        """
+        with self._lock:
+            live = sorted(self._rows.items(), key=lambda kv: kv[1][0])
+            size = os.path.getsize(self.data_path)
+            mm = self._view(size)
+            previous = self.data_path
+            new_path = self._data_file(self.epoch + 1)
+            new_rows = {}
+            with open(new_path, "wb") as out:
+                offset = 0
+                for key, (off, length) in live:
+                    out.write(mm[off:off + length])
+                    new_rows[key] = (offset, length)
+                    offset += length
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._fh.close()
+            self.epoch += 1
+            self.data_path = new_path
+            self._fh = open(self.data_path, "ab")
+            self._rows = new_rows
+            self._mm_size = 0
+        self.flush()
+        # keep the previous file for readers that have not reopened yet
+        folder, base = os.path.split(self.path)
+        pattern = re.compile(re.escape(base) + r"(\.\d+)?\.dat")
+        for name in os.listdir(folder or "."):
+            path = os.path.join(folder, name)
+            if pattern.fullmatch(name) and path not in (self.data_path, previous):
+                os.remove(path)
+
+    def close(self, flush: bool = True):
+        """
+        Release the file handle and mapping; flush=False for read-only users,
+        so a stale view never overwrites the writer's offset index.
+        """
+        if flush:
+            self.flush()
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._fh.close()
@@ -0,0 +1,137 @@
+# src/reranker.py
+"""
+Optional cross-encoder rerank stage for HybridRetriever.
+Only the fused top-N is scored, in one batched forward pass, with passages
+truncated to a token budget. Scores are cached per (query hash, chunk) and
+reranking is skipped when the fused scores are already well separated.
+"""
+import hashlib
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+from .embedding_cache import normalize_text
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 20))
+RERANK_MAX_TOKENS = int(os.getenv("RERANK_MAX_TOKENS", 256))   # passage budget
+RERANK_QUERY_TOKENS = 64
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 10000))
+# Skip reranking when every adjacent gap in the fused top_k (+1) is at least
+# this fraction of the fused score range.
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", 0.2))
+
+
+def hit_text(hit) -> str:
+    if hit.get("text"):
+        return hit["text"]
+    meta = hit.get("payload") or hit.get("meta") or {}
+    return meta.get("text") or ""
+
+
+def hit_key(hit):
+    if hit.get("id") is not None:
+        return hit["id"]
+    meta = hit.get("payload") or hit.get("meta") or {}
+    return f"{meta.get('source')}:{meta.get('chunk_id')}"
+
+
+class Reranker:
+    def __init__(self, model_name: str = RERANK_MODEL, top_n: int = RERANK_TOP_N,
+                 max_tokens: int = RERANK_MAX_TOKENS, skip_margin: float = RERANK_SKIP_MARGIN,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.max_tokens = max_tokens
+        self.skip_margin = skip_margin
+        self.cache_size = cache_size
+        self.reranked = 0
+        self.skipped = 0
+        self._model = None
+        self._cache = OrderedDict()     # (query hash, chunk key) -> score
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """
+        CrossEncoder, loaded on first use and shared process-wide.
+        """
+        if self._model is None:
+            max_length = self.max_tokens + RERANK_QUERY_TOKENS
+            self._model = registry.get(("reranker", self.model_name, max_length),
+                                       lambda: CrossEncoder(self.model_name, max_length=max_length))
+        return self._model
+
+    def truncate(self, passages):
+        """
+        Cut passages to max_tokens using the cross-encoder tokenizer offsets.
+        """
+        tok = self.model.tokenizer
+        enc = tok(list(passages), add_special_tokens=False, truncation=True,
+                  max_length=self.max_tokens, return_offsets_mapping=True)
+        out = []
+        for passage, offsets in zip(passages, enc["offset_mapping"]):
+            out.append(passage[:offsets[-1][1]] if offsets else passage)
+        return out
+
+    def predict(self, pairs):
+        """
+        Score [query, passage] pairs in a single batch.
+        """
+        passages = self.truncate([p for _, p in pairs])
+        pairs = [[q, p] for (q, _), p in zip(pairs, passages)]
+        return self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+    def well_separated(self, scores, top_k: int) -> bool:
+        s = np.asarray(scores, dtype=np.float64)
+        span = s.max() - s.min() if len(s) else 0.0
+        head = s[:top_k + 1]
+        if span <= 0 or len(head) < 2:
+            return False
+        return float(np.min(-np.diff(head))) / span >= self.skip_margin
+
+    def rerank(self, query: str, candidates, top_k: int = 5, hydrate=None):
+        """
+        candidates: fused hits sorted by 'score'. Returns the top_k after
+        cross-encoder scoring; the fused score is kept as 'fusion_score'.
+        hydrate: optional fn(hits) -> hits with text, applied only to the
+        candidates whose scores are not cached.
+        """
+        if len(candidates) <= 1 or self.well_separated([c.get("score") or 0.0 for c in candidates], top_k):
+            self.skipped += 1
+            return candidates[:top_k]
+
+        qh = hashlib.sha1(normalize_text(query).lower().encode("utf-8")).hexdigest()
+        keys = [(qh, hit_key(c)) for c in candidates]
+        with self._lock:
+            scores = [self._cache.get(k) for k in keys]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            hits = [candidates[i] for i in missing]
+            if hydrate is not None:
+                hits = hydrate(hits)
+            new_scores = self.predict([[query, hit_text(h)] for h in hits])
+            with self._lock:
+                for i, s in zip(missing, new_scores):
+                    scores[i] = float(s)
+                    self._cache[keys[i]] = scores[i]
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        self.reranked += 1
+
+        out = []
+        for c, s in zip(candidates, scores):
+            c = dict(c)
+            c["fusion_score"] = c.get("score")
+            c["score"] = s
+            out.append(c)
+        out.sort(key=lambda x: x["score"], reverse=True)
+        return out[:top_k]
@@ -1,19 +1,69 @@
 # retriever_hybrid.py
-from qdrant_client import QdrantClient
 from qdrant_client.models import SearchRequest
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import numpy as np
+import asyncio
+import contextvars
+import logging
+import os
+
+from .manifest import current_generation
+from .query_cache import QueryCache
+from .bm25_index import BM25Index, bm25_path
+from .chunk_store import ChunkStore, chunk_store_path
+from . import fusion, tracing
+from .reranker import Reranker, hit_key
+from .vectorstore import get_vector_store, VECTOR_BACKEND
+from .embeddings import shared_model
+
+logger = logging.getLogger(__name__)
+
+# Per-leg time budgets (seconds). A leg that misses its budget is dropped
+# and the query is answered from the other leg.
+DENSE_TIMEOUT = float(os.getenv("DENSE_TIMEOUT", 5.0))
+LEXICAL_TIMEOUT = float(os.getenv("LEXICAL_TIMEOUT", 1.0))
+RETRIEVER_THREADS = int(os.getenv("RETRIEVER_THREADS", 4))
+# Fusion: 'rrf' (rank based) or 'minmax' / 'zscore' normalized weighted sum.
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf")
+DENSE_WEIGHT = float(os.getenv("DENSE_WEIGHT", 0.55))
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", 0.45))
+# Candidates fetched per leg; see benchmarks/eval_fusion.py for recall vs depth.
+CANDIDATE_DEPTH = int(os.getenv("CANDIDATE_DEPTH", 20))
+# Cross-encoder rerank of the fused top-N (see reranker.py); off unless RERANK=1.
+RERANK = os.getenv("RERANK", "0") == "1"
 
 class HybridRetriever:
     """
-    A hybrid retriever combining BM25 + Dense vector search + Rerank merging.
+    A hybrid retriever combining BM25 + Dense vector search, score fusion and
+    an optional cross-encoder rerank.
     Compatible with any Qdrant version (old/new) thanks to safe tuple parsing.
     """
 
-    def __init__(self, qdrant_collection: str = "papers", host="localhost", port=6333):
+    def __init__(self, qdrant_collection: str = "papers", host="localhost", port=6333,
+                 fusion_method: str = FUSION_METHOD, depth: int = CANDIDATE_DEPTH, rerank: bool = RERANK):
         self.collection = qdrant_collection
-        self.client = QdrantClient(host=host, port=port)
-        self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.fusion = fusion_method
+        self.depth = depth
+        self.host = host
+        self.port = port
+        self.backend = VECTOR_BACKEND
+        self._store = None
+        self._store_generation = None
+        # lexical scoring and query encoding run here, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=RETRIEVER_THREADS, thread_name_prefix="retriever")
+        self.reranker = Reranker() if rerank else None
+        self.cache = QueryCache(generation_fn=lambda: current_generation(self.collection))
+        self._bm25 = None
+        self._bm25_generation = None
+        self._chunks = None
+        self._chunks_generation = None
+
+    @property
+    def model(self):
+        """
+        Query encoder: the process-wide MiniLM shared with ingest (loaded on first use).
+        """
+        return shared_model()
 
     # ----------------------
     # SAFE TUPLE PARSER
@@ -54,69 +104,225 @@ class HybridRetriever:
     # ----------------------
     # BM25 SEARCH
     # ----------------------
-    def bm25_search(self, query: str, k=10):
-        hits = self.client.query_points(
-            collection_name=self.collection,
-            query=query,
-            limit=k,
-            using="bm25",
-        )
+    def bm25_index(self):
+        """
+        Local BM25 index written by index_folder; reloaded when the index generation changes.
+        """
+        gen = current_generation(self.collection)
+        if self._bm25 is None or gen != self._bm25_generation:
+            self._bm25 = BM25Index.load(bm25_path(self.collection))
+            self._bm25_generation = gen
+        return self._bm25
 
-        return [self._parse_hit(h) for h in hits]
+    @tracing.traced("bm25_search")
+    def bm25_search(self, query: str, k=10):
+        return self.bm25_index().search(query, k=k)
 
     # ----------------------
     # DENSE SEARCH
     # ----------------------
+    def vector_store(self):
+        """
+        Dense backend (see vectorstore.py), created on first use. The embedded
+        FAISS store is reopened (and the old one closed) when the index
+        generation changes.
+        """
+        gen = current_generation(self.collection) if self.backend == "faiss" else None
+        if self._store is None or gen != self._store_generation:
+            if self._store is not None:
+                # read-only here: ingest owns the files
+                self._store.close(flush=False)
+            self._store = get_vector_store(
+                self.collection,
+                vector_size=self.model.get_sentence_embedding_dimension(),
+                backend=self.backend,
+                host=self.host,
+                port=self.port,
+            )
+            self._store_generation = gen
+        return self._store
+
+    @tracing.traced("encode_query")
+    def encode_query(self, query: str):
+        return self.model.encode(query, show_progress_bar=False).tolist()
+
+    @tracing.traced("dense_search")
     def dense_search(self, query: str, k=10):
-        q_vec = self.model.encode(query).tolist()
+        q_vec = self.encode_query(query)
+        store = self.vector_store()
+        with tracing.span("vector_search"):
+            res = store.search(q_vec, top_k=k)
+        return [self._parse_hit(h) for h in res.points]
 
-        hits = self.client.query_points(
-            collection_name=self.collection,
-            query_vector=q_vec,
-            limit=k,
-        )
+    @tracing.traced("dense_search")
+    async def adense_search(self, query: str, k=10):
+        q_vec = await self._in_executor(self.encode_query, query)
+        store = await self._in_executor(self.vector_store)
+        with tracing.span("vector_search"):
+            if hasattr(store, "asearch"):
+                res = await store.asearch(q_vec, top_k=k)
+            else:
+                res = await self._in_executor(store.search, q_vec, k)
+        return [self._parse_hit(h) for h in res.points]
+
+    async def abm25_search(self, query: str, k=10):
+        return await self._in_executor(self.bm25_search, query, k)
 
-        return [self._parse_hit(h) for h in hits]
+    def _in_executor(self, fn, *args):
+        """
+        Run fn in the retriever pool with the caller's context, so spans
+        land in the calling request's timing breakdown.
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, contextvars.copy_context().run, fn, *args)
+
+    # ----------------------
+    # CHUNK TEXT
+    # ----------------------
+    def chunk_store(self):
+        """
+        Chunk text written by index_folder; reopened (and the old one closed)
+        when the index generation changes.
+        """
+        gen = current_generation(self.collection)
+        if self._chunks is None or gen != self._chunks_generation:
+            if self._chunks is not None:
+                self._chunks.close(flush=False)
+            self._chunks = ChunkStore(chunk_store_path(self.collection))
+            self._chunks_generation = gen
+        return self._chunks
+
+    def hydrate(self, hits):
+        """
+        Fill payload['text'] from the chunk store for hits that carry no text
+        (payloads hold ids and metadata only). Returns new hit dicts.
+        """
+        todo = [i for i, h in enumerate(hits)
+                if isinstance(h.get("id"), int) and not h.get("text") and not (h.get("payload") or {}).get("text")]
+        if not todo:
+            return hits
+        texts = self.chunk_store().texts([hits[i]["id"] for i in todo])
+        hits = list(hits)
+        for i, text in zip(todo, texts):
+            hits[i] = dict(hits[i], payload=dict(hits[i].get("payload") or {}, text=text))
+        return hits
 
     # ----------------------
     # MERGE + RERANK
     # ----------------------
+    @tracing.traced("merge_and_rerank")
     def merge_and_rerank(self, query: str, top_k=5):
-        bm25 = self.bm25_search(query, k=20)
-        dense = self.dense_search(query, k=20)
-
-        # scoring maps
-        all_docs = {}
-        for h in bm25:
-            all_docs[h["id"]] = {"bm25": h["score"], "dense": 0, "payload": h["payload"]}
-        for h in dense:
-            if h["id"] not in all_docs:
-                all_docs[h["id"]] = {"bm25": 0, "dense": h["score"], "payload": h["payload"]}
-            else:
-                all_docs[h["id"]]["dense"] = h["score"]
+        """
+        Run both legs concurrently (lexical in the thread pool, dense in the
+        calling thread) and fuse. A leg that fails or times out is skipped.
+        """
+        generation = self.cache.generation()
+        cached = self.cache.get(query, top_k)
+        if cached is not None:
+            return cached
 
-        # normalized score
-        results = []
-        for doc_id, v in all_docs.items():
-            final_score = 0.55 * v["dense"] + 0.45 * v["bm25"]
-            results.append({
-                "id": doc_id,
-                "score": final_score,
-                "payload": v["payload"],
-            })
+        bm25_future = self.executor.submit(contextvars.copy_context().run, self.bm25_search, query, self.depth)
+        try:
+            dense = self.dense_search(query, k=self.depth)
+        except Exception as e:
+            logger.warning("Dense retrieval failed, using lexical results only: %s", e)
+            dense = None
+        try:
+            bm25 = bm25_future.result(timeout=LEXICAL_TIMEOUT)
+        except FutureTimeout:
+            logger.warning("Lexical retrieval exceeded %.2fs, using dense results only", LEXICAL_TIMEOUT)
+            bm25 = None
+        except Exception as e:
+            logger.warning("Lexical retrieval failed, using dense results only: %s", e)
+            bm25 = None
+        return self._finish(query, top_k, bm25, dense, generation)
 
-        results = sorted(results, key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+    @tracing.traced("merge_and_rerank")
+    async def amerge_and_rerank(self, query: str, top_k=5):
+        """
+        Async variant for the API: both legs run concurrently, each under its
+        own timeout, without blocking the event loop.
+        """
+        generation = self.cache.generation()
+        cached = self.cache.get(query, top_k)
+        if cached is not None:
+            return cached
+
+        bm25, dense = await asyncio.gather(
+            self._leg("lexical", self.abm25_search(query, k=self.depth), LEXICAL_TIMEOUT),
+            self._leg("dense", self.adense_search(query, k=self.depth), DENSE_TIMEOUT),
+        )
+        return await self._in_executor(self._finish, query, top_k, bm25, dense, generation)
+
+    async def _leg(self, name: str, coro, timeout: float):
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%s retrieval exceeded %.2fs, skipping it", name, timeout)
+        except Exception as e:
+            logger.warning("%s retrieval failed, skipping it: %s", name, e)
+        return None
+
+    def _finish(self, query: str, top_k, bm25, dense, generation=None):
+        """
+        Fuse the legs and rerank the fused top-N when a reranker is set.
+        Chunk text is fetched only for the final top_k (and for rerank
+        candidates the cross-encoder has to score).
+        Degraded results (a missing leg) are not cached, nor are results
+        whose retrieval overlapped a generation bump.
+        """
+        if bm25 is None and dense is None:
+            raise RuntimeError("Both retrieval legs failed")
+        with tracing.span("fusion"):
+            n = top_k if self.reranker is None else max(top_k, self.reranker.top_n)
+            results = self.fuse(bm25 or [], dense or [], n)
+        if self.reranker is not None:
+            with tracing.span("rerank"):
+                results = self.reranker.rerank(query, results, top_k, hydrate=self.hydrate)
+        with tracing.span("hydrate"):
+            results = self.hydrate(results)
+        if bm25 is not None and dense is not None:
+            self.cache.put(query, top_k, results, generation)
+        return results
+
+    def fuse(self, bm25, dense, top_k=5):
+        """
+        Fuse both legs with the configured method (see fusion.py).
+        Hits are keyed by point id, or by source/chunk_id when no id is set.
+        """
+        keys = {}
+        payloads = []
+        legs = []
+        for hits in (dense, bm25):
+            idx = np.empty(len(hits), dtype=np.int64)
+            for i, h in enumerate(hits):
+                key = hit_key(h)
+                if key not in keys:
+                    keys[key] = len(payloads)
+                    payloads.append(h)
+                idx[i] = keys[key]
+            legs.append((idx, np.array([h.get("score") or 0.0 for h in hits], dtype=np.float64)))
+
+        idx, scores = fusion.fuse(legs, method=self.fusion, weights=[DENSE_WEIGHT, LEXICAL_WEIGHT], top_k=top_k)
+        results = []
+        for i, score in zip(idx.tolist(), scores.tolist()):
+            hit = dict(payloads[i])
+            hit["score"] = score
+            hit.pop("vector", None)
+            results.append(hit)
+        return results
 
     def convert_for_generator(self, merged_results):
         """
         Convert results into the format required by StrictGenerator.
+        meta['id'] is the content-derived point id (see answer_cache.py).
         """
         converted = []
         for item in merged_results:
             payload = item.get("payload", {})
             converted.append({
                 "meta": {
+                    "id": item.get("id"),
                     "source": payload.get("source", "unknown"),
                     "chunk_id": payload.get("chunk_id", 0),
                     "text": payload.get("text", "")
@@ -0,0 +1,146 @@
+# src/serve.py
+"""
+Preforking multi-worker launcher for the API.
+The parent imports the app, loads the models once (SERVE_PRELOAD), freezes
+the GC so refcount bookkeeping does not touch the shared heap, binds the
+listening socket and forks N uvicorn workers. Model weights and the other
+read-only state are then shared copy-on-write instead of being loaded N
+times. Each worker gets INFERENCE_THREADS (default: cores / workers) torch
+threads; the kernel spreads connections over the workers accepting on the
+shared socket. Dead workers are restarted; SIGINT / SIGTERM stop them all.
+Worker 0 also runs the ingest job queue. Per-worker request counters are
+served at /workers.
+Usage:
+    python -m src.serve --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+import logging
+
+import uvicorn
+
+from .retriever_hybrid import RERANK
+
+logger = logging.getLogger(__name__)
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", os.cpu_count() or 1))
+# Models loaded in the parent before forking (see model_registry.WARMERS);
+# the cross-encoder only when reranking is on.
+SERVE_PRELOAD = os.getenv("SERVE_PRELOAD", "embedder,reranker,generator" if RERANK else "embedder,generator")
+# A worker dying sooner than this after its start is restarted only after
+# this long, so a crashing app does not turn into a fork loop.
+RESTART_DELAY = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, app, sock, threads: int, log_level: str):
+    import torch
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 8000, workers: int = SERVE_WORKERS, threads: int = 0,
+          log_level: str = "info", on_fork=None):
+    """
+    Fork workers serving app on host:port until SIGINT / SIGTERM.
+    on_fork(index) runs in each worker right after the fork.
+    threads: torch threads per worker (0 = cores / workers).
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    sock = bind_socket(host, port)
+    gc.collect()
+    gc.freeze()
+    children = {}       # pid -> (worker index, start time)
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                if on_fork is not None:
+                    on_fork(index)
+                _run_worker(index, app, sock, threads, log_level)
+            except BaseException:
+                logger.exception("Worker %d crashed", index)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = (index, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for i in range(workers):
+        spawn(i)
+    logger.info("Serving on %s:%d with %d workers x %d threads", host, port, workers, threads)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in children or stopping:
+            children.pop(pid, None)
+            continue
+        index, started = children.pop(pid)
+        logger.warning("Worker %d (pid %d) exited with status %d; restarting", index, pid, status)
+        if time.monotonic() - started < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn(index)
+    sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("INFERENCE_THREADS", 0)),
+                        help="torch threads per worker (0 = cores / workers)")
+    parser.add_argument("--preload", type=str, default=SERVE_PRELOAD)
+    parser.add_argument("--log_level", type=str, default="info")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from . import api_main
+    from .model_registry import warmup
+    from .worker_stats import WorkerStats
+    # weights only: inference threads started before fork are not inherited
+    warmup(args.preload, infer=False)
+    api_main.worker_stats = WorkerStats(args.workers)
+
+    def on_fork(index):
+        api_main.worker_stats.attach(index)
+        api_main.RUN_JOBS = api_main.RUN_JOBS and index == 0
+
+    serve(api_main.app, args.host, args.port, args.workers, args.threads, args.log_level, on_fork=on_fork)
+
+
+if __name__ == "__main__":
+    main()
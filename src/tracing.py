@@ -0,0 +1,185 @@
+# src/tracing.py
+"""
+Lightweight tracing: span timers for the query and ingest pipelines.
+Every finished span is observed into a per-stage latency histogram
+(exposed in Prometheus text format by render_prometheus) and, while a
+per-request breakdown is being collected (collect()), added to that
+request's {stage: seconds} dict. The breakdown follows contextvars, so work
+handed to thread pools must run under contextvars.copy_context() or attach().
+Histograms are per process; with several serving workers each one reports
+its own, labelled with its worker index.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit).
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar("trace_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """
+        (cumulative bucket counts incl. +Inf, sum, count).
+        """
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, n
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(stage: str) -> Histogram:
+    h = _histograms.get(stage)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(stage, Histogram())
+    return h
+
+
+def record(stage: str, seconds: float, timings: dict = None):
+    """
+    Observe one finished stage; also adds it to timings (default: the
+    current request's breakdown, if one is being collected).
+    """
+    histogram(stage).observe(seconds)
+    add(_current.get() if timings is None else timings, stage, seconds)
+
+
+def add(timings, stage: str, seconds: float):
+    """
+    Add to a breakdown only (no histogram), e.g. to charge a shared batch
+    to each request in it. timings may be None.
+    """
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def traced(stage: str):
+    """
+    Decorator: run the function (sync or async) inside span(stage).
+    """
+    def wrap(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+
+@contextmanager
+def attach(timings):
+    """
+    Record spans into timings (a breakdown dict, or None for histograms
+    only), e.g. in a worker thread acting for a request.
+    """
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def bind(timings):
+    """
+    Like attach(), but for the rest of the current task (not restored), for
+    async generators whose steps cannot share a with-block's context.
+    """
+    _current.set(timings)
+
+
+def collect():
+    """
+    Start a per-request breakdown: `with collect() as timings: ...`.
+    """
+    return attach({})
+
+
+def current():
+    return _current.get()
+
+
+def as_ms(timings: dict) -> dict:
+    return {k: round(v * 1000, 3) for k, v in timings.items()}
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# ----------------------
+# PROMETHEUS EXPOSITION
+# ----------------------
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(extra=(), labels: dict = None, prefix: str = "rag") -> str:
+    """
+    Stage histograms as '<prefix>_stage_seconds', followed by extra metrics
+    given as (name, type, help, [(labels, value), ...]). labels are added
+    to every sample (e.g. the worker index); a sample's own labels win.
+    """
+    labels = labels or {}
+    name = f"{prefix}_stage_seconds"
+    lines = [f"# HELP {name} Time spent in each pipeline stage.", f"# TYPE {name} histogram"]
+    for stage in sorted(_histograms):
+        cumulative, total, n = _histograms[stage].snapshot()
+        base = dict(labels, stage=stage)
+        for bound, count in zip([*map(str, BUCKETS), "+Inf"], cumulative):
+            lines.append(f"{name}_bucket{_labels(dict(base, le=bound))} {count}")
+        lines.append(f"{name}_sum{_labels(base)} {total}")
+        lines.append(f"{name}_count{_labels(base)} {n}")
+    for metric, kind, help_text, samples in extra:
+        metric = f"{prefix}_{metric}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for sample_labels, value in samples:
+            lines.append(f"{metric}{_labels(dict(labels, **sample_labels))} {value}")
+    return "\n".join(lines) + "\n"
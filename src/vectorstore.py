@@ -0,0 +1,24 @@
+# src/vectorstore.py
+"""
+Vector store selection. VECTOR_BACKEND=qdrant (default) talks to the Qdrant
+server; VECTOR_BACKEND=faiss uses the embedded FaissStore under INDEX_DIR.
+Both expose upsert_points / upsert_arrays / delete_points / search / flush.
+"""
+import os
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+
+
+def get_vector_store(collection: str, vector_size: int = 384, backend: str = None, **qdrant_kwargs):
+    """
+    qdrant_kwargs (host, port, client) are passed to QdrantStore only.
+    """
+    backend = backend or VECTOR_BACKEND
+    if backend == "qdrant":
+        from .vectorstore_qdrant import QdrantStore
+        kwargs = {k: v for k, v in qdrant_kwargs.items() if v is not None}
+        return QdrantStore(collection=collection, vector_size=vector_size, **kwargs)
+    if backend == "faiss":
+        from .vectorstore_faiss import FaissStore
+        return FaissStore(collection=collection, vector_size=vector_size)
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
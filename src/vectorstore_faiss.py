@@ -0,0 +1,303 @@
+# src/vectorstore_faiss.py
+"""
+Embedded FAISS vector store with the same interface as QdrantStore
+(upsert_points / upsert_arrays / delete_points / search / flush), for single-node setups
+and tests without a Qdrant server.
+Index types: 'flat' (exact), 'hnsw' and 'ivfpq'. Vectors are L2-normalized
+and searched by inner product (= cosine). Payloads live in a memory-mapped
+sidecar RecordStore; raw vectors are kept in an append-only float32 file so
+the index can be retrained or compacted.
+"""
+import json
+import os
+import threading
+import logging
+
+import numpy as np
+import faiss
+from qdrant_client.http.models import ScoredPoint, QueryResponse
+
+from .manifest import INDEX_DIR
+from .record_store import RecordStore
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "papers")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", 64))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 16))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 8))
+# IVF-PQ over-fetches this many times top_k and rescores exactly from the raw vectors.
+FAISS_REFINE = int(os.getenv("FAISS_REFINE", 4))
+# IVF-PQ is trained once this many vectors exist; until then search is exact.
+# It is retrained whenever the collection has grown RETRAIN_GROWTH times.
+IVFPQ_TRAIN_MIN = 1024
+RETRAIN_GROWTH = 4
+# Rebuild the index once this fraction of rows is deleted or overwritten.
+COMPACT_RATIO = 0.25
+
+
+class FaissStore:
+    def __init__(
+        self,
+        collection: str = COLLECTION_NAME,
+        vector_size: int = 384,
+        index_type: str = FAISS_INDEX_TYPE,
+        index_dir: str = INDEX_DIR
+    ):
+        if index_type not in ("flat", "hnsw", "ivfpq"):
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        self.collection = collection
+        self.dim = vector_size
+        self.index_type = index_type
+        self.dir = os.path.join(index_dir, f"faiss_{collection}_{index_type}")
+        os.makedirs(self.dir, exist_ok=True)
+        self.index_path = os.path.join(self.dir, "index.faiss")
+        self.rows_path = os.path.join(self.dir, "rows.npz")
+        self.payloads = RecordStore(os.path.join(self.dir, "payloads"))
+        self._lock = threading.RLock()
+        self._load()
+
+    # ----------------------
+    # STATE
+    # ----------------------
+    def _vectors_file(self, epoch: int) -> str:
+        return os.path.join(self.dir, "vectors.f32" if epoch == 0 else f"vectors.{epoch}.f32")
+
+    def _load(self):
+        # row r of the index / vectors file belongs to point row_ids[r]; the
+        # row map names its vectors file by epoch, bumped on every rebuild
+        if os.path.exists(self.rows_path) and os.path.exists(self.index_path):
+            with np.load(self.rows_path) as rows:
+                self.row_ids = rows["row_ids"].tolist()
+                self.alive = rows["alive"].astype(bool).tolist()
+                self.trained_on = int(rows["trained_on"])
+                self.epoch = int(rows["epoch"]) if "epoch" in rows.files else 0
+            self.vectors_path = self._vectors_file(self.epoch)
+            self.index = faiss.read_index(self.index_path)
+            # vectors are appended before the row map is flushed; drop any
+            # tail left by a crash in between so later appends stay aligned
+            size = len(self.row_ids) * self.dim * 4
+            if os.path.getsize(self.vectors_path) > size:
+                logger.warning("Truncating %s to the %d flushed rows", self.vectors_path, len(self.row_ids))
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(size)
+            self._configure()
+            if self.index.is_trained and self.index.ntotal != len(self.row_ids):
+                # index written by a flush whose row map never landed
+                logger.warning("FAISS index out of step with %s; rebuilding it in memory", self.rows_path)
+                self._build_index(np.ascontiguousarray(self._raw_vectors()))
+        else:
+            self.row_ids = []
+            self.alive = []
+            self.trained_on = 0
+            self.epoch = 0
+            self.vectors_path = self._vectors_file(0)
+            self.index = self._new_index()
+            self._configure()
+            open(self.vectors_path, "wb").close()
+        self.row_of = {pid: r for r, pid in enumerate(self.row_ids) if self.alive[r]}
+
+    def _new_index(self, n_train: int = 0):
+        d = self.dim
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(d)
+        if self.index_type == "hnsw":
+            return faiss.IndexHNSWFlat(d, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        nlist = max(1, min(FAISS_NLIST, n_train // 39))
+        quantizer = faiss.IndexFlatIP(d)
+        return faiss.IndexIVFPQ(quantizer, d, nlist, FAISS_PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+
+    def _configure(self):
+        if self.index_type == "hnsw":
+            self.index.hnsw.efSearch = FAISS_EF_SEARCH
+        elif self.index_type == "ivfpq":
+            self.index.nprobe = FAISS_NPROBE
+
+    def _raw_vectors(self):
+        n = len(self.row_ids)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    @staticmethod
+    def _normalize(vectors):
+        vecs = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        faiss.normalize_L2(vecs)
+        return vecs
+
+    def __len__(self):
+        return len(self.row_of)
+
+    # ----------------------
+    # WRITE
+    # ----------------------
+    def upsert_points(self, points):
+        """
+        points: list of dicts {'id': int, 'vector': list|ndarray, 'payload': dict}
+        """
+        if not points:
+            return
+        self.upsert_arrays([p["id"] for p in points], [p["vector"] for p in points],
+                           [p["payload"] for p in points])
+
+    def upsert_arrays(self, ids, vectors, payloads):
+        """
+        Bulk write: vectors is a 2D float32 array with one row per id.
+        An id repeated within the batch keeps its last occurrence.
+        """
+        if not len(ids):
+            return
+        ids = [int(i) for i in ids]
+        vecs = self._normalize(vectors)
+        payloads = list(payloads)
+        last = {pid: i for i, pid in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            vecs = np.ascontiguousarray(vecs[keep])
+            payloads = [payloads[i] for i in keep]
+        with self._lock:
+            for pid in ids:
+                old = self.row_of.get(pid)
+                if old is not None:
+                    self.alive[old] = False
+            start = len(self.row_ids)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vecs.tobytes())
+            for i, pid in enumerate(ids):
+                self.row_ids.append(pid)
+                self.alive.append(True)
+                self.row_of[pid] = start + i
+            self.payloads.put_many(
+                (pid, json.dumps(payload).encode("utf-8")) for pid, payload in zip(ids, payloads)
+            )
+            n = len(self.row_ids)
+            if self.index_type == "ivfpq" and n >= max(IVFPQ_TRAIN_MIN, RETRAIN_GROWTH * self.trained_on):
+                self._rebuild()
+            elif self.index.is_trained:
+                self.index.add(vecs)
+            self._maybe_compact()
+
+    def delete_points(self, ids):
+        with self._lock:
+            for pid in ids:
+                r = self.row_of.pop(int(pid), None)
+                if r is not None:
+                    self.alive[r] = False
+            self.payloads.delete(ids)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        dead = len(self.row_ids) - len(self.row_of)
+        if dead and dead > COMPACT_RATIO * len(self.row_ids):
+            self._rebuild()
+
+    def _rebuild(self):
+        """
+        Drop dead rows and rebuild (and, for IVF-PQ, retrain) the index.
+        """
+        keep = np.flatnonzero(np.array(self.alive, dtype=bool))
+        vecs = np.ascontiguousarray(self._raw_vectors()[keep]) if len(keep) else np.zeros((0, self.dim), np.float32)
+        # the compacted vectors go to a new file; the old one stays valid for
+        # the persisted row map until flush() commits the new one
+        previous = self.vectors_path
+        self.epoch += 1
+        self.vectors_path = self._vectors_file(self.epoch)
+        with open(self.vectors_path, "wb") as f:
+            f.write(vecs.tobytes())
+        self.row_ids = [self.row_ids[r] for r in keep.tolist()]
+        self.alive = [True] * len(self.row_ids)
+        self.row_of = {pid: r for r, pid in enumerate(self.row_ids)}
+        self._build_index(vecs)
+        self.flush()
+        # keep the previous file for readers that have not reopened yet
+        for name in os.listdir(self.dir):
+            path = os.path.join(self.dir, name)
+            if name.startswith("vectors") and name.endswith(".f32") and path not in (self.vectors_path, previous):
+                os.remove(path)
+
+    def _build_index(self, vecs):
+        """
+        Fresh index over vecs (one per row), trained if IVF-PQ has enough of them.
+        """
+        self.index = self._new_index(n_train=len(vecs))
+        self._configure()
+        if not self.index.is_trained:
+            if len(vecs) >= IVFPQ_TRAIN_MIN:
+                self.index.train(vecs)
+                self.trained_on = len(vecs)
+            else:
+                # shrunk below the training minimum: train again as soon as it is reached
+                self.trained_on = 0
+        if self.index.is_trained and len(vecs):
+            self.index.add(vecs)
+
+    def flush(self):
+        """
+        Persist index, row map and payload offsets. The row map is written
+        after the index: it names the vectors file and is what a reload trusts.
+        """
+        with self._lock:
+            faiss.write_index(self.index, self.index_path + ".tmp")
+            os.replace(self.index_path + ".tmp", self.index_path)
+            tmp = self.rows_path + ".tmp.npz"
+            np.savez(tmp, row_ids=np.array(self.row_ids, dtype=np.int64), alive=np.array(self.alive, dtype=bool),
+                     trained_on=self.trained_on, epoch=self.epoch)
+            os.replace(tmp, self.rows_path)
+            self.payloads.flush()
+
+    def close(self, flush: bool = True):
+        """
+        Flush (unless read-only) and release the payload store's file handles.
+        """
+        with self._lock:
+            if flush:
+                self.flush()
+            self.payloads.close(flush=False)
+
+    # ----------------------
+    # READ
+    # ----------------------
+    def search(self, vector, top_k: int = 10, filter=None):
+        """
+        Returns a QueryResponse like QdrantClient.query_points.
+        """
+        if filter is not None:
+            raise ValueError("FaissStore does not support payload filters")
+        q = self._normalize([vector])
+        with self._lock:
+            n_dead = len(self.row_ids) - len(self.row_of)
+            k = min(top_k + n_dead, len(self.row_ids))
+            if k == 0:
+                return QueryResponse(points=[])
+            if self.index.is_trained and self.index.ntotal == len(self.row_ids):
+                if self.index_type == "ivfpq":
+                    _, cand = self.index.search(q, min(k * FAISS_REFINE, len(self.row_ids)))
+                    cand = cand[0][cand[0] >= 0]
+                    exact = self._raw_vectors()[np.sort(cand)] @ q[0]
+                    order = np.argsort(-exact)[:k]
+                    rows, scores = np.sort(cand)[order], exact[order]
+                else:
+                    scores, rows = self.index.search(q, k)
+                    scores, rows = scores[0], rows[0]
+            else:
+                # untrained IVF-PQ: exact search over the raw vectors
+                sims = self._raw_vectors() @ q[0]
+                rows = np.argsort(-sims)[:k]
+                scores = sims[rows]
+            hits = []
+            for r, s in zip(rows.tolist(), scores.tolist()):
+                if r < 0 or not self.alive[r]:
+                    continue
+                pid = self.row_ids[r]
+                hits.append(ScoredPoint(id=pid, version=0, score=float(s), payload=self.payload(pid)))
+                if len(hits) == top_k:
+                    break
+        return QueryResponse(points=hits)
+
+    def payload(self, point_id):
+        data = self.payloads.get(point_id)
+        return json.loads(data) if data else {}
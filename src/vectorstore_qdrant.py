@@ -56,16 +56,87 @@
 #         return self.client.search(collection_name=self.collection, query_vector=vec, limit=top_k, query_filter=filter)
 
 # src/vectorstore_qdrant.py
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (
+    VectorParams, Distance, Batch, PointIdsList, HnswConfigDiff, SearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, QuantizationSearchParams
+)
+from concurrent.futures import ThreadPoolExecutor
 import os
+import time
+import uuid
+import asyncio
+import threading
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "1") == "1"
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "papers")
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 256))
+UPSERT_IN_FLIGHT = int(os.getenv("UPSERT_IN_FLIGHT", 4))
+UPSERT_RETRIES = int(os.getenv("UPSERT_RETRIES", 3))
+UPSERT_BACKOFF = 0.5   # seconds, doubled after every failed attempt
+
+# Collection profiles trade memory for recall/latency. They apply when the
+# collection is created; search-time settings (ef, rescoring) apply always.
+#   default: float32 vectors, HNSW graph and payloads in RAM
+#   int8:    int8 copy in RAM (4x smaller), float32 on disk for rescoring
+#   binary:  1-bit copy in RAM (32x smaller), oversampled, float32 rescoring from disk
+#   ondisk:  vectors, HNSW graph and payloads all on disk (page cache only)
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "default")
+PROFILES = {
+    "default": {"quantization": None, "on_disk": False, "on_disk_payload": False, "hnsw_on_disk": False},
+    "int8": {"quantization": "int8", "on_disk": True, "on_disk_payload": False, "hnsw_on_disk": False,
+             "oversampling": 2.0},
+    "binary": {"quantization": "binary", "on_disk": True, "on_disk_payload": False, "hnsw_on_disk": False,
+               "oversampling": 3.0},
+    "ondisk": {"quantization": None, "on_disk": True, "on_disk_payload": True, "hnsw_on_disk": True},
+}
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCT = int(os.getenv("HNSW_EF_CONSTRUCT", 100))
+HNSW_EF = int(os.getenv("HNSW_EF", 128))   # search-time ef
+
+
+def _profile(name: str) -> dict:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile: {name} (expected one of {list(PROFILES)})")
+    return PROFILES[name]
+
+
+def collection_config(profile: str, vector_size: int, hnsw_m: int = HNSW_M,
+                      hnsw_ef_construct: int = HNSW_EF_CONSTRUCT) -> dict:
+    """
+    create_collection() keyword arguments for a profile.
+    """
+    prof = _profile(profile)
+    quantization = None
+    if prof["quantization"] == "int8":
+        quantization = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif prof["quantization"] == "binary":
+        quantization = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return {
+        "vectors_config": VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=prof["on_disk"]),
+        "hnsw_config": HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct, on_disk=prof["hnsw_on_disk"]),
+        "quantization_config": quantization,
+        "on_disk_payload": prof["on_disk_payload"],
+    }
+
+
+def search_params(profile: str, hnsw_ef: int = HNSW_EF) -> SearchParams:
+    prof = _profile(profile)
+    quantization = None
+    if prof["quantization"]:
+        quantization = QuantizationSearchParams(rescore=True, oversampling=prof["oversampling"])
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
 
 class QdrantStore:
     def __init__(
@@ -73,50 +144,178 @@ class QdrantStore:
         collection: str = COLLECTION_NAME,
         host: str = QDRANT_HOST,
         port: int = QDRANT_PORT,
-        vector_size: int = 384
+        vector_size: int = 384,
+        client=None,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        max_in_flight: int = None,
+        retries: int = UPSERT_RETRIES,
+        profile: str = COLLECTION_PROFILE
     ):
+        """
+        client: optional pre-built QdrantClient (e.g. QdrantClient(":memory:")).
+        max_in_flight: concurrent upsert batches; defaults to UPSERT_IN_FLIGHT,
+        or 1 for an injected client since local mode is not thread-safe.
+        profile: one of PROFILES (see COLLECTION_PROFILE).
+        """
+        if max_in_flight is None:
+            max_in_flight = UPSERT_IN_FLIGHT if client is None else 1
         self.collection = collection
-        self.client = QdrantClient(host=host, port=port)
+        self.host = host
+        self.port = port
+        self.profile = profile
+        self.search_params = search_params(profile)
+        self.client = client or QdrantClient(
+            host=host, port=port, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=QDRANT_PREFER_GRPC
+        )
+        self._remote = client is None
+        self._async_client = None
+        self.batch_size = batch_size
+        self.retries = retries
+        # bulk writes: points are buffered into fixed-size batches which are
+        # sent with wait=False, at most max_in_flight at a time
+        self._buf_ids, self._buf_vecs, self._buf_payloads = [], [], []
+        self._buffered = 0
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._pending = []
+        self._error = None
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="qdrant-upsert")
+        self._lock = threading.Lock()
         self._ensure_collection(vector_size)
 
     def _ensure_collection(self, vector_size: int):
         try:
             self.client.get_collection(self.collection)
         except Exception:
-            logger.info("Creating Qdrant collection: %s", self.collection)
+            logger.info("Creating Qdrant collection: %s (profile=%s)", self.collection, self.profile)
             self.client.recreate_collection(
                 collection_name=self.collection,
-                vectors_config=VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE
-                )
+                **collection_config(self.profile, vector_size)
             )
 
     def upsert_points(self, points):
         """
-        points: list of dicts {'id': int|str, 'vector': list, 'payload': dict}
+        points: list of dicts {'id': int|str|None, 'vector': list, 'payload': dict}
+        Points without an id get a random UUID. Buffered like upsert_arrays().
         """
-        formatted = []
-        for p in points:
-            vec = p['vector'].tolist() if hasattr(p['vector'], "tolist") else p["vector"]
-            formatted.append(
-                PointStruct(
-                    id=p["id"],            # BẮT BUỘC: ID phải khác None
-                    vector=vec,
-                    payload=p["payload"]
-                )
-            )
+        if not points:
+            return
+        self.upsert_arrays(
+            [p["id"] if p["id"] is not None else str(uuid.uuid4()) for p in points],
+            np.asarray([p["vector"] for p in points], dtype=np.float32),
+            [p["payload"] for p in points]
+        )
+
+    def upsert_arrays(self, ids, vectors, payloads):
+        """
+        Bulk write. vectors: 2D float32 array (one row per id), payloads: list of dicts.
+        Full batches are sent in the background; call flush() to wait for all writes.
+        Blocks while max_in_flight batches are outstanding.
+        """
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids) or len(payloads) != len(ids):
+            raise ValueError("upsert_arrays expects len(ids) rows in a 2D vectors array and one payload per id")
+        self._raise_pending_error()
+        with self._lock:
+            self._buf_ids.extend(ids)
+            self._buf_vecs.append(vectors)
+            self._buf_payloads.extend(payloads)
+            self._buffered += len(ids)
+            # keep the tail in the buffer: flush() sends it with wait=True as the barrier
+            while self._buffered > self.batch_size:
+                self._submit(*self._take(self.batch_size))
+
+    def _take(self, n: int):
+        vecs = np.concatenate(self._buf_vecs) if len(self._buf_vecs) > 1 else self._buf_vecs[0]
+        ids, payloads = self._buf_ids[:n], self._buf_payloads[:n]
+        self._buf_ids, self._buf_payloads = self._buf_ids[n:], self._buf_payloads[n:]
+        self._buf_vecs = [vecs[n:]] if len(vecs) > n else []
+        self._buffered -= len(ids)
+        return ids, vecs[:n], payloads
 
-        self.client.upsert(
+    def _submit(self, ids, vectors, payloads):
+        self._in_flight.acquire()
+        future = self._executor.submit(self._send, ids, vectors, payloads, False)
+        future.add_done_callback(lambda f: self._in_flight.release())
+        self._pending.append(future)
+        self._pending = [f for f in self._pending if not f.done() or f.exception()]
+
+    def _send(self, ids, vectors, payloads, wait: bool):
+        batch = Batch(ids=list(ids), vectors=vectors.tolist(), payloads=list(payloads))
+        for attempt in range(self.retries + 1):
+            try:
+                return self.client.upsert(collection_name=self.collection, points=batch, wait=wait)
+            except Exception as exc:
+                if attempt == self.retries:
+                    raise
+                delay = UPSERT_BACKOFF * 2 ** attempt
+                logger.warning("Upsert of %d points failed (%s); retrying in %.1fs", len(ids), exc, delay)
+                time.sleep(delay)
+
+    def _raise_pending_error(self):
+        if self._error is None:
+            for f in self._pending:
+                if f.done() and f.exception():
+                    self._error = f.exception()
+                    break
+        if self._error is not None:
+            error, self._error = self._error, None
+            self._pending = []
+            raise error
+
+    def delete_points(self, ids):
+        """
+        Remove points by id (after any buffered upserts).
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        self.flush()
+        self.client.delete(
             collection_name=self.collection,
-            points=formatted
+            points_selector=PointIdsList(points=ids)
         )
 
+    def flush(self):
+        """
+        Barrier: wait for every in-flight batch, then send the buffered tail
+        with wait=True so all earlier writes are applied when this returns.
+        Raises the first batch error that exhausted its retries.
+        """
+        with self._lock:
+            for f in self._pending:
+                f.exception()
+            self._raise_pending_error()
+            self._pending = []
+            if self._buffered:
+                self._send(*self._take(self._buffered), wait=True)
+
     def search(self, vector, top_k: int = 10, filter=None):
         vec = vector.tolist() if hasattr(vector, "tolist") else vector
         return self.client.query_points(
             collection_name=self.collection,
             query=vec,
             limit=top_k,
-            query_filter=filter
-        )
\ No newline at end of file
+            query_filter=filter,
+            search_params=self.search_params
+        )
+
+    async def asearch(self, vector, top_k: int = 10, filter=None):
+        """
+        search() over AsyncQdrantClient, for the async retrieval path.
+        """
+        if not self._remote:
+            return await asyncio.to_thread(self.search, vector, top_k, filter)
+        if self._async_client is None:
+            self._async_client = AsyncQdrantClient(
+                host=self.host, port=self.port, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=QDRANT_PREFER_GRPC
+            )
+        vec = vector.tolist() if hasattr(vector, "tolist") else vector
+        return await self._async_client.query_points(
+            collection_name=self.collection,
+            query=vec,
+            limit=top_k,
+            query_filter=filter,
+            search_params=self.search_params
+        )
@@ -0,0 +1,60 @@
+# src/worker_stats.py
+"""
+Per-worker request counters for the API.
+Counters live in an anonymous shared-memory array created before the
+serving workers are forked (see serve.py), so any worker can report the
+counters of all of them. Each worker only writes its own row.
+"""
+import os
+import time
+from multiprocessing import RawArray
+
+FIELDS = ("pid", "requests", "in_flight", "errors", "started")
+
+
+class WorkerStats:
+    def __init__(self, n_workers: int = 1):
+        self.n_workers = n_workers
+        self.index = 0              # this process' row, set after fork
+        self._rows = RawArray("d", n_workers * len(FIELDS))
+        self.attach(0)
+
+    def _slot(self, field: str, index: int = None) -> int:
+        return (self.index if index is None else index) * len(FIELDS) + FIELDS.index(field)
+
+    def attach(self, index: int):
+        """
+        Claim row index for the calling process (called in each worker).
+        """
+        self.index = index
+        for field in FIELDS:
+            self._rows[self._slot(field)] = 0
+        self._rows[self._slot("pid")] = os.getpid()
+        self._rows[self._slot("started")] = time.time()
+
+    def begin(self):
+        self._rows[self._slot("requests")] += 1
+        self._rows[self._slot("in_flight")] += 1
+
+    def end(self, error: bool = False):
+        self._rows[self._slot("in_flight")] -= 1
+        if error:
+            self._rows[self._slot("errors")] += 1
+
+    def snapshot(self):
+        """
+        One dict per worker: worker, pid, requests, in_flight, errors, uptime_s.
+        """
+        now = time.time()
+        out = []
+        for i in range(self.n_workers):
+            row = {f: self._rows[self._slot(f, i)] for f in FIELDS}
+            out.append({
+                "worker": i,
+                "pid": int(row["pid"]),
+                "requests": int(row["requests"]),
+                "in_flight": int(row["in_flight"]),
+                "errors": int(row["errors"]),
+                "uptime_s": now - row["started"] if row["started"] else 0.0,
+            })
+        return out
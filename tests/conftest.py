@@ -3,6 +3,14 @@ import pytest
 from unittest.mock import MagicMock
 import numpy as np
 
+@pytest.fixture(autouse=True)
+def fresh_model_registry():
+    # shared instances (models, stores) must not leak between tests
+    from src.model_registry import registry
+    registry.clear()
+    yield
+    registry.clear()
+
 @pytest.fixture
 def dummy_embedding():
     return np.ones(384, dtype='float32')
@@ -0,0 +1,81 @@
+# tests/test_answer_cache.py
+import numpy as np
+from src.answer_cache import AnswerCache
+
+VECTORS = {
+    "what is attention": [1.0, 0.0, 0.0],
+    "explain attention": [0.98, 0.2, 0.0],
+    "who wrote react": [0.0, 1.0, 0.0],
+    "what datasets": [0.0, 0.0, 1.0],
+}
+
+def retrieved(*chunk_ids):
+    return [{"meta": {"source": "a.pdf", "chunk_id": c, "text": "t"}} for c in chunk_ids]
+
+def make_cache(**kwargs):
+    gen = {"value": 0}
+    cache = AnswerCache(generation_fn=lambda: gen["value"], embed_fn=lambda q: np.array(VECTORS[q]),
+                        threshold=0.9, **kwargs)
+    return cache, gen
+
+def test_paraphrase_hits_only_with_same_chunks():
+    cache, _ = make_cache()
+    cache.put("what is attention", retrieved(1, 2), "A", seconds=2.0)
+    assert cache.lookup("explain attention", retrieved(2, 1))[0] == "A"
+    assert cache.lookup("explain attention", retrieved(1, 3))[0] is None
+    assert cache.lookup("who wrote react", retrieved(1, 2))[0] is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_seconds"] == 2.0
+
+def test_lookup_vector_is_reused_by_put():
+    cache, _ = make_cache()
+    answer, vector, generation = cache.lookup("what is attention", retrieved(1))
+    assert answer is None
+    cache.embed_fn = None      # put() must not embed again
+    cache.put("what is attention", retrieved(1), "A", vector=vector, generation=generation)
+    assert len(cache._entries) == 1
+
+def test_lru_eviction():
+    cache, _ = make_cache(max_entries=2)
+    cache.put("what is attention", retrieved(1), "A")
+    cache.put("who wrote react", retrieved(1), "B")
+    cache.lookup("what is attention", retrieved(1))          # B is now least recently used
+    cache.put("what datasets", retrieved(1), "C")
+    assert cache.lookup("who wrote react", retrieved(1))[0] is None
+    assert cache.lookup("what is attention", retrieved(1))[0] == "A"
+    assert cache.lookup("what datasets", retrieved(1))[0] == "C"
+
+def test_ttl_expiry():
+    cache, _ = make_cache(ttl=-1)
+    cache.put("what is attention", retrieved(1), "A")
+    assert cache.lookup("what is attention", retrieved(1))[0] is None
+    assert cache.stats()["entries"] == 0
+
+def test_invalidated_when_corpus_changes():
+    cache, gen = make_cache()
+    cache.put("what is attention", retrieved(1), "A")
+    gen["value"] = 1
+    assert cache.lookup("what is attention", retrieved(1))[0] is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_answer_generated_across_a_bump_not_stored():
+    cache, gen = make_cache()
+    _, vector, generation = cache.lookup("what is attention", retrieved(1))
+    gen["value"] = 1           # ingestion finished while the answer was generated
+    cache.put("what is attention", retrieved(1), "A", vector=vector, generation=generation)
+    assert cache.lookup("what is attention", retrieved(1))[0] is None
+    assert cache.stats()["entries"] == 0
+
+def test_reuploaded_file_with_new_content_misses():
+    cache, _ = make_cache()
+    old = [{"meta": {"id": 101, "source": "a.pdf", "chunk_id": 0, "text": "old"}}]
+    new = [{"meta": {"id": 202, "source": "a.pdf", "chunk_id": 0, "text": "new"}}]
+    cache.put("what is attention", old, "A")
+    assert cache.lookup("what is attention", old)[0] == "A"
+    assert cache.lookup("what is attention", new)[0] is None
+
+def test_disabled():
+    cache, _ = make_cache(max_entries=0)
+    cache.put("what is attention", retrieved(1), "A")
+    assert cache.lookup("what is attention", retrieved(1)) == (None, None, None)
@@ -2,16 +2,107 @@
 from fastapi.testclient import TestClient
 from src.api_main import app
 from unittest.mock import MagicMock
+from src.answer_cache import AnswerCache
+import numpy as np
+import os
+import pytest
 
 client = TestClient(app)
 
+def letter_counts(text):
+    return np.bincount([ord(c) - 97 for c in text.lower() if "a" <= c <= "z"], minlength=26).astype("float32")
+
+@pytest.fixture(autouse=True)
+def fresh_answer_cache(monkeypatch):
+    # no encoder download; answers must not leak between tests
+    cache = AnswerCache(generation_fn=lambda: 0, embed_fn=letter_counts)
+    monkeypatch.setattr("src.api_main.answer_cache", cache)
+    monkeypatch.setattr("src.api_main.scheduler.cache", cache)
+    return cache
+
+def fake_generation(monkeypatch, generate_prompts=None):
+    # the scheduler packs with build_prompt and generates with generate_prompts
+    monkeypatch.setattr("src.api_main.generator.build_prompt",
+                        lambda q, retrieved, report=None: report.update(prompt_tokens=3) or q)
+    generate_prompts = generate_prompts or (lambda prompts, retrieved, **kwargs: ["test answer"] * len(prompts))
+    monkeypatch.setattr("src.api_main.generator.generate_prompts", generate_prompts)
+    return generate_prompts
+
 def test_api_query(monkeypatch):
-    monkeypatch.setattr("src.api_main.retriever.merge_and_rerank",
-                        lambda q, top_k: [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "hello"}}])
+    async def fake_merge(q, top_k):
+        return [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "hello"}}]
 
-    monkeypatch.setattr("src.api_main.generator.generate",
-                        lambda q, retrieved: "test answer")
+    monkeypatch.setattr("src.api_main.retriever.amerge_and_rerank", fake_merge)
+
+    fake_generation(monkeypatch)
 
     res = client.post("/query", json={"question": "hi", "top_k": 3})
     assert res.status_code == 200
-    assert res.json()["answer"] == "test answer"
\ No newline at end of file
+    assert res.json()["answer"] == "test answer"
+    assert "context" in res.json()
+
+def test_api_upload_enqueues_job(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sample_data").mkdir()
+    monkeypatch.setattr("src.api_main.jobs.submit", lambda kind, args: "job-1")
+    monkeypatch.setattr("src.api_main.jobs.get",
+                        lambda job_id: {"id": job_id, "status": "running", "progress": {"chunks": 4}} if job_id == "job-1" else None)
+
+    res = client.post("/upload", files={"file": ("a.pdf", b"%PDF-1.4", "application/pdf")})
+    assert res.json()["job_id"] == "job-1"
+    assert client.get("/jobs/job-1").json()["progress"]["chunks"] == 4
+    assert client.get("/jobs/missing").status_code == 404
+
+def test_api_query_stream(monkeypatch):
+    async def fake_merge(q, top_k):
+        return [{"id": 1, "score": 0.5, "payload": {"source": "a.pdf", "chunk_id": 1, "text": "hello"}}]
+
+    monkeypatch.setattr("src.api_main.retriever.amerge_and_rerank", fake_merge)
+    monkeypatch.setattr("src.api_main.generator.stream",
+                        lambda q, retrieved, **kwargs: iter(["test ", "answer"]))
+
+    res = client.post("/query/stream", json={"question": "hi", "top_k": 3})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in res.text.strip().split("\n\n")]
+    assert events == ["event: candidates", "event: token", "event: token", "event: done"]
+    assert '"ttft_ms"' in res.text and '"total_ms"' in res.text
+
+def test_workers_endpoint_counts_requests():
+    first = client.get("/workers").json()["workers"][0]
+    second = client.get("/workers").json()["workers"][0]
+    assert second["requests"] == first["requests"] + 1
+    assert second["pid"] == os.getpid() and second["in_flight"] == 1
+
+def test_query_timings_and_metrics(monkeypatch):
+    async def fake_merge(q, top_k):
+        return [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "hello"}}]
+
+    monkeypatch.setattr("src.api_main.retriever.amerge_and_rerank", fake_merge)
+    fake_generation(monkeypatch)
+
+    assert "timings" not in client.post("/query", json={"question": "hi"}).json()
+    timings = client.post("/query", json={"question": "what is attention", "timings": True}).json()["timings"]
+    assert {"query", "generation_queue"} <= set(timings)
+    assert timings["query"] >= timings["generation_queue"]
+
+    res = client.get("/metrics")
+    assert res.headers["content-type"].startswith("text/plain")
+    assert "# TYPE rag_stage_seconds histogram" in res.text
+    assert 'worker="0",stage="query",le="+Inf"} ' in res.text
+    assert 'rag_worker_requests_total{worker="0"} ' in res.text and "pid=" not in res.text
+    assert "rag_generation_queue_depth" in res.text
+
+def test_query_paraphrase_served_from_answer_cache(monkeypatch, fresh_answer_cache):
+    async def fake_merge(q, top_k):
+        return [{"payload": {"source": "a.pdf", "chunk_id": 1, "text": "hello"}}]
+
+    generate = fake_generation(monkeypatch, MagicMock(return_value=["test answer"]))
+    monkeypatch.setattr("src.api_main.retriever.amerge_and_rerank", fake_merge)
+
+    first = client.post("/query", json={"question": "What is attention?"}).json()
+    second = client.post("/query", json={"question": "what is  attention"}).json()
+    assert first["answer"] == second["answer"] == "test answer"
+    assert generate.call_count == 1
+    stats = client.get("/stats").json()["answer_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
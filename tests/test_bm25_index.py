@@ -0,0 +1,32 @@
+# tests/test_bm25_index.py
+from src.bm25_index import BM25Index
+
+
+def _index():
+    idx = BM25Index()
+    idx.add(10, "self attention mechanism in transformers", {"source": "a.pdf", "chunk_id": 0})
+    idx.add(11, "reasoning and acting with language models", {"source": "b.pdf", "chunk_id": 0})
+    idx.add(12, "attention is all you need attention", {"source": "a.pdf", "chunk_id": 1})
+    return idx
+
+
+def test_search_ranks_by_bm25():
+    hits = _index().search("attention", k=5)
+    assert [h["id"] for h in hits] == [12, 10]
+    assert hits[0]["payload"]["chunk_id"] == 1
+    assert _index().search("nonexistent", k=5) == []
+
+
+def test_delete_and_persist(tmp_path):
+    idx = _index()
+    idx.delete([12])
+    assert [h["id"] for h in idx.search("attention", k=5)] == [10]
+
+    path = str(tmp_path / "bm25.npz")
+    idx.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 2
+    assert [h["id"] for h in loaded.search("attention", k=5)] == [10]
+
+    loaded.add(13, "more attention", {})
+    assert {h["id"] for h in loaded.search("attention", k=5)} == {10, 13}
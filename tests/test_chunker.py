@@ -0,0 +1,53 @@
+# tests/test_chunker.py
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast
+from src.chunker import TokenChunker
+
+
+def _tokenizer():
+    tok = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]")
+
+
+def test_chunks_respect_token_budget_and_overlap():
+    text = " ".join(f"w{i}" for i in range(1000))
+    chunks = TokenChunker(_tokenizer(), max_tokens=100, overlap=20).chunk(text)
+    assert all(c["n_tokens"] <= 100 for c in chunks)
+    assert chunks[0]["text"].split()[-20:] == chunks[1]["text"].split()[:20]
+    assert chunks[-1]["text"].endswith("w999")
+    assert [c["chunk_id"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_chunks_snap_to_sentence_and_section_boundaries():
+    sentence = " ".join(["word"] * 9) + "."
+    text = " ".join([sentence] * 6) + "\n\n1 Methods\n" + " ".join([sentence] * 6)
+    chunks = TokenChunker(_tokenizer(), max_tokens=75, overlap=0).chunk(text)
+    assert chunks[0]["text"].endswith(".")
+    assert chunks[1]["text"].startswith("1 Methods")
+    for c in chunks:
+        assert text[c["start"]:c["end"]] == c["text"]
+
+
+def test_word_fallback_without_tokenizer():
+    chunks = TokenChunker(None, max_tokens=50, overlap=10).chunk("Hello, world! " * 40)
+    assert len(chunks) > 1 and all(c["n_tokens"] <= 50 for c in chunks)
+    assert TokenChunker(None).chunk("   ") == []
+
+
+def test_get_chunker_uses_embedder_model_name(monkeypatch, tmp_path):
+    import transformers
+    from src.chunker import get_chunker
+    seen = []
+    def fake_tokenizer(name, **kwargs):
+        seen.append(name)
+        raise OSError("offline")
+    monkeypatch.setattr(transformers.AutoTokenizer, "from_pretrained", fake_tokenizer)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "local-model").mkdir()
+    get_chunker.cache_clear()
+    # a local model directory must not be rewritten to a hub name
+    get_chunker("local-model")
+    get_chunker("all-MiniLM-L6-v2")
+    get_chunker.cache_clear()
+    assert seen == ["local-model", "sentence-transformers/all-MiniLM-L6-v2"]
@@ -0,0 +1,51 @@
+# tests/test_context_packer.py
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast
+from src.context_packer import ContextPacker
+
+
+def _tokenizer():
+    tok = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]")
+
+
+def _tag(meta):
+    return f"[DOC:{meta['source']}|chunk:{meta['chunk_id']}]\n"
+
+
+def _passage(source, chunk_id, text):
+    return {"meta": {"source": source, "chunk_id": chunk_id, "text": text}}
+
+
+def test_packs_in_rank_order_and_trims_at_sentence():
+    packer = ContextPacker(_tokenizer(), max_input_tokens=30)
+    retrieved = [
+        _passage("a.pdf", 0, "Alpha one two three. Alpha four five six."),
+        _passage("b.pdf", 0, "Beta one two three. Beta four five six. Beta seven eight nine."),
+        _passage("c.pdf", 0, "Gamma one two three four five six seven eight."),
+    ]
+    # budget = 30 - 10 overhead - 1 = 19; tags and separators cost 1 token each
+    packed, report = packer.pack(retrieved, overhead_tokens=10, tag_fn=_tag)
+    assert [p["meta"]["source"] for p in packed] == ["a.pdf", "b.pdf"]
+    assert packed[0]["meta"]["text"] == "Alpha one two three. Alpha four five six."
+    assert packed[1]["meta"]["text"] == "Beta one two three. Beta four five six."
+    assert report["trimmed_passages"] == 1 and report["dropped_passages"] == 1
+    assert report["packed_tokens"] == 16 and report["dropped_tokens"] == 4 + 9
+    assert report["prompt_tokens"] == 30
+
+
+def test_overlapping_chunks_are_deduplicated():
+    packer = ContextPacker(_tokenizer(), max_input_tokens=512)
+    shared = "The shared overlap sentence appears twice."
+    retrieved = [
+        _passage("a.pdf", 0, f"First chunk opens here. {shared}"),
+        _passage("a.pdf", 1, f"{shared} Second chunk continues here."),
+        _passage("a.pdf", 2, shared),
+    ]
+    packed, report = packer.pack(retrieved, overhead_tokens=0, tag_fn=_tag)
+    assert [p["meta"]["text"] for p in packed] == [
+        f"First chunk opens here. {shared}", "Second chunk continues here."]
+    assert report["duplicate_tokens"] == 12
+    assert report["dropped_passages"] == 1
+    assert retrieved[1]["meta"]["text"].startswith(shared)   # input untouched
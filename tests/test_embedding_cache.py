@@ -0,0 +1,54 @@
+# tests/test_embedding_cache.py
+import numpy as np
+from src.embedding_cache import EmbeddingCache
+
+
+def test_cache_roundtrip_and_lru(tmp_path):
+    cache = EmbeddingCache("m", dim=4, cache_dir=str(tmp_path), max_entries=2)
+    cache.put_many(["a", "b"], np.eye(4, dtype="float32")[:2])
+    out, missing = cache.get_many(["a", "  a ", "c"])
+    assert missing == [2]
+    assert np.allclose(out[0], [1, 0, 0, 0]) and np.allclose(out[1], out[0])
+
+    # "b" is now least recently used and gets evicted
+    cache.put_many(["c"], np.eye(4, dtype="float32")[2:3])
+    _, missing = cache.get_many(["a", "b", "c"])
+    assert missing == [1]
+    assert cache.stats()["hits"] == 4
+
+
+def test_cache_persists(tmp_path):
+    cache = EmbeddingCache("m", dim=4, cache_dir=str(tmp_path), max_entries=8)
+    cache.put_many(["hello"], np.full((1, 4), 0.5, dtype="float32"))
+    cache.save()
+
+    reopened = EmbeddingCache("m", dim=4, cache_dir=str(tmp_path), max_entries=8)
+    out, missing = reopened.get_many(["hello"])
+    assert missing == [] and np.allclose(out[0], 0.5)
+
+
+def test_reused_slot_not_served_for_evicted_key(tmp_path):
+    cache = EmbeddingCache("m", dim=4, cache_dir=str(tmp_path), max_entries=2)
+    cache.put_many(["a", "b"], np.eye(4, dtype="float32")[:2])
+    cache.save()
+    # evicts "a" and reuses its slot; the index on disk still maps "a" to it
+    cache.put_many(["c"], np.eye(4, dtype="float32")[2:3])
+
+    reopened = EmbeddingCache("m", dim=4, cache_dir=str(tmp_path), max_entries=2)
+    out, missing = reopened.get_many(["a", "b"])
+    assert missing == [0]
+    assert np.allclose(out[1], [0, 1, 0, 0])
+
+
+def test_model_only_encodes_misses(tmp_path, monkeypatch):
+    from unittest.mock import MagicMock
+    from src import embeddings
+
+    monkeypatch.setattr(embeddings, "SentenceTransformer", MagicMock())
+    em = embeddings.EmbeddingModel(model_name="m")
+    em._cache = EmbeddingCache("m", dim=3, cache_dir=str(tmp_path), max_entries=8)
+    em.model.encode = MagicMock(side_effect=lambda texts, **kw: np.ones((len(texts), 3)))
+
+    em.embed_texts(["x", "y"])
+    em.embed_texts(["x", "z"])
+    assert em.model.encode.call_args[0][0] == ["z"]
@@ -9,4 +9,14 @@ def test_embed_single(mock_embedding_model):
 
 def test_embed_batch(mock_embedding_model):
     embs = mock_embedding_model.embed_texts(["a", "b", "c"])
-    assert embs.shape == (3, 384)
\ No newline at end of file
+    assert embs.shape == (3, 384)
+
+def test_length_bucketed_batches_respect_budget():
+    from src.embeddings import length_bucketed_batches
+    lengths = [10, 200, 15, 180, 12, 190]
+    batches = length_bucketed_batches(lengths, token_budget=400, max_batch_size=8)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        assert len(b) * max(lengths[i] for i in b) <= 400 or len(b) == 1
+    # long texts are grouped together, short ones together
+    assert set(batches[0]) == {1, 5}
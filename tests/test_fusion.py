@@ -0,0 +1,27 @@
+# tests/test_fusion.py
+import numpy as np
+import pytest
+from src import fusion
+
+
+def test_rrf_rewards_agreement():
+    dense = (np.array([1, 2, 3]), np.array([0.9, 0.8, 0.7]))
+    lexical = (np.array([3, 4]), np.array([12.0, 3.0]))
+    ids, scores = fusion.fuse([dense, lexical], method="rrf")
+    assert ids[0] == 3
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_normalized_fusion_ignores_scale():
+    dense = (np.array([1, 2]), np.array([0.9, 0.1]))
+    lexical = (np.array([2, 1]), np.array([100.0, 90.0]))
+    ids, _ = fusion.fuse([dense, lexical], method="minmax", weights=[0.55, 0.45], top_k=1)
+    assert ids.tolist() == [1]
+
+
+def test_empty_leg_and_unknown_method():
+    ids, _ = fusion.fuse([(np.array([], dtype=np.int64), np.array([])), (np.array([7]), np.array([1.0]))],
+                         method="zscore", weights=[0.5, 0.5])
+    assert ids.tolist() == [7]
+    with pytest.raises(ValueError):
+        fusion.normalize([1.0], "raw")
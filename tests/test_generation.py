@@ -11,4 +11,65 @@ def test_prompt_building():
     ]
 
     out = g.generate("What?", retrieved)
-    assert "[DOC:a.pdf|chunk:1]" in out
\ No newline at end of file
+    assert "[DOC:a.pdf|chunk:1]" in out
+
+class FakeStreamer:
+    def __init__(self, tokenizer, **kwargs):
+        import queue
+        self.q = queue.Queue()
+
+    def __iter__(self):
+        while (piece := self.q.get()) is not None:
+            yield piece
+
+    def end(self):
+        self.q.put(None)
+
+def _streaming_generator(monkeypatch, generate):
+    monkeypatch.setattr("src.generation_strict.TextIteratorStreamer", FakeStreamer)
+    g = StrictGenerator.__new__(StrictGenerator)
+    g.tokenizer = MagicMock(return_value={"input_ids": MagicMock()})
+    g.packer = MagicMock()
+    g.packer.count.return_value = [10]
+    g.packer.pack.side_effect = lambda retrieved, overhead, tag_fn: (retrieved, {})
+    g.model = MagicMock()
+    g.model.generate = generate
+    return g
+
+def test_stream_yields_pieces_and_timing(monkeypatch):
+    def fake_generate(**kwargs):
+        for piece in ["Answer ", "", "[DOC:b.pdf|chunk:9]", None]:
+            kwargs["streamer"].q.put(piece)
+
+    g = _streaming_generator(monkeypatch, fake_generate)
+    retrieved = [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "content"}}]
+    timing = {}
+    pieces = list(g.stream("What?", retrieved, timing=timing))
+    assert pieces[:2] == ["Answer ", "[DOC:b.pdf|chunk:9]"]
+    assert "[WARNING]" in pieces[2]
+    assert timing["pieces"] == 2 and 0 <= timing["ttft"] <= timing["total"]
+
+def test_stream_raises_when_generate_fails(monkeypatch):
+    import pytest
+
+    def failing_generate(**kwargs):
+        kwargs["streamer"].q.put("Ans")
+        raise RuntimeError("oom")
+
+    g = _streaming_generator(monkeypatch, failing_generate)
+    retrieved = [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "content"}}]
+    stream = g.stream("What?", retrieved)
+    assert next(stream) == "Ans"
+    with pytest.raises(RuntimeError, match="oom"):
+        next(stream)
+
+def test_generate_uses_answer_cache():
+    from src.answer_cache import AnswerCache
+    g = StrictGenerator(answer_cache=AnswerCache(generation_fn=lambda: 0, embed_fn=lambda q: [1.0, 0.0]))
+    g.pipe = MagicMock(return_value=[{"generated_text": "Answer [DOC:a.pdf|chunk:1]"}])
+    g.build_prompt = MagicMock(return_value="prompt")
+
+    retrieved = [{"meta": {"source": "a.pdf", "chunk_id": 1, "text": "content"}}]
+    assert g.generate("What?", retrieved) == g.generate("what ?", retrieved)
+    assert g.pipe.call_count == 1
+    assert g.answer_cache.stats()["hits"] == 1
@@ -0,0 +1,104 @@
+# tests/test_generation_scheduler.py
+import threading
+from unittest.mock import MagicMock
+from src.generation_scheduler import GenerationScheduler, _Request
+
+
+def _generator(n_tokens=10):
+    g = MagicMock()
+    g.build_prompt = MagicMock(side_effect=lambda q, r, report=None: q)
+    g.tokenizer = lambda prompt, truncation: {"input_ids": [0] * n_tokens}
+    g.generate_prompts = MagicMock(side_effect=lambda ps, rs, max_length=512: [f"answer:{p}" for p in ps])
+    return g
+
+
+def test_concurrent_requests_are_batched():
+    g = _generator()
+    s = GenerationScheduler(g, max_batch_size=4, max_wait_ms=0)
+    busy, gate = threading.Event(), threading.Event()
+
+    def slow_generate(ps, rs, max_length=512):
+        busy.set()
+        gate.wait()
+        return [f"answer:{p}" for p in ps]
+
+    g.generate_prompts.side_effect = slow_generate
+    first = s.submit("q0", [])
+    busy.wait(timeout=5)
+    # these queue up while the model is busy and go out as one batch
+    rest = [s.submit(f"q{i}", []) for i in range(1, 5)]
+    gate.set()
+
+    assert first.result(timeout=5) == "answer:q0"
+    assert [f.result(timeout=5) for f in rest] == ["answer:q1", "answer:q2", "answer:q3", "answer:q4"]
+    stats = s.stats()
+    assert stats["batch_size_hist"] == {"1": 1, "4": 1}
+    assert stats["requests"] == 5 and stats["queue_depth"] == 0
+    s.stop()
+
+
+def test_token_budget_splits_batches():
+    s = GenerationScheduler(_generator(n_tokens=100), max_batch_size=8, max_wait_ms=50, token_budget=250)
+    for i in range(3):
+        s._queue.put(_Request(f"q{i}", [], 512))
+    assert len(s.next_batch()) == 2     # 3 x 100 padded tokens > 250
+    assert len(s.next_batch()) == 1     # the carried request
+
+
+def test_batch_failure_propagates_to_callers():
+    g = _generator()
+    g.generate_prompts.side_effect = RuntimeError("oom")
+    s = GenerationScheduler(g, max_wait_ms=0)
+    fut = s.submit("q", [])
+    try:
+        fut.result(timeout=5)
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "oom" in str(e)
+    s.stop()
+
+
+def test_single_request_packed_once():
+    g = _generator()
+    s = GenerationScheduler(g, max_wait_ms=0)
+    g.build_prompt.side_effect = lambda q, r, report=None: report.update(prompt_tokens=10) or q
+    report = {}
+    assert s.submit("q", [], report=report).result(timeout=5) == "answer:q"
+    assert g.build_prompt.call_count == 1
+    g.generate_prompts.assert_called_once_with(["q"], [[]], max_length=512)
+    assert report == {"prompt_tokens": 10}
+    s.stop()
+
+
+def test_packing_failure_fails_only_that_request():
+    g = _generator()
+    s = GenerationScheduler(g, max_batch_size=4, max_wait_ms=0)
+    busy, gate = threading.Event(), threading.Event()
+
+    def slow_generate(ps, rs, max_length=512):
+        busy.set()
+        gate.wait()
+        return [f"answer:{p}" for p in ps]
+
+    def build_prompt(q, r, report=None):
+        if q == "bad":
+            raise ValueError("bad context")
+        return q
+
+    g.generate_prompts.side_effect = slow_generate
+    g.build_prompt.side_effect = build_prompt
+    first = s.submit("q0", [])
+    busy.wait(timeout=5)
+    rest = [s.submit(q, []) for q in ("q1", "bad", "q2")]
+    gate.set()
+
+    assert first.result(timeout=5) == "answer:q0"
+    assert rest[0].result(timeout=5) == "answer:q1" and rest[2].result(timeout=5) == "answer:q2"
+    try:
+        rest[1].result(timeout=5)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "bad context" in str(e)
+    # the worker survived
+    assert s.submit("q3", []).result(timeout=5) == "answer:q3"
+    s.stop()
@@ -0,0 +1,68 @@
+# tests/test_inference_backend.py
+import os
+
+import numpy as np
+import pytest
+import torch
+from src import inference_backend
+from src.inference_backend import check_backend, export_dir, quantize_onnx_dir, quantize_torch
+
+
+def test_unknown_backend_rejected():
+    assert check_backend("onnx-int8") == "onnx-int8"
+    with pytest.raises(ValueError):
+        check_backend("tensorrt")
+
+
+def test_torch_int8_close_to_fp32():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(64, 128), torch.nn.ReLU(), torch.nn.Linear(128, 32))
+    x = torch.randn(8, 64)
+    with torch.no_grad():
+        ref = model(x)
+        out = quantize_torch(model)(x)
+    cos = torch.nn.functional.cosine_similarity(ref, out, dim=1)
+    assert cos.min() > 0.99
+
+
+def test_onnx_exports_are_built_once(tmp_path):
+    calls = []
+
+    def export(out):
+        calls.append(out)
+        os.makedirs(out)
+
+    path = export_dir("org/model", "onnx", str(tmp_path))
+    assert inference_backend._build_once(path, export) == path
+    assert inference_backend._build_once(path, export) == path
+    assert len(calls) == 1
+    assert export_dir("org/model", "onnx-int8", str(tmp_path)).endswith("org_model-int8")
+
+
+def test_quantize_onnx_dir(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    ort = pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    w = rng.standard_normal((256, 64)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "w"], ["y"])], "g",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 256])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 64])],
+        [numpy_helper.from_array(w, "w")],
+    )
+    src = tmp_path / "fp32"
+    (src / "onnx").mkdir(parents=True)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+    onnx.save(model, str(src / "onnx" / "model.onnx"))
+    (src / "config.json").write_text("{}")
+
+    dst = quantize_onnx_dir(str(src), str(tmp_path / "int8"))
+    assert (tmp_path / "int8" / "config.json").exists()
+    assert (tmp_path / "int8" / "onnx" / "model.onnx").stat().st_size < (src / "onnx" / "model.onnx").stat().st_size
+
+    x = rng.standard_normal((4, 256)).astype(np.float32)
+    out = ort.InferenceSession(f"{dst}/onnx/model.onnx").run(None, {"x": x})[0]
+    cos = (out * (x @ w)).sum(1) / np.linalg.norm(out, axis=1) / np.linalg.norm(x @ w, axis=1)
+    assert cos.min() > 0.99
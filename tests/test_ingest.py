@@ -18,4 +18,152 @@ def test_extract_text_from_pdf(tmp_path):
     doc.close()
 
     extracted = extract_text_from_pdf(str(pdf_file))
-    assert "Hello" in extracted
\ No newline at end of file
+    assert "Hello" in extracted
+
+def test_embed_batcher_batches_across_documents():
+    import numpy as np
+    from unittest.mock import MagicMock
+    from src.ingest import EmbedBatcher
+
+    em = MagicMock()
+    em.batch_size = 64
+    em.count_tokens = lambda texts: [len(t.split()) for t in texts]
+    em.embed_texts = MagicMock(side_effect=lambda texts: np.ones((len(texts), 4), dtype="float32"))
+    vs = MagicMock()
+
+    batcher = EmbedBatcher(em, vs, batch_tokens=10_000)
+    batcher.add_many([(0, "a b c", {"source": "a.pdf"}), (1, "d e", {"source": "a.pdf"})])
+    batcher.add_many([(2, "f", {"source": "b.pdf"})])
+    batcher.flush()
+
+    assert em.embed_texts.call_count == 1
+    ids, vectors, payloads = vs.upsert_arrays.call_args[0]
+    assert ids == [0, 1, 2]
+    assert vectors.shape == (3, 4) and vectors.dtype == np.float32
+    assert payloads[2] == {"source": "b.pdf"}
+    assert batcher.chunks == 3
+
+
+def test_pipelined_documents_match_serial(tmp_path):
+    from src.ingest import iter_chunked_documents
+
+    pdfs = []
+    for n in range(3):
+        pdf_file = tmp_path / f"doc{n}.pdf"
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), f"Document number {n}")
+        doc.save(pdf_file)
+        doc.close()
+        pdfs.append(pdf_file)
+
+    serial = [(p.name, c, len(st)) for p, c, st in iter_chunked_documents(pdfs, workers=0)]
+    piped = [(p.name, c, len(st)) for p, c, st in iter_chunked_documents(pdfs, workers=2, queue_size=1)]
+    assert piped == serial
+    assert "Document number 2" in piped[2][1][0]["text"]
+
+
+def _fake_index_env(tmp_path, monkeypatch):
+    """
+    index_folder with mocked embedder / vector store and plain-text 'PDFs'.
+    """
+    import numpy as np
+    from unittest.mock import MagicMock
+    from src import ingest
+    from src.pdf_extract import ExtractedDocument
+
+    em = MagicMock()
+    em.batch_size = 64
+    em.count_tokens = lambda texts: [len(t.split()) for t in texts]
+    em.embed_texts = lambda texts: np.ones((len(texts), 4), dtype="float32")
+    vs = MagicMock()
+    monkeypatch.setattr(ingest, "EmbeddingModel", lambda model_name: em)
+    monkeypatch.setattr(ingest, "get_vector_store", lambda collection, vector_size: vs)
+    def fake_extract(path):
+        doc = ExtractedDocument(path)
+        doc.pages = [open(path).read()]
+        doc.page_stats = [{"page": 0, "method": "pymupdf", "quality": "ok", "seconds": 0.01, "chars": 10}]
+        return doc
+    monkeypatch.setattr(ingest, "extract_document", fake_extract)
+    data = tmp_path / "data"
+    data.mkdir()
+    return vs, data, str(tmp_path / "manifest.json")
+
+
+def test_index_folder_is_incremental(tmp_path, monkeypatch):
+    from src import ingest
+    vs, data, manifest = _fake_index_env(tmp_path, monkeypatch)
+    (data / "a.pdf").write_text("alpha text")
+    (data / "b.pdf").write_text("beta text")
+
+    stats = ingest.index_folder(str(data), manifest_file=manifest)
+    assert stats["indexed_files"] == 2
+    assert stats["pages_by_method"] == {"pymupdf": 2}
+    first_ids = set(vs.upsert_arrays.call_args[0][0])
+    # payloads stay slim; text lives in the chunk store
+    assert all("text" not in p for p in vs.upsert_arrays.call_args[0][2])
+    from src.chunk_store import ChunkStore, chunk_store_path
+    texts = ChunkStore(chunk_store_path("papers", str(tmp_path))).texts(sorted(first_ids))
+    assert sorted(texts) == ["alpha text", "beta text"]
+
+    stats = ingest.index_folder(str(data), manifest_file=manifest)
+    assert stats["indexed_files"] == 0 and stats["skipped_files"] == 2
+
+    (data / "a.pdf").unlink()
+    stats = ingest.index_folder(str(data), manifest_file=manifest)
+    assert stats["removed_files"] == 1
+    deleted = set(vs.delete_points.call_args[0][0])
+    assert len(deleted) == 1 and deleted < first_ids
+
+
+def test_index_folder_rename_keeps_points(tmp_path, monkeypatch):
+    from src import ingest
+    from src.chunk_store import ChunkStore, chunk_store_path
+    vs, data, manifest = _fake_index_env(tmp_path, monkeypatch)
+    (data / "a.pdf").write_text("alpha text")
+    ingest.index_folder(str(data), manifest_file=manifest)
+    ids = set(vs.upsert_arrays.call_args[0][0])
+
+    (data / "a.pdf").rename(data / "b.pdf")
+    stats = ingest.index_folder(str(data), manifest_file=manifest)
+    assert stats["indexed_files"] == 1 and stats["removed_files"] == 1
+    assert stats["deleted_points"] == 0
+    vs.delete_points.assert_not_called()
+    assert set(vs.upsert_arrays.call_args[0][0]) == ids
+    texts = ChunkStore(chunk_store_path("papers", str(tmp_path))).texts(sorted(ids))
+    assert texts == ["alpha text"]
+
+
+def test_index_folder_duplicate_file_removal(tmp_path, monkeypatch):
+    from src import ingest
+    vs, data, manifest = _fake_index_env(tmp_path, monkeypatch)
+    (data / "a.pdf").write_text("same text")
+    (data / "copy.pdf").write_text("same text")
+    ingest.index_folder(str(data), manifest_file=manifest)
+    ids = set(vs.upsert_arrays.call_args[0][0])
+
+    # the other copy still owns the points
+    (data / "copy.pdf").unlink()
+    assert ingest.index_folder(str(data), manifest_file=manifest)["deleted_points"] == 0
+    vs.delete_points.assert_not_called()
+
+    (data / "a.pdf").unlink()
+    assert ingest.index_folder(str(data), manifest_file=manifest)["deleted_points"] == len(ids)
+    assert set(vs.delete_points.call_args[0][0]) == ids
+
+
+def test_index_folder_saves_manifest_last(tmp_path, monkeypatch):
+    from src import ingest
+    from src.bm25_index import BM25Index
+    from src.chunk_store import ChunkStore
+    from src.manifest import IngestManifest
+    vs, data, manifest = _fake_index_env(tmp_path, monkeypatch)
+    (data / "a.pdf").write_text("alpha text")
+    calls = []
+    vs.flush.side_effect = lambda: calls.append("vectors")
+    for cls, name, label in ((BM25Index, "save", "bm25"), (ChunkStore, "close", "chunks"),
+                             (IngestManifest, "save", "manifest")):
+        original = getattr(cls, name)
+        monkeypatch.setattr(cls, name, lambda self, *a, _o=original, _l=label, **kw: calls.append(_l) or _o(self, *a, **kw))
+
+    ingest.index_folder(str(data), manifest_file=manifest)
+    assert calls[-1] == "manifest" and {"vectors", "bm25", "chunks"} <= set(calls)
@@ -0,0 +1,38 @@
+# tests/test_jobs.py
+from src.jobs import JobQueue
+
+
+def test_job_runs_and_reports_progress(tmp_path):
+    def handler(args, progress):
+        progress({"pages": 3, "chunks": 7})
+        return {"indexed": args["data_dir"]}
+
+    q = JobQueue(handlers={"ingest": handler}, db_path=str(tmp_path / "jobs.db"))
+    job_id = q.submit("ingest", {"data_dir": "sample_data"})
+    assert q.get(job_id)["status"] == "queued"
+
+    assert q.run_next() is True
+    job = q.get(job_id)
+    assert job["status"] == "done"
+    assert job["progress"] == {"pages": 3, "chunks": 7}
+    assert job["result"] == {"indexed": "sample_data"}
+    assert q.run_next() is False
+
+
+def test_failed_job_records_error(tmp_path):
+    def handler(args, progress):
+        raise RuntimeError("boom")
+
+    q = JobQueue(handlers={"ingest": handler}, db_path=str(tmp_path / "jobs.db"))
+    job_id = q.submit("ingest", {})
+    q.run_next()
+    job = q.get(job_id)
+    assert job["status"] == "failed" and "boom" in job["error"]
+
+
+def test_database_created_on_first_use(tmp_path):
+    path = tmp_path / "sub" / "jobs.db"
+    q = JobQueue(handlers={"ingest": lambda args, progress: None}, db_path=str(path))
+    assert not path.exists()
+    assert q.get("missing") is None
+    assert path.exists()
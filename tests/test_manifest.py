@@ -0,0 +1,35 @@
+# tests/test_manifest.py
+import os
+from src.manifest import IngestManifest, point_id
+
+
+def test_point_id_is_deterministic():
+    assert point_id("abc", 3) == point_id("abc", 3)
+    assert point_id("abc", 3) != point_id("abc", 4)
+    assert 0 <= point_id("abc", 3) < 2 ** 63
+
+
+def test_plan_detects_changed_unchanged_removed(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    a, b = data / "a.pdf", data / "b.pdf"
+    a.write_bytes(b"aaa")
+    b.write_bytes(b"bbb")
+
+    m = IngestManifest(str(tmp_path / "manifest.json"))
+    plan = m.plan([a, b], str(data))
+    assert plan.changed == [a, b]
+    for pdf in plan.changed:
+        m.record(pdf, plan.hashes[pdf], [point_id(plan.hashes[pdf], 0)])
+    m.save()
+
+    b.write_bytes(b"bbb-v2")
+    os.remove(a)
+    m = IngestManifest(str(tmp_path / "manifest.json"))
+    plan = m.plan([b], str(data))
+    assert plan.changed == [b]
+    assert plan.removed == [IngestManifest.key(a)]
+
+    m.record(b, plan.hashes[b], [])
+    plan = m.plan([b], str(data))
+    assert plan.unchanged == [b] and not plan.changed
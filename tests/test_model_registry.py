@@ -0,0 +1,50 @@
+# tests/test_model_registry.py
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+from src import model_registry
+from src.model_registry import ModelRegistry, registry, warmup
+
+
+def test_concurrent_get_loads_once():
+    reg = ModelRegistry()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reg.get(("m", "a"), loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert list(reg.stats()) == ["m:a"]
+
+
+def test_encoder_shared_between_ingest_and_retrieval(monkeypatch):
+    from src import embeddings
+    from src.retriever_hybrid import HybridRetriever
+    st = MagicMock()
+    monkeypatch.setattr(embeddings, "SentenceTransformer", st)
+
+    retriever = HybridRetriever()
+    assert not registry.loaded(("embedder", "sentence-transformers/all-MiniLM-L6-v2", "torch"))
+    assert embeddings.EmbeddingModel("all-MiniLM-L6-v2").model is retriever.model
+    assert st.call_count == 1
+
+
+def test_warmup_reports_per_component(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(model_registry, "WARMERS", {"embedder": lambda infer: warmed.append("e"),
+                                                    "generator": lambda infer: warmed.append("g")})
+    timings = warmup("embedder, generator")
+    assert warmed == ["e", "g"] and set(timings) == {"embedder", "generator"}
+    assert warmup("") == {}
+    with pytest.raises(ValueError):
+        warmup("gpu")
@@ -0,0 +1,67 @@
+# tests/test_pdf_extract.py
+import fitz
+from src import pdf_extract
+from src.pdf_extract import extract_document, page_quality
+
+
+def test_page_quality():
+    assert page_quality("   ") == "empty"
+    assert page_quality("A normal sentence of extracted text, with spaces.") == "ok"
+    assert page_quality("(cid:86)(cid:87)(cid:76)(cid:82) some text here") == "garbled"
+    assert page_quality("Whileforsmallvaluesofdthetwomechanismsperformsimilarly ok") == "garbled"
+
+
+def test_text_pages_use_pymupdf(tmp_path):
+    pdf_file = tmp_path / "text.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello PDF test, this page has a text layer.")
+    doc.new_page()
+    doc.save(pdf_file)
+    doc.close()
+
+    out = extract_document(str(pdf_file))
+    assert "Hello PDF test" in out.pages[0]
+    assert out.pages[1] == ""
+    assert [s["method"] for s in out.page_stats] == ["pymupdf", "pymupdf"]
+    assert out.page_stats[1]["quality"] == "empty"
+    assert out.seconds >= 0
+
+
+def test_scanned_pages_go_to_ocr(tmp_path, monkeypatch):
+    pdf_file = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 20, 20), False)
+    pix.clear_with(200)
+    page.insert_image(fitz.Rect(72, 72, 200, 200), pixmap=pix)
+    doc.save(pdf_file)
+    doc.close()
+
+    monkeypatch.setattr(pdf_extract, "tesseract_available", lambda: True)
+    monkeypatch.setattr(pdf_extract, "ocr_png", lambda png: ("text recognised by OCR", 0.5))
+    out = extract_document(str(pdf_file))
+    assert out.pages == ["text recognised by OCR"]
+    assert out.page_stats[0]["method"] == "ocr"
+    assert out.page_stats[0]["seconds"] >= 0.5
+
+
+def test_damaged_page_is_skipped(tmp_path, monkeypatch):
+    pdf_file = tmp_path / "damaged.pdf"
+    doc = fitz.open()
+    for text in ("First page has a normal text layer.", "Second page is damaged.", "Third page is fine too."):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(pdf_file)
+    doc.close()
+
+    get_text = fitz.Page.get_text
+    def flaky_get_text(page, *args, **kwargs):
+        if page.number == 1:
+            raise RuntimeError("broken content stream")
+        return get_text(page, *args, **kwargs)
+    monkeypatch.setattr(fitz.Page, "get_text", flaky_get_text)
+    monkeypatch.setattr(pdf_extract.pdfplumber, "open", lambda path: (_ for _ in ()).throw(OSError("unreadable")))
+
+    out = extract_document(str(pdf_file))
+    assert "First page" in out.pages[0] and "Third page" in out.pages[2]
+    assert out.pages[1] == ""
+    assert [s["method"] for s in out.page_stats] == ["pymupdf", "failed", "pymupdf"]
@@ -0,0 +1,39 @@
+# tests/test_query_cache.py
+from src.query_cache import QueryCache
+from src.manifest import bump_generation, current_generation
+
+
+def test_cache_hit_normalizes_query():
+    cache = QueryCache(generation_fn=lambda: 0, max_entries=4, ttl=60)
+    cache.put("What is  ReAct?", 5, [{"id": 1}])
+    assert cache.get("what is react?", 5) == [{"id": 1}]
+    assert cache.get("what is react?", 3) is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_generation_bump_invalidates(tmp_path):
+    cache = QueryCache(generation_fn=lambda: current_generation("papers", str(tmp_path)), ttl=60)
+    cache.put("q", 5, [{"id": 1}])
+    assert cache.get("q", 5) is not None
+
+    bump_generation("papers", str(tmp_path))
+    assert cache.get("q", 5) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_expiry():
+    cache = QueryCache(generation_fn=lambda: 0, ttl=-1)
+    cache.put("q", 5, [])
+    assert cache.get("q", 5) is None
+
+
+def test_put_skipped_after_concurrent_bump(tmp_path):
+    cache = QueryCache(generation_fn=lambda: current_generation("papers", str(tmp_path)), ttl=60)
+    generation = cache.generation()
+    # ingestion finishes while the legs are still running
+    bump_generation("papers", str(tmp_path))
+    cache.put("q", 5, [{"id": 1}], generation)
+    assert cache.get("q", 5) is None
+
+    cache.put("q", 5, [{"id": 2}], cache.generation())
+    assert cache.get("q", 5) == [{"id": 2}]
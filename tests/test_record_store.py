@@ -0,0 +1,41 @@
+# tests/test_record_store.py
+import os
+
+import pytest
+from src.record_store import RecordStore
+
+
+def _store(tmp_path):
+    store = RecordStore(str(tmp_path / "records"))
+    store.put_many((i, f"record {i}".encode()) for i in range(10))
+    store.put(3, b"record 3, overwritten")
+    store.delete([0, 1, 2])
+    store.flush()
+    return store
+
+
+def test_compact_keeps_live_records(tmp_path):
+    store = _store(tmp_path)
+    store.compact()
+    assert store.garbage_ratio() == 0.0
+    store.close()
+
+    reopened = RecordStore(str(tmp_path / "records"))
+    assert reopened.get(3) == b"record 3, overwritten" and reopened.get(9) == b"record 9"
+    assert reopened.get(0) is None and len(reopened) == 7
+
+
+def test_crash_during_compaction_keeps_old_offsets_valid(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    replace = os.replace
+    def crashing_replace(src, dst):
+        if dst.endswith(".idx.npz"):
+            raise OSError("killed")
+        replace(src, dst)
+    monkeypatch.setattr(os, "replace", crashing_replace)
+    with pytest.raises(OSError):
+        store.compact()      # dies before the new offset index lands
+    monkeypatch.setattr(os, "replace", replace)
+
+    reopened = RecordStore(str(tmp_path / "records"))
+    assert [reopened.get(i) for i in (3, 5, 9)] == [b"record 3, overwritten", b"record 5", b"record 9"]
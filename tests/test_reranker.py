@@ -0,0 +1,50 @@
+# tests/test_reranker.py
+from unittest.mock import MagicMock
+from src.reranker import Reranker
+
+
+def _candidates():
+    return [
+        {"id": 1, "score": 0.50, "payload": {"text": "alpha"}},
+        {"id": 2, "score": 0.49, "payload": {"text": "beta"}},
+        {"id": 3, "score": 0.10, "payload": {"text": "gamma"}},
+    ]
+
+
+def test_rerank_scores_and_caches():
+    r = Reranker(skip_margin=1.0)
+    relevance = {"alpha": 0.5, "beta": 0.1, "gamma": 0.9}
+    r.predict = MagicMock(side_effect=lambda pairs: [relevance[p] for _, p in pairs])
+
+    out = r.rerank("q", _candidates(), top_k=2)
+    assert [c["id"] for c in out] == [3, 1]
+    assert out[0]["fusion_score"] == 0.10
+
+    r.rerank("q", _candidates(), top_k=2)
+    assert r.predict.call_count == 1
+
+
+def test_rerank_skipped_when_well_separated():
+    r = Reranker(skip_margin=0.2)
+    r.predict = MagicMock()
+    cands = [{"id": i, "score": s, "payload": {}} for i, s in enumerate([1.0, 0.6, 0.2, 0.0])]
+    out = r.rerank("q", cands, top_k=2)
+    assert [c["id"] for c in out] == [0, 1]
+    assert not r.predict.called and r.skipped == 1
+
+
+def test_rerank_hydrates_only_uncached_candidates():
+    r = Reranker(skip_margin=1.0)
+    r.predict = MagicMock(side_effect=lambda pairs: [len(p) for _, p in pairs])
+    texts = {1: "a", 2: "bbb", 3: "cc"}
+    seen = []
+
+    def hydrate(hits):
+        seen.extend(h["id"] for h in hits)
+        return [dict(h, payload={"text": texts[h["id"]]}) for h in hits]
+
+    cands = [{"id": i, "score": 1.0 / i, "payload": {}} for i in (1, 2, 3)]
+    out = r.rerank("q", cands, top_k=2, hydrate=hydrate)
+    assert [c["id"] for c in out] == [2, 3]
+    r.rerank("q", cands, top_k=2, hydrate=hydrate)
+    assert sorted(seen) == [1, 2, 3]
@@ -1,24 +1,133 @@
 # tests/test_retriever.py
-from src.retriever_hybrid import HybridRetriever
 from unittest.mock import MagicMock
 
+import pytest
+from src.retriever_hybrid import HybridRetriever
+from src.vectorstore_faiss import FaissStore
+
+@pytest.fixture(autouse=True)
+def isolated_chunk_store(monkeypatch, tmp_path):
+    # hydrate() must not open a chunk store under the real INDEX_DIR
+    monkeypatch.setattr("src.retriever_hybrid.chunk_store_path",
+                        lambda collection: str(tmp_path / f"chunks_{collection}"))
+
+def _hits(*ids_scores):
+    return [{"id": i, "score": s, "payload": {"source": "a.pdf", "chunk_id": i, "text": f"chunk {i}"}}
+            for i, s in ids_scores]
+
 def test_rerank(monkeypatch):
-    r = HybridRetriever()
+    r = HybridRetriever(rerank=True)
+
+    # the legs disagree on 1 vs 2, so the fused scores are too close to skip the rerank
+    monkeypatch.setattr(r, "dense_search", lambda q, k: _hits((1, 0.9), (2, 0.8), (3, 0.7)))
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: _hits((2, 3.0), (1, 2.0), (3, 1.0)))
+
+    # mock cross-encoder: prefers the fused last
+    cross_scores = {"chunk 1": 0.1, "chunk 2": 0.5, "chunk 3": 0.9}
+    predict = MagicMock(side_effect=lambda pairs: [cross_scores[p] for _, p in pairs])
+    monkeypatch.setattr(r.reranker, "predict", predict)
+
+    res = r.merge_and_rerank("test", top_k=3)
+
+    assert predict.call_count == 1
+    assert [h["id"] for h in res] == [3, 2, 1]
+    assert [h["score"] for h in res] == [0.9, 0.5, 0.1]
+    assert res[0]["fusion_score"] < res[2]["fusion_score"]
+
+def _retriever(monkeypatch):
+    # models load lazily, so nothing is downloaded here
+    return HybridRetriever()
+
+
+def test_async_merge_degrades_to_dense_on_lexical_timeout(monkeypatch):
+    import asyncio
+    import time
+    monkeypatch.setattr("src.retriever_hybrid.LEXICAL_TIMEOUT", 0.05)
+    r = _retriever(monkeypatch)
+
+    async def dense(q, k):
+        return [{"id": 1, "score": 0.9, "payload": {"source": "a"}}]
+
+    monkeypatch.setattr(r, "adense_search", dense)
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: time.sleep(0.5) or [])
+
+    res = asyncio.run(r.amerge_and_rerank("test", top_k=2))
+    assert [h["id"] for h in res] == [1]
+    # degraded answers are not cached
+    assert r.cache.stats()["entries"] == 0
+
+
+def test_async_merge_timings_cross_threads(monkeypatch):
+    import asyncio
+    from src import tracing
+    r = _retriever(monkeypatch)
+    r.reranker = None
+
+    async def dense(q, k):
+        return [{"id": 1, "score": 0.9, "payload": {"text": "a"}}]
+
+    monkeypatch.setattr(r, "adense_search", dense)
+    # runs in the retriever pool; must still land in the caller's breakdown
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: tracing.record("bm25_probe", 0.01) or [])
+
+    async def main():
+        with tracing.collect() as timings:
+            await r.amerge_and_rerank("test", top_k=2)
+        return timings
+
+    assert {"merge_and_rerank", "bm25_probe", "fusion", "hydrate"} <= set(asyncio.run(main()))
+
+
+def test_sync_merge_runs_both_legs(monkeypatch):
+    r = _retriever(monkeypatch)
+    monkeypatch.setattr(r, "dense_search", lambda q, k: [{"id": 1, "score": 0.9, "payload": {}}])
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: [{"id": 2, "score": 3.0, "payload": {}}])
+
+    res = r.merge_and_rerank("test", top_k=5)
+    assert {h["id"] for h in res} == {1, 2}
+
+
+def test_results_hydrated_from_chunk_store(monkeypatch, tmp_path):
+    from src.chunk_store import ChunkStore
+    path = str(tmp_path / "chunks_papers")
+    store = ChunkStore(path)
+    store.put_texts([(1, "dense text"), (2, "lexical text")])
+    store.flush()
+    monkeypatch.setattr("src.retriever_hybrid.chunk_store_path", lambda collection: path)
+    r = _retriever(monkeypatch)
+    r.reranker = None
+    monkeypatch.setattr(r, "dense_search", lambda q, k: [{"id": 1, "score": 0.9, "payload": {"source": "a"}}])
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: [{"id": 2, "score": 3.0, "payload": {"source": "b"}}])
+
+    res = r.merge_and_rerank("test", top_k=1)
+    assert len(res) == 1 and res[0]["payload"]["text"] == "dense text"
+    meta = r.convert_for_generator(res)[0]["meta"]
+    assert meta["text"] == "dense text" and meta["id"] == 1
+
 
-    # mock dense
-    monkeypatch.setattr(r, "dense_search", lambda q, k: [
-        {"text": "alpha", "meta": {"source": "a", "chunk_id": 1}}
-    ])
+def test_results_not_cached_across_generation_bump(monkeypatch):
+    r = _retriever(monkeypatch)
+    r.reranker = None
+    generations = iter([0, 1, 1, 1])
+    monkeypatch.setattr(r.cache, "generation_fn", lambda: next(generations))
+    monkeypatch.setattr(r, "dense_search", lambda q, k: [{"id": 1, "score": 0.9, "payload": {}}])
+    monkeypatch.setattr(r, "bm25_search", lambda q, k: [{"id": 2, "score": 3.0, "payload": {}}])
 
-    # mock bm25
-    monkeypatch.setattr(r, "bm25_search", lambda q, k: [
-        {"text": "beta", "meta": {"source": "b", "chunk_id": 2}}
-    ])
+    r.merge_and_rerank("test", top_k=5)
+    assert r.cache.stats()["entries"] == 0
 
-    # mock reranker
-    monkeypatch.setattr(r.reranker, "predict", lambda pairs: [0.9, 0.5])
 
-    res = r.merge_and_rerank("test", top_k=2)
+def test_stores_closed_when_reopened_on_generation_bump(monkeypatch, tmp_path):
+    from src.manifest import bump_generation, current_generation
+    monkeypatch.setattr("src.retriever_hybrid.current_generation",
+                        lambda collection: current_generation(collection, str(tmp_path)))
+    monkeypatch.setattr("src.retriever_hybrid.get_vector_store",
+                        lambda collection, **kw: FaissStore(collection, vector_size=8, index_dir=str(tmp_path)))
+    r = _retriever(monkeypatch)
+    r.backend = "faiss"
+    monkeypatch.setattr(HybridRetriever, "model", property(lambda self: MagicMock()))
 
-    assert len(res) == 2
-    assert res[0]['text'] in ["alpha", "beta"]
\ No newline at end of file
+    old_store, old_chunks = r.vector_store(), r.chunk_store()
+    bump_generation("papers", str(tmp_path))
+    assert r.vector_store() is not old_store and r.chunk_store() is not old_chunks
+    assert old_store.payloads._fh.closed and old_chunks._fh.closed
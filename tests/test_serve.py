@@ -0,0 +1,55 @@
+# tests/test_serve.py
+import multiprocessing
+import os
+import socket
+import time
+
+import httpx
+from fastapi import FastAPI
+from src.serve import serve
+from src.worker_stats import WorkerStats
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_prefork_workers_share_socket_and_counters():
+    stats = WorkerStats(2)
+    app = FastAPI()
+
+    @app.get("/pid")
+    def pid():
+        stats.begin()
+        stats.end()
+        return {"pid": os.getpid(), "workers": stats.snapshot()}
+
+    port = _free_port()
+    proc = multiprocessing.get_context("fork").Process(
+        target=serve, args=(app, "127.0.0.1", port, 2, 1, "warning"), kwargs={"on_fork": stats.attach})
+    proc.start()
+    try:
+        url = f"http://127.0.0.1:{port}/pid"
+        deadline = time.time() + 20
+        while True:
+            try:
+                httpx.get(url)
+                break
+            except httpx.TransportError:
+                assert time.time() < deadline, "server did not start"
+                time.sleep(0.1)
+        while len({w["pid"] for w in httpx.get(url).json()["workers"]} - {0}) < 2:
+            assert time.time() < deadline, "workers did not start"
+            time.sleep(0.1)
+
+        pids = {httpx.get(url).json()["pid"] for _ in range(20)}
+        workers = httpx.get(url).json()["workers"]
+        assert pids <= {w["pid"] for w in workers}
+        assert os.getpid() not in pids and proc.pid not in pids
+        assert sum(w["requests"] for w in workers) >= 22
+    finally:
+        proc.terminate()
+        proc.join(10)
+    assert proc.exitcode == 0
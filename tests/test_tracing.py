@@ -0,0 +1,71 @@
+# tests/test_tracing.py
+import asyncio
+import pytest
+from src import tracing
+
+@pytest.fixture(autouse=True)
+def fresh_histograms():
+    tracing.reset()
+    yield
+    tracing.reset()
+
+def test_histogram_buckets_are_cumulative():
+    h = tracing.Histogram(buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.7, 3.0):
+        h.observe(v)
+    cumulative, total, n = h.snapshot()
+    assert cumulative == [1, 3, 4]
+    assert n == 4 and total == pytest.approx(4.25)
+
+def test_spans_fill_breakdown_only_while_collecting():
+    with tracing.span("outside"):
+        pass
+    with tracing.collect() as timings:
+        with tracing.span("a"):
+            pass
+        tracing.record("b", 0.5)
+        tracing.record("b", 0.25)
+    assert set(timings) == {"a", "b"}
+    assert timings["b"] == pytest.approx(0.75)
+    assert tracing.current() is None
+    assert tracing.histogram("outside").count == 1
+
+def test_add_skips_histogram():
+    timings = {}
+    tracing.add(timings, "generate", 0.2)
+    tracing.add(None, "generate", 0.2)
+    assert timings == {"generate": 0.2}
+    assert "generate" not in tracing.render_prometheus()
+
+def test_traced_sync_and_async():
+    @tracing.traced("sync_stage")
+    def f(x):
+        return x + 1
+
+    @tracing.traced("async_stage")
+    async def g(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    async def main():
+        with tracing.collect() as timings:
+            assert f(1) == 2
+            assert await g(3) == 6
+        return timings
+
+    assert set(asyncio.run(main())) == {"sync_stage", "async_stage"}
+
+def test_render_prometheus():
+    tracing.record("dense_search", 0.003)
+    text = tracing.render_prometheus(
+        [("queue_depth", "gauge", "Queued requests.", [({}, 2)]),
+         ("requests_total", "counter", "Requests per worker.", [({"worker": 0}, 5), ({"worker": 1}, 3)])],
+        labels={"worker": 1})
+    assert '# TYPE rag_stage_seconds histogram' in text
+    assert 'rag_stage_seconds_bucket{worker="1",stage="dense_search",le="0.0025"} 0' in text
+    assert 'rag_stage_seconds_bucket{worker="1",stage="dense_search",le="0.005"} 1' in text
+    assert 'rag_stage_seconds_bucket{worker="1",stage="dense_search",le="+Inf"} 1' in text
+    assert 'rag_stage_seconds_count{worker="1",stage="dense_search"} 1' in text
+    assert '# TYPE rag_queue_depth gauge' in text
+    assert 'rag_queue_depth{worker="1"} 2' in text
+    assert 'rag_requests_total{worker="0"} 5' in text and 'rag_requests_total{worker="1"} 3' in text
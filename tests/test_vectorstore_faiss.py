@@ -0,0 +1,126 @@
+# tests/test_vectorstore_faiss.py
+import numpy as np
+import pytest
+from src.vectorstore_faiss import FaissStore, IVFPQ_TRAIN_MIN
+
+
+def _points(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype("float32")
+    return [{"id": 1000 + i, "vector": vecs[i], "payload": {"chunk_id": i}} for i in range(n)]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_upsert_search_delete_persist(tmp_path, index_type):
+    vs = FaissStore(collection="t", vector_size=16, index_type=index_type, index_dir=str(tmp_path))
+    pts = _points(50, 16)
+    vs.upsert_points(pts)
+
+    hits = vs.search(pts[7]["vector"], top_k=3).points
+    assert hits[0].id == 1007 and hits[0].payload == {"chunk_id": 7}
+
+    vs.upsert_points([{"id": 1007, "vector": pts[8]["vector"], "payload": {"chunk_id": 99}}])
+    vs.delete_points([1008])
+    top = vs.search(pts[8]["vector"], top_k=1).points[0]
+    assert top.id == 1007 and top.payload == {"chunk_id": 99}
+    vs.flush()
+
+    reopened = FaissStore(collection="t", vector_size=16, index_type=index_type, index_dir=str(tmp_path))
+    assert len(reopened) == 49
+    assert reopened.search(pts[3]["vector"], top_k=1).points[0].id == 1003
+
+
+def test_ivfpq_trains_after_enough_points(tmp_path):
+    vs = FaissStore(collection="t", vector_size=32, index_type="ivfpq", index_dir=str(tmp_path))
+    pts = _points(IVFPQ_TRAIN_MIN + 10, 32)
+    vs.upsert_points(pts[:100])
+    assert not vs.index.is_trained
+    assert vs.search(pts[5]["vector"], top_k=1).points[0].id == 1005
+
+    vs.upsert_points(pts[100:])
+    assert vs.index.is_trained and vs.index.ntotal == len(pts)
+    ids = [h.id for h in vs.search(pts[500]["vector"], top_k=10).points]
+    assert 1500 in ids
+
+
+def test_unflushed_vector_tail_dropped_on_reopen(tmp_path):
+    vs = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    pts = _points(20, 16)
+    vs.upsert_points(pts[:10])
+    vs.flush()
+    # crash after appending vectors but before the row map was flushed
+    vs.upsert_points(pts[10:15])
+
+    reopened = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    assert len(reopened) == 10
+    reopened.upsert_points(pts[15:])
+    top = reopened.search(pts[17]["vector"], top_k=1).points[0]
+    assert top.id == 1017
+    raw = reopened._raw_vectors()
+    assert np.allclose(raw[reopened.row_of[1017]], reopened._normalize([pts[17]["vector"]])[0])
+
+
+def test_compaction_persists_row_map(tmp_path):
+    vs = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    pts = _points(12, 16)
+    vs.upsert_points(pts)
+    vs.flush()
+    vs.delete_points([1000, 1001, 1002, 1003])     # compacts the vectors file
+
+    reopened = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    assert len(reopened) == 8
+    assert reopened.search(pts[9]["vector"], top_k=1).points[0].id == 1009
+
+
+def test_repeated_id_in_batch_keeps_last(tmp_path):
+    vs = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    pts = _points(3, 16)
+    vs.upsert_arrays([1, 2, 1], np.stack([p["vector"] for p in pts]), [{"v": 0}, {"v": 1}, {"v": 2}])
+
+    assert len(vs) == 2 and len(vs.row_ids) == 2
+    hits = vs.search(pts[0]["vector"], top_k=2).points
+    assert [h.id for h in hits].count(1) == 1
+    assert vs.search(pts[2]["vector"], top_k=1).points[0].payload == {"v": 2}
+
+
+def test_search_rejects_payload_filter(tmp_path):
+    vs = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        vs.search(np.ones(16, dtype="float32"), top_k=1, filter={"must": []})
+
+
+def test_ivfpq_retrains_after_shrinking_below_minimum(tmp_path):
+    vs = FaissStore(collection="t", vector_size=32, index_type="ivfpq", index_dir=str(tmp_path))
+    pts = _points(IVFPQ_TRAIN_MIN + 500, 32)
+    vs.upsert_points(pts[:IVFPQ_TRAIN_MIN + 100])
+    assert vs.index.is_trained
+
+    vs.delete_points([p["id"] for p in pts[:400]])     # compacts below the training minimum
+    assert not vs.index.is_trained and vs.trained_on == 0
+
+    vs.upsert_points(pts[IVFPQ_TRAIN_MIN + 100:])       # back above it
+    assert vs.index.is_trained and vs.index.ntotal == len(vs)
+
+
+@pytest.mark.parametrize("crash_at", ["index.faiss", "rows.npz"])
+def test_crash_during_compaction_keeps_ids_on_their_vectors(tmp_path, monkeypatch, crash_at):
+    import os
+    vs = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    pts = _points(12, 16)
+    vs.upsert_points(pts)
+    vs.flush()
+
+    replace = os.replace
+    def crashing_replace(src, dst):
+        if dst.endswith(crash_at):
+            raise OSError("killed")
+        replace(src, dst)
+    monkeypatch.setattr(os, "replace", crashing_replace)
+    with pytest.raises(OSError):
+        vs.delete_points([1000, 1001, 1002, 1003])     # compaction dies before its row map lands
+    monkeypatch.setattr(os, "replace", replace)
+
+    reopened = FaissStore(collection="t", vector_size=16, index_type="flat", index_dir=str(tmp_path))
+    assert len(reopened) == 12
+    for i in (0, 5, 11):
+        assert reopened.search(pts[i]["vector"], top_k=1).points[0].id == 1000 + i
@@ -1,10 +1,11 @@
 # tests/test_vectorstore_qdrant.py
 from unittest.mock import MagicMock
+import numpy as np
 from src.vectorstore_qdrant import QdrantStore
 
 def test_qdrant_upsert(monkeypatch):
     mock_client = MagicMock()
-    monkeypatch.setattr("src.vectorstore_qdrant.QdrantClient", lambda host, port: mock_client)
+    monkeypatch.setattr("src.vectorstore_qdrant.QdrantClient", lambda host, port, **kwargs: mock_client)
 
     vs = QdrantStore(collection="test", vector_size=384)
 
@@ -13,5 +14,48 @@ def test_qdrant_upsert(monkeypatch):
         'vector': [0.1]*384,
         'payload': {"text": "hello", "source": "a.pdf"}
     }])
+    vs.flush()
 
-    assert mock_client.upsert.called
\ No newline at end of file
+    assert mock_client.upsert.called
+    batch = mock_client.upsert.call_args.kwargs["points"]
+    assert batch.ids[0] is not None
+
+def test_upsert_arrays_batches_and_barrier():
+    client = MagicMock()
+    vs = QdrantStore(collection="test", vector_size=4, client=client, batch_size=10, max_in_flight=2)
+
+    vs.upsert_arrays(list(range(25)), np.ones((25, 4), dtype=np.float32), [{"i": i} for i in range(25)])
+    vs.flush()
+
+    calls = client.upsert.call_args_list
+    assert [len(c.kwargs["points"].ids) for c in calls] == [10, 10, 5]
+    assert [c.kwargs["wait"] for c in calls] == [False, False, True]
+    assert sorted(i for c in calls for i in c.kwargs["points"].ids) == list(range(25))
+
+def test_upsert_retries_failed_batches(monkeypatch):
+    monkeypatch.setattr("src.vectorstore_qdrant.UPSERT_BACKOFF", 0)
+    client = MagicMock()
+    client.upsert.side_effect = [ConnectionError("boom"), None, None]
+    vs = QdrantStore(collection="test", vector_size=4, client=client, batch_size=2, retries=1)
+
+    vs.upsert_arrays([1, 2, 3], np.ones((3, 4), dtype=np.float32), [{}, {}, {}])
+    vs.flush()
+    assert client.upsert.call_count == 3
+
+def test_collection_profiles():
+    from qdrant_client.models import ScalarQuantization, BinaryQuantization
+    from src.vectorstore_qdrant import collection_config, search_params
+
+    cfg = collection_config("int8", 384)
+    assert isinstance(cfg["quantization_config"], ScalarQuantization)
+    assert cfg["vectors_config"].on_disk is True
+    assert isinstance(collection_config("binary", 384)["quantization_config"], BinaryQuantization)
+    assert collection_config("default", 384)["quantization_config"] is None
+    assert search_params("int8").quantization.rescore is True
+
+    client = MagicMock()
+    client.get_collection.side_effect = Exception("missing")
+    vs = QdrantStore(collection="test", vector_size=4, client=client, profile="binary")
+    assert client.recreate_collection.call_args.kwargs["quantization_config"] is not None
+    vs.search([0.1] * 4, top_k=3)
+    assert client.query_points.call_args.kwargs["search_params"].quantization.oversampling == 3.0